@@ -0,0 +1,38 @@
+import hashlib
+import time
+from pathlib import Path
+from typing import Iterable
+
+
+class AssetStore:
+    """
+    按内容哈希命名的素材目录：同一张图片只存一份，反复发布时直接复用，
+    文件名由内容决定，不会与其他素材重名或互相覆盖
+    """
+
+    def __init__(self, directory: Path):
+        self.dir = directory
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+    def put(self, data: bytes, suffix: str = ".jpg") -> Path:
+        """保存素材并返回路径，已存在时不再写入"""
+        path = self.dir / f"{hashlib.sha1(data).hexdigest()[:20]}{suffix}"
+        if not path.exists():
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_bytes(data)
+            tmp.replace(path)
+        else:
+            path.touch()  # 复用时刷新修改时间，清理时不会被当成过期素材
+        return path
+
+    def prune(self, keep: Iterable[str], max_age: float = 86400) -> int:
+        """删除不在keep里且超过max_age秒未修改的素材，返回删除的数量"""
+        keep = {str(Path(p)) for p in keep}
+        deadline = time.time() - max_age
+        removed = 0
+        for path in self.dir.iterdir():
+            if str(path) in keep or path.stat().st_mtime > deadline:
+                continue
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
@@ -0,0 +1,131 @@
+import asyncio
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from astrbot import logger
+
+
+class AuditLog:
+    """
+    群管操作日志，SQLite(WAL)只追加写入。
+    记录时只放进内存队列，由后台任务定时或攒够一批后在线程里批量落盘，
+    按群、目标用户、时间建索引，查询不扫全表
+    """
+
+    def __init__(
+        self, path: Path, flush_interval: float = 2.0, batch_size: int = 200
+    ):
+        self.flush_interval = flush_interval  # 最长落盘间隔(秒)
+        self.batch_size = batch_size  # 攒够多少条立即落盘
+        self._writer = sqlite3.connect(path, check_same_thread=False)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer.executescript(
+            "CREATE TABLE IF NOT EXISTS audit_log ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "ts INTEGER NOT NULL, "
+            "group_id TEXT NOT NULL, "
+            "operator_id TEXT NOT NULL, "
+            "target_id TEXT NOT NULL, "
+            "action TEXT NOT NULL, "
+            "detail TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_audit_group ON audit_log (group_id, ts);"
+            "CREATE INDEX IF NOT EXISTS idx_audit_target ON audit_log (target_id, ts);"
+            "CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit_log (ts);"
+        )
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._buffer: List[Tuple] = []
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        self._flush_lock = asyncio.Lock()
+
+    def record(
+        self,
+        action: str,
+        group_id: str | int,
+        operator_id: str | int = "",
+        target_id: str | int = "",
+        detail: str = "",
+    ):
+        """记录一条操作，不等待落盘"""
+        self._buffer.append(
+            (
+                int(time.time()),
+                str(group_id),
+                str(operator_id),
+                str(target_id),
+                action,
+                detail,
+            )
+        )
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._flush_loop())
+        if len(self._buffer) >= self.batch_size and self._wakeup:
+            self._wakeup.set()
+
+    async def _flush_loop(self):
+        wakeup: asyncio.Event = self._wakeup  # type: ignore
+        while not self._closing:
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"群管日志写入失败: {e}")
+
+    def _write(self, batch: List[Tuple]):
+        with self._writer:
+            self._writer.executemany(
+                "INSERT INTO audit_log "
+                "(ts, group_id, operator_id, target_id, action, detail) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+
+    async def flush(self):
+        """把队列里的记录写入数据库"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            await asyncio.to_thread(self._write, batch)
+
+    def query(
+        self,
+        group_id: str,
+        target_id: str | None = None,
+        since: int | None = None,
+        page: int = 1,
+        page_size: int = 15,
+    ) -> List[Tuple]:
+        """按群(及目标用户、起始时间)倒序分页查询，返回(时间, 操作者, 目标, 操作, 详情)"""
+        sql = "SELECT ts, operator_id, target_id, action, detail FROM audit_log"
+        if target_id:
+            sql += " WHERE target_id = ? AND group_id = ?"
+            params: list = [str(target_id), str(group_id)]
+        else:
+            sql += " WHERE group_id = ?"
+            params = [str(group_id)]
+        if since:
+            sql += " AND ts >= ?"
+            params.append(since)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?"
+        params += [page_size, (max(page, 1) - 1) * page_size]
+        return self._reader.execute(sql, params).fetchall()
+
+    async def close(self):
+        """写完剩余记录后关闭"""
+        self._closing = True
+        if self._task and self._wakeup:
+            self._wakeup.set()
+            await self._task
+        await self.flush()
+        self._writer.close()
+        self._reader.close()
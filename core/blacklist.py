@@ -0,0 +1,136 @@
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+
+class BlacklistStore:
+    """
+    进群黑名单存储，SQLite(WAL模式)，(范围, QQ号)为主键，
+    查询走主键索引，增删只写变更的行，不再整体重写插件配置。
+    临时拉黑的行带到期时间，永久拉黑的行到期时间为NULL
+    """
+
+    def __init__(self, path: Path, on_change: Callable[[str], None] | None = None):
+        self.on_change = on_change  # 某个范围的名单变化后调用，参数为范围
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS blacklist ("
+            "scope TEXT NOT NULL, "  # 群号，或共享黑名单的范围名
+            "user_id INTEGER NOT NULL, "
+            "added_at INTEGER NOT NULL, "
+            "expires_at INTEGER, "  # 临时拉黑的到期时间，永久拉黑为NULL
+            "PRIMARY KEY (scope, user_id)"
+            ") WITHOUT ROWID"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(blacklist)")}
+        if "expires_at" not in columns:  # 旧版建的表
+            self.conn.execute("ALTER TABLE blacklist ADD COLUMN expires_at INTEGER")
+        self.conn.commit()
+
+    @staticmethod
+    def _ids(user_ids: Iterable[str | int]) -> List[int]:
+        """转为整数QQ号并去重，忽略非数字"""
+        ids = {int(uid) for uid in map(str, user_ids) if uid.strip().isdigit()}
+        return sorted(ids)
+
+    def contains(self, scope: str, user_id: str | int) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM blacklist WHERE scope = ? AND user_id = ?",
+            (scope, int(user_id)),
+        ).fetchone()
+        return row is not None
+
+    def add(
+        self,
+        scope: str,
+        user_ids: Iterable[str | int],
+        expires_at: int | None = None,
+    ) -> List[int]:
+        """
+        添加一批QQ号，返回实际新增的(已永久拉黑的不算)。
+        expires_at 为临时拉黑的到期时间：已临时拉黑的改为新的到期时间；
+        不传时为永久拉黑，已临时拉黑的转为永久
+        """
+        ids = self._ids(user_ids)
+        if not ids:
+            return []
+        now = int(time.time())
+        added = []
+        with self.conn:  # 一个事务
+            for uid in ids:
+                cur = self.conn.execute(
+                    "INSERT INTO blacklist (scope, user_id, added_at, expires_at) "
+                    "VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (scope, user_id) DO UPDATE "
+                    "SET expires_at = excluded.expires_at "
+                    "WHERE blacklist.expires_at IS NOT NULL",
+                    (scope, uid, now, expires_at),
+                )
+                if cur.rowcount:
+                    added.append(uid)
+        if added and self.on_change:
+            self.on_change(scope)
+        return added
+
+    def remove(self, scope: str, user_ids: Iterable[str | int]) -> List[int]:
+        """删除一批QQ号，返回实际删除的"""
+        removed = []
+        with self.conn:
+            for uid in self._ids(user_ids):
+                cur = self.conn.execute(
+                    "DELETE FROM blacklist WHERE scope = ? AND user_id = ?",
+                    (scope, uid),
+                )
+                if cur.rowcount:
+                    removed.append(uid)
+        if removed and self.on_change:
+            self.on_change(scope)
+        return removed
+
+    def remove_expired(self, scope: str, user_ids: Iterable[str | int]) -> List[int]:
+        """删除一批已到期的临时拉黑，永久拉黑和未到期的不动，返回实际删除的"""
+        now = int(time.time())
+        removed = []
+        with self.conn:
+            for uid in self._ids(user_ids):
+                cur = self.conn.execute(
+                    "DELETE FROM blacklist WHERE scope = ? AND user_id = ? "
+                    "AND expires_at IS NOT NULL AND expires_at <= ?",
+                    (scope, uid, now),
+                )
+                if cur.rowcount:
+                    removed.append(uid)
+        if removed and self.on_change:
+            self.on_change(scope)
+        return removed
+
+    def list(self, scope: str, limit: int = -1) -> List[int]:
+        """按加入时间列出某范围的QQ号"""
+        rows = self.conn.execute(
+            "SELECT user_id FROM blacklist WHERE scope = ? ORDER BY added_at LIMIT ?",
+            (scope, limit),
+        )
+        return [row[0] for row in rows]
+
+    def count(self, scope: str) -> int:
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM blacklist WHERE scope = ?", (scope,)
+        ).fetchone()
+        return row[0]
+
+    def scopes(self) -> List[str]:
+        """列出所有有黑名单的范围"""
+        rows = self.conn.execute("SELECT DISTINCT scope FROM blacklist")
+        return [row[0] for row in rows]
+
+    def migrate(self, reject_ids: Dict[str, List[str]]) -> int:
+        """从旧版插件配置里的 reject_ids 导入，返回导入的条数"""
+        return sum(
+            len(self.add(scope, user_ids)) for scope, user_ids in reject_ids.items()
+        )
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,30 @@
+import re
+from pathlib import Path
+from typing import Iterable, Iterator
+
+# 批量条目之间的分隔符：空白、中英文逗号、分号、顿号
+SEPARATORS = re.compile(r"[\s,，;；、]+")
+
+
+def split_tokens(text: str) -> list[str]:
+    """把一段文本拆成条目，去掉空项"""
+    return [token for token in SEPARATORS.split(text) if token]
+
+
+def iter_file_tokens(path: Path) -> Iterator[str]:
+    """逐行读取文件并拆成条目，不把整个文件读进内存"""
+    with path.open(encoding="utf-8-sig", errors="ignore") as f:
+        for line in f:
+            yield from split_tokens(line)
+
+
+def write_lines(path: Path, lines: Iterable) -> int:
+    """逐行写入文件(先写临时文件再改名)，返回写入的行数"""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    count = 0
+    with tmp.open("w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(f"{line}\n")
+            count += 1
+    tmp.replace(path)
+    return count
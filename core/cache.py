@@ -0,0 +1,51 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Tuple
+
+
+class TTLCache:
+    """带过期时间的LRU缓存，键为元组时可按前缀批量失效"""
+
+    def __init__(self, ttl: float = 300, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def invalidate(self, *prefix: Hashable):
+        """删除以prefix开头的元组键"""
+        n = len(prefix)
+        stale = [
+            k for k in self._data if isinstance(k, tuple) and k[:n] == prefix
+        ]
+        for key in stale:
+            del self._data[key]
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = f"{self.hits / total:.0%}" if total else "-"
+        return f"{len(self._data)}项，命中率{rate}"
@@ -0,0 +1,81 @@
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+ROLE_CODES: Dict[str, int] = {"member": 0, "admin": 1, "owner": 2}
+
+
+class MemberTable:
+    """群成员快照的列式存储，每一列是一个NumPy数组，便于整列向量化筛选"""
+
+    __slots__ = ("user_id", "last_sent", "level", "join_time", "role", "nickname")
+
+    def __init__(self, members: List[Dict]):
+        n = len(members)
+        self.user_id = np.fromiter(
+            (int(m["user_id"]) for m in members), dtype=np.int64, count=n
+        )
+        self.last_sent = np.fromiter(
+            (int(m.get("last_sent_time") or 0) for m in members),
+            dtype=np.int64,
+            count=n,
+        )
+        self.level = np.fromiter(
+            (int(m.get("level") or 0) for m in members), dtype=np.int32, count=n
+        )
+        self.join_time = np.fromiter(
+            (int(m.get("join_time") or 0) for m in members), dtype=np.int64, count=n
+        )
+        self.role = np.fromiter(
+            (ROLE_CODES.get(m.get("role", "member"), 0) for m in members),
+            dtype=np.int8,
+            count=n,
+        )
+        self.nickname: List[str] = [
+            m.get("card") or m.get("nickname") or "（无昵称）" for m in members
+        ]
+
+    def __len__(self) -> int:
+        return len(self.user_id)
+
+
+def select_inactive(
+    table: MemberTable,
+    now: int,
+    inactive_days: int,
+    under_level: int,
+    whitelist: Iterable[int | str] = (),
+    limit: int = 50,
+    inactive_weight: float = 1.0,
+    level_weight: float = 1.0,
+    join_weight: float = 0.0,
+) -> np.ndarray:
+    """
+    选出inactive_days天未发言且群等级低于under_level的普通成员，跳过白名单，
+    按加权得分从高到低返回最多limit个下标。
+    得分 = 未发言天数*inactive_weight + 差几级*level_weight + 入群天数*join_weight，
+    从未发言的按入群时间算未发言天数
+    """
+    if not len(table):
+        return np.empty(0, dtype=np.intp)
+    last_active = np.maximum(table.last_sent, table.join_time)
+    mask = (
+        (last_active < now - inactive_days * 86400)
+        & (table.level < under_level)
+        & (table.role == ROLE_CODES["member"])
+    )
+    white = np.fromiter((int(u) for u in whitelist), dtype=np.int64)
+    if white.size:
+        mask &= ~np.isin(table.user_id, white)
+    candidates = np.flatnonzero(mask)
+    if not candidates.size or limit <= 0:
+        return candidates[:0]
+    score = (
+        (now - last_active[candidates]) / 86400 * inactive_weight
+        + (under_level - table.level[candidates]) * level_weight
+        + (now - table.join_time[candidates]) / 86400 * join_weight
+    )
+    if candidates.size > limit:
+        top = np.argpartition(-score, limit - 1)[:limit]
+        candidates, score = candidates[top], score[top]
+    return candidates[np.argsort(-score, kind="stable")]
@@ -0,0 +1,186 @@
+import json
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Set
+
+# 五个字段：分 时 日 月 周，周日可写0或7
+CRON_FIELDS = (
+    ("分", 0, 59),
+    ("时", 0, 23),
+    ("日", 1, 31),
+    ("月", 1, 12),
+    ("周", 0, 7),
+)
+
+
+def parse_field(text: str, name: str, low: int, high: int) -> Set[int]:
+    """解析一个字段，支持 * */n a a-b a-b/n 和逗号分隔的列表"""
+    values: Set[int] = set()
+    for part in text.split(","):
+        expr, _, step = part.partition("/")
+        try:
+            if expr == "*":
+                start, end = low, high
+            elif "-" in expr:
+                a, _, b = expr.partition("-")
+                start, end = int(a), int(b)
+            else:
+                start = int(expr)
+                end = high if step else start
+            step_value = int(step) if step else 1
+        except ValueError:
+            raise ValueError(f"{name}字段无法解析：{part}") from None
+        if not (low <= start <= end <= high) or step_value < 1:
+            raise ValueError(f"{name}字段超出范围：{part}")
+        values.update(range(start, end + 1, step_value))
+    return values
+
+
+class CronExpr:
+    """五字段cron表达式(分 时 日 月 周)，按本地时间计算下一次触发时间"""
+
+    __slots__ = (
+        "spec",
+        "minutes",
+        "hours",
+        "days",
+        "months",
+        "weekdays",
+        "dom_any",
+        "dow_any",
+    )
+
+    def __init__(self, spec: str):
+        fields = spec.split()
+        if len(fields) != 5:
+            raise ValueError("cron表达式需要5个字段：分 时 日 月 周")
+        try:
+            parsed = [
+                parse_field(text, name, low, high)
+                for text, (name, low, high) in zip(fields, CRON_FIELDS)
+            ]
+        except ValueError as e:
+            raise ValueError(f"cron表达式有误：{e}") from None
+        self.spec = " ".join(fields)
+        self.minutes = sorted(parsed[0])
+        self.hours = sorted(parsed[1])
+        self.days, self.months = parsed[2], parsed[3]
+        self.weekdays = {d % 7 for d in parsed[4]}
+        # 日和周都有限制时，满足其一即可(与crontab一致)
+        self.dom_any, self.dow_any = fields[2] == "*", fields[4] == "*"
+
+    def _day_matches(self, day: datetime) -> bool:
+        dom = day.day in self.days
+        dow = day.isoweekday() % 7 in self.weekdays
+        if self.dom_any or self.dow_any:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, ts: float) -> float:
+        """ts之后的下一次触发时间，逐天查找，命中的那天再在时、分里找"""
+        t = datetime.fromtimestamp(ts).replace(second=0, microsecond=0)
+        t += timedelta(minutes=1)
+        for _ in range(366 * 8):  # 2月29日这类表达式最多要找好几年
+            if t.month in self.months and self._day_matches(t):
+                for hour in self.hours:
+                    if hour < t.hour:
+                        continue
+                    minutes = self.minutes if hour > t.hour else [
+                        m for m in self.minutes if m >= t.minute
+                    ]
+                    if minutes:
+                        return t.replace(hour=hour, minute=minutes[0]).timestamp()
+            t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+        raise ValueError(f"cron表达式{self.spec}不会触发")
+
+
+JOB_COLUMNS = (
+    "id",
+    "spec",
+    "kind",
+    "groups",
+    "content",
+    "image",
+    "creator",
+    "created_at",
+)
+
+
+class CronJobStore:
+    """定时公告/消息任务，存在SQLite里，重启后继续生效"""
+
+    def __init__(self, path: Path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cron_jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "spec TEXT NOT NULL, "  # cron表达式
+            "kind TEXT NOT NULL, "  # 公告 或 消息
+            "groups TEXT NOT NULL, "  # 目标群号的json列表，空列表表示bot所在的所有群
+            "content TEXT NOT NULL, "
+            "image TEXT NOT NULL, "  # 预先下载好的图片路径
+            "creator TEXT NOT NULL, "
+            "created_at INTEGER NOT NULL)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def _row(row) -> Dict:
+        job = dict(zip(JOB_COLUMNS, row))
+        job["groups"] = json.loads(job["groups"])
+        return job
+
+    def add(
+        self,
+        spec: str,
+        kind: str,
+        groups: List[str],
+        content: str,
+        image: str = "",
+        creator: str = "",
+    ) -> int:
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO cron_jobs "
+                "(spec, kind, groups, content, image, creator, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    spec,
+                    kind,
+                    json.dumps(groups),
+                    content,
+                    image,
+                    creator,
+                    int(time.time()),
+                ),
+            )
+        return cur.lastrowid  # type: ignore
+
+    def get(self, job_id: int) -> Dict | None:
+        row = self.conn.execute(
+            "SELECT * FROM cron_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._row(row) if row else None
+
+    def remove(self, job_id: int) -> Dict | None:
+        """删除任务，返回被删的任务"""
+        job = self.get(job_id)
+        if job:
+            with self.conn:
+                self.conn.execute("DELETE FROM cron_jobs WHERE id = ?", (job_id,))
+        return job
+
+    def list(self) -> List[Dict]:
+        rows = self.conn.execute("SELECT * FROM cron_jobs ORDER BY id")
+        return [self._row(row) for row in rows]
+
+    def images(self) -> Set[str]:
+        """仍被任务引用的图片"""
+        rows = self.conn.execute("SELECT image FROM cron_jobs WHERE image != ''")
+        return {row[0] for row in rows}
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,35 @@
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class TTLSet:
+    """
+    有容量上限的过期集合，用于识别协议端重连后重复推送的事件。
+    超过有效期或容量上限时，最早加入的键被淘汰
+    """
+
+    def __init__(self, ttl: float = 600, maxsize: int = 4096):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._items: OrderedDict[Hashable, float] = OrderedDict()  # 键 -> 过期时间
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _evict(self, now: float):
+        items = self._items
+        while items:
+            key, expire = next(iter(items.items()))
+            if expire > now and len(items) < self.maxsize:
+                break
+            items.popitem(last=False)
+
+    def add(self, key: Hashable) -> bool:
+        """登记一个键，首次出现返回True，有效期内重复出现返回False"""
+        now = time.monotonic()
+        self._evict(now)
+        if key in self._items:
+            return False
+        self._items[key] = now + self.ttl
+        return True
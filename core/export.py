@@ -0,0 +1,75 @@
+import csv
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator
+
+EXPORT_FIELDS = [
+    "user_id",
+    "nickname",
+    "card",
+    "role",
+    "level",
+    "title",
+    "join_time",
+    "last_sent_time",
+]
+EXPORT_FORMATS = ("csv", "jsonl")
+
+
+def _format_ts(ts) -> str:
+    return datetime.fromtimestamp(int(ts)).strftime("%Y-%m-%d %H:%M:%S") if ts else ""
+
+
+def iter_member_rows(members: Iterable[Dict]) -> Iterator[Dict]:
+    """逐个把成员信息整理成导出的行，时间戳转为可读时间"""
+    for member in members:
+        row = {field: member.get(field, "") for field in EXPORT_FIELDS}
+        row["join_time"] = _format_ts(row["join_time"])
+        row["last_sent_time"] = _format_ts(row["last_sent_time"])
+        yield row
+
+
+def write_rows(path: Path, rows: Iterable[Dict], fmt: str = "csv") -> int:
+    """
+    把行逐条写入文件，不在内存里拼接整份内容，返回写入的行数。
+    先写临时文件再改名，不会留下写了一半的文件
+    """
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    count = 0
+    # CSV带BOM，Excel直接打开不会乱码
+    encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+    with tmp.open("w", encoding=encoding, newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                count += 1
+    tmp.replace(path)
+    return count
+
+
+def prune_files(directory: Path, keep: int = 0, max_age: float | None = None) -> int:
+    """
+    删除目录里超过max_age秒未修改的文件，再只留最新的keep个(0为不限)，
+    返回删除的数量
+    """
+    files = sorted(
+        (p for p in directory.iterdir() if p.is_file()),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    now = time.time()
+    removed = 0
+    for i, path in enumerate(files):
+        expired = max_age is not None and now - path.stat().st_mtime > max_age
+        if expired or (keep and i >= keep):
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
@@ -0,0 +1,136 @@
+import asyncio
+import sys
+import time
+from typing import Callable, Deque, Dict, Iterator, List, Tuple
+
+
+class GroupState:
+    """一个群的运行时状态：配置派生的索引、缓存、计数和后台任务"""
+
+    __slots__ = (
+        "group_id",
+        "last_active",
+        "forbidden_check",
+        "join_rules",
+        "join_queue",
+        "link_trie",
+        "messages",
+        "curfew_task",
+        "curfew_whole_ban",
+        "bot_admin",
+        "next_sweep",
+        "sweep_interval",
+        "swept_messages",
+        "message_count",
+        "violation_count",
+    )
+
+    def __init__(self, group_id: str):
+        self.group_id = group_id
+        self.last_active = time.monotonic()  # 最近一次访问时间
+        # 由配置派生，可随时重建
+        self.forbidden_check = False  # 是否检测违禁词
+        self.join_rules = None  # 编译好的进群规则(JoinRules)
+        self.link_trie = None  # 违禁链接的域名字典树，不检测时为None
+        # 临时缓存，空闲时会被清掉
+        self.messages: Deque[Tuple[int, str, int]] | None = None  # 最近消息
+        self.join_queue: List[dict] = []  # 待成批处理的进群申请事件
+        # 后台任务
+        self.curfew_task: asyncio.Task | None = None  # 宵禁任务
+        self.curfew_whole_ban = False  # 宵禁是否已开启全体禁言
+        # 巡检：定期向协议端核对的状态，以及自适应的巡检间隔
+        self.bot_admin = True  # bot是否为管理员，巡检发现不是时暂停需要管理员的功能
+        self.next_sweep = 0.0  # 下次巡检时间(monotonic)
+        self.sweep_interval = 0.0  # 当前巡检间隔(秒)，群空闲时逐次加倍
+        self.swept_messages = 0  # 上次巡检时的消息数，用于判断群是否空闲
+        # 计数
+        self.message_count = 0
+        self.violation_count = 0
+
+    def busy(self) -> bool:
+        """有运行中的后台任务或待处理的进群申请时不能被清除"""
+        return bool(self.join_queue) or self.curfew_active()
+
+    def curfew_active(self) -> bool:
+        """宵禁任务是否在运行"""
+        return self.curfew_task is not None and not self.curfew_task.done()
+
+
+class GroupRegistry:
+    """
+    各群状态的注册表。群状态在首次用到时创建并由 configure 填充配置派生的字段，
+    每访问 EVICT_EVERY 次顺带清理一次：空闲超过 idle_seconds 的群清掉临时缓存，
+    没有后台任务的直接移除，下次用到时再重建
+    """
+
+    EVICT_EVERY = 1024
+
+    def __init__(
+        self,
+        configure: Callable[[GroupState], None] | None = None,
+        idle_seconds: float = 6 * 3600,
+    ):
+        self.configure = configure
+        self.idle_seconds = idle_seconds
+        self._groups: Dict[str, GroupState] = {}
+        self._ops = 0
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def __iter__(self) -> Iterator[GroupState]:
+        return iter(list(self._groups.values()))
+
+    def get(self, group_id: str | int) -> GroupState:
+        """取群状态，不存在时创建"""
+        group_id = str(group_id)
+        state = self._groups.get(group_id)
+        if state is None:
+            state = self._groups[group_id] = GroupState(group_id)
+            if self.configure:
+                self.configure(state)
+        state.last_active = time.monotonic()
+        self._ops += 1
+        if self._ops % self.EVICT_EVERY == 0:
+            self.evict_idle()
+        return state
+
+    def peek(self, group_id: str | int) -> GroupState | None:
+        """取群状态，不存在时返回None，不刷新访问时间"""
+        return self._groups.get(str(group_id))
+
+    def refresh(self, group_id: str | int | None = None):
+        """配置变更后重新生成配置派生的字段，不指定群号时刷新所有群"""
+        if not self.configure:
+            return
+        if group_id is None:
+            for state in self._groups.values():
+                self.configure(state)
+        elif state := self._groups.get(str(group_id)):
+            self.configure(state)
+
+    def evict_idle(self) -> Tuple[int, int]:
+        """清理空闲的群，返回(清掉缓存的群数, 移除的群数)"""
+        deadline = time.monotonic() - self.idle_seconds
+        compacted = removed = 0
+        for group_id, state in list(self._groups.items()):
+            if state.last_active >= deadline:
+                continue
+            if state.busy():
+                if state.messages:
+                    state.messages = None
+                    compacted += 1
+            else:
+                del self._groups[group_id]
+                removed += 1
+        return compacted, removed
+
+    def footprint(self) -> str:
+        """估算占用的内存"""
+        size = sys.getsizeof(self._groups)
+        for state in self._groups.values():
+            size += sys.getsizeof(state) + sys.getsizeof(state.join_queue)
+            if state.messages:
+                size += sys.getsizeof(state.messages)
+                size += len(state.messages) * sys.getsizeof((0, "", 0))
+        return f"{len(self._groups)}个群，约{size / 1024:.1f}KB"
@@ -0,0 +1,174 @@
+import asyncio
+import io
+import sqlite3
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
+
+from PIL import Image
+
+from astrbot import logger
+
+from .cache import TTLCache
+
+
+def dhash(data: bytes, size: int = 8) -> int:
+    """计算图片的差异哈希(dHash)，64位整数，相似图片的哈希汉明距离小"""
+    with Image.open(io.BytesIO(data)) as img:
+        img.seek(0)  # 动图只取第一帧
+        gray = img.convert("L").resize(
+            (size + 1, size), Image.Resampling.BILINEAR
+        )
+        pixels = list(gray.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """按汉明距离组织的BK树，查找距离不超过阈值的哈希时只需访问很少的节点"""
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self):
+        # 节点为(哈希, {距离: 子节点})
+        self._root: Tuple[int, Dict[int, tuple]] | None = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int):
+        if self._root is None:
+            self._root = (value, {})
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            dist = hamming(value, node[0])
+            if dist == 0:
+                return
+            child = node[1].get(dist)
+            if child is None:
+                node[1][dist] = (value, {})
+                self._size += 1
+                return
+            node = child
+
+    def search(self, value: int, max_dist: int) -> List[Tuple[int, int]]:
+        """返回距离不超过max_dist的(距离, 哈希)，按距离排序"""
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            node_value, children = stack.pop()
+            dist = hamming(value, node_value)
+            if dist <= max_dist:
+                found.append((dist, node_value))
+            for d in range(max(1, dist - max_dist), dist + max_dist + 1):
+                if child := children.get(d):
+                    stack.append(child)
+        return sorted(found)
+
+
+class ImageBlocklist:
+    """
+    图片黑名单，哈希存在SQLite里，内存里建一棵BK树做相似查找，
+    每个哈希记着生效的群
+    """
+
+    def __init__(self, path: Path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS image_blocklist ("
+            "scope TEXT NOT NULL, "  # 群号
+            "hash TEXT NOT NULL, "  # 16位十六进制的dHash
+            "added_at INTEGER NOT NULL, "
+            "PRIMARY KEY (scope, hash)"
+            ") WITHOUT ROWID"
+        )
+        self.conn.commit()
+        self.tree = BKTree()
+        self._scopes: Dict[int, Set[str]] = {}
+        rows = self.conn.execute("SELECT scope, hash FROM image_blocklist")
+        for scope, value in rows:
+            self._index(scope, int(value, 16))
+
+    def __len__(self) -> int:
+        return len(self._scopes)
+
+    def _index(self, scope: str, value: int):
+        self.tree.add(value)
+        self._scopes.setdefault(value, set()).add(scope)
+
+    def add(self, scope: str, value: int) -> bool:
+        """加入黑名单，已存在时返回False"""
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT OR IGNORE INTO image_blocklist VALUES (?, ?, ?)",
+                (scope, f"{value:016x}", int(time.time())),
+            )
+        if not cur.rowcount:
+            return False
+        self._index(scope, value)
+        return True
+
+    def match(self, scope: str, value: int, max_dist: int) -> int | None:
+        """查找本群黑名单里与之相似的图片，返回汉明距离，没有则返回None"""
+        for dist, found in self.tree.search(value, max_dist):
+            if scope in self._scopes.get(found, ()):
+                return dist
+        return None
+
+    def close(self):
+        self.conn.close()
+
+
+class ImageHasher:
+    """
+    下载图片并计算哈希。结果按图片的file id缓存，命中缓存时不再下载；
+    同一张图片同时被多条消息引用时只下载一次；哈希计算放在线程里，不占事件循环
+    """
+
+    FAILURE_TTL = 60  # 下载或解码失败的结果只缓存这么久(秒)
+
+    def __init__(
+        self,
+        download: Callable[[str], Awaitable[bytes | None]],
+        cache_size: int = 4096,
+    ):
+        self.download = download
+        self.cache = TTLCache(ttl=86400, maxsize=cache_size)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def hash(self, key: str, url: str) -> int | None:
+        """返回图片的dHash，下载或解码失败时返回None(短时间缓存，避免反复下载)"""
+        if (value := self.cache.get(key, -1)) != -1:
+            return value
+        if future := self._inflight.get(key):
+            return await asyncio.shield(future)
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            data = await self.download(url)
+            value = await asyncio.to_thread(dhash, data) if data else None
+        except asyncio.CancelledError:
+            future.set_result(None)
+            del self._inflight[key]
+            raise
+        except Exception as e:
+            logger.warning(f"图片哈希计算失败: {e}")
+            value = None
+        ttl = None if value is not None else self.FAILURE_TTL
+        self.cache.set(key, value, ttl=ttl)
+        future.set_result(value)
+        del self._inflight[key]
+        return value
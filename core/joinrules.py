@@ -0,0 +1,97 @@
+import re
+import time
+from typing import List, Tuple
+
+from astrbot import logger
+
+from .cache import TTLCache
+
+ACCEPT = "自动同意"
+REJECT = "自动拒绝"
+MANUAL = "转人工"
+REGEX_PREFIX = "re:"  # 以此开头的进群关键词按正则匹配
+
+
+def compile_keywords(keywords: List[str]) -> re.Pattern | None:
+    """
+    把进群关键词编译成一个忽略大小写的正则，一次扫描查完所有关键词；
+    re: 开头的按正则匹配，写错的正则跳过并记日志
+    """
+    parts = []
+    for keyword in dict.fromkeys(map(str, keywords)):
+        if keyword.startswith(REGEX_PREFIX):
+            pattern = keyword[len(REGEX_PREFIX) :]
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                logger.warning(f"进群关键词正则{pattern}无效，已忽略: {e}")
+                continue
+            parts.append(f"(?:{pattern})")
+        elif keyword:
+            parts.append(re.escape(keyword))
+    if not parts:
+        return None
+    return re.compile("|".join(parts), re.IGNORECASE)
+
+
+def account_level(info: dict) -> int | None:
+    """陌生人信息里的QQ等级，各协议端字段名不同，取不到时返回None"""
+    level = info.get("level", info.get("qqLevel"))
+    if isinstance(level, str) and level.isdigit():
+        level = int(level)
+    return level if isinstance(level, int) else None
+
+
+def account_age_days(info: dict, now: float) -> float | None:
+    """陌生人信息里的注册天数，取不到时返回None"""
+    reg_time = info.get("reg_time", info.get("regTime"))
+    if not isinstance(reg_time, (int, float)) or reg_time <= 0:
+        return None
+    return (now - reg_time) / 86400
+
+
+class JoinRules:
+    """
+    一个群的进群规则：关键词与正则、QQ等级和账号注册天数门槛，配置变更时整体重建。
+    判定结果按(QQ号, 验证信息)缓存，同一个人反复申请时不再重复判定；
+    黑名单每次都实时查，不进缓存
+    """
+
+    __slots__ = ("matcher", "min_level", "min_age_days", "below_threshold", "_cache")
+
+    def __init__(
+        self,
+        keywords: List[str],
+        min_level: int = 0,
+        min_age_days: float = 0,
+        below_threshold: str = MANUAL,
+    ):
+        self.matcher = compile_keywords(keywords)
+        self.min_level = min_level
+        self.min_age_days = min_age_days
+        self.below_threshold = below_threshold  # 不满足门槛时 转人工 或 自动拒绝
+        self._cache = TTLCache(ttl=600, maxsize=1024)
+
+    def classify(
+        self, user_id: str, comment: str, info: dict, blacklisted: bool = False
+    ) -> Tuple[str, str]:
+        """判定一条进群申请，返回(处理方式, 原因)"""
+        if blacklisted:
+            return REJECT, "黑名单用户"
+        key = (user_id, comment)
+        if verdict := self._cache.get(key):
+            return verdict
+        verdict = self._evaluate(comment, info)
+        self._cache.set(key, verdict)
+        return verdict
+
+    def _evaluate(self, comment: str, info: dict) -> Tuple[str, str]:
+        level = account_level(info)
+        if self.min_level and level is not None and level < self.min_level:
+            return self.below_threshold, f"QQ等级{level}低于{self.min_level}级"
+        age = account_age_days(info, time.time())
+        if self.min_age_days and age is not None and age < self.min_age_days:
+            return self.below_threshold, f"账号注册不足{self.min_age_days}天"
+        if self.matcher and (match := self.matcher.search(comment)):
+            return ACCEPT, f"命中关键词 {match.group()}"
+        return MANUAL, ""
@@ -0,0 +1,41 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Iterable, List
+
+
+class RateLimiter:
+    """令牌桶限流器，同时限制每秒调用次数和并发数，用于批量调用协议端接口"""
+
+    def __init__(self, rate: float = 5.0, burst: int = 5, concurrency: int = 5):
+        self.rate = max(0.1, float(rate))  # 每秒补充的令牌数
+        self.capacity = max(1, int(burst))  # 令牌桶容量
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._sem = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def acquire(self):
+        """取一个令牌，桶空时等待补充"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def run(self, aw: Awaitable) -> Any:
+        """在限流下执行一个协程"""
+        async with self._sem:
+            await self.acquire()
+            return await aw
+
+    async def gather(self, aws: Iterable[Awaitable]) -> List[Any]:
+        """在限流下并发执行一批协程，异常作为结果返回而不是抛出"""
+        return await asyncio.gather(
+            *(self.run(aw) for aw in aws), return_exceptions=True
+        )
@@ -0,0 +1,55 @@
+from typing import Dict, List
+
+from .cache import TTLCache
+
+
+class MemberCache:
+    """
+    群成员信息缓存：单个成员信息(含角色、群昵称)与整群成员快照。
+    管理员变动、退群等通知到来时应调用 invalidate 使对应缓存失效
+    """
+
+    def __init__(self, ttl: float = 300, snapshot_ttl: float = 600):
+        self.info = TTLCache(ttl=ttl, maxsize=50000)  # (群号, QQ号) -> 成员信息
+        self.snapshots = TTLCache(ttl=snapshot_ttl, maxsize=256)  # 群号 -> 成员列表
+
+    def __len__(self) -> int:
+        return len(self.info)
+
+    async def get_member(
+        self, client, group_id: str | int, user_id: str | int, refresh: bool = False
+    ) -> Dict:
+        """获取单个成员信息，优先用缓存"""
+        key = (str(group_id), str(user_id))
+        if not refresh and (info := self.info.get(key)) is not None:
+            return info
+        info = await client.get_group_member_info(
+            group_id=int(group_id), user_id=int(user_id), no_cache=True
+        )
+        self.info.set(key, info)
+        return info
+
+    async def get_snapshot(
+        self, client, group_id: str | int, refresh: bool = False
+    ) -> List[Dict]:
+        """获取整群成员列表，顺带刷新单个成员的缓存"""
+        group_id = str(group_id)
+        if not refresh and (members := self.snapshots.get(group_id)) is not None:
+            return members
+        members = await client.get_group_member_list(group_id=int(group_id))
+        self.snapshots.set(group_id, members)
+        for member in members:
+            self.info.set((group_id, str(member["user_id"])), member)
+        return members
+
+    def invalidate(self, group_id: str | int, user_id: str | int | None = None):
+        """成员变动后使缓存失效，不指定user_id时整群失效"""
+        group_id = str(group_id)
+        self.snapshots.pop(group_id)
+        if user_id is None:
+            self.info.invalidate(group_id)
+        else:
+            self.info.pop((group_id, str(user_id)))
+
+    def stats(self) -> str:
+        return f"成员{self.info.stats()}，整群快照{len(self.snapshots)}个"
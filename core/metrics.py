@@ -0,0 +1,31 @@
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+
+class Metrics:
+    """插件运行指标：累加计数器 + 查看时才采集的状态项"""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+
+    def incr(self, name: str, n: int = 1):
+        """计数器加n"""
+        self.counters[name] += n
+
+    def gauge(self, name: str, func: Callable[[], Any]):
+        """注册一个状态项，查看指标时调用func取值"""
+        self._gauges[name] = func
+
+    def snapshot(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = dict(sorted(self.counters.items()))
+        for name, func in self._gauges.items():
+            try:
+                data[name] = func()
+            except Exception as e:
+                data[name] = f"采集失败({e})"
+        return data
+
+    def render(self) -> str:
+        """格式化为文本"""
+        return "\n".join(f"{name}：{value}" for name, value in self.snapshot().items())
@@ -0,0 +1,53 @@
+from collections import deque
+from typing import List
+
+from .groups import GroupRegistry
+
+
+class MessageRing:
+    """
+    每个群最近消息的环形缓冲，记录(消息ID, 发送者, 时间)，写入O(1)，满了自动挤掉最旧的。
+    缓冲存放在群状态里，群空闲时随群状态一起被清掉
+    """
+
+    def __init__(self, groups: GroupRegistry, size: int = 200):
+        self.groups = groups
+        self.size = max(1, size)
+
+    def __len__(self) -> int:
+        return sum(len(state.messages or ()) for state in self.groups)
+
+    def add(self, group_id: str, message_id: int, sender_id: str, ts: int):
+        state = self.groups.get(group_id)
+        if state.messages is None:
+            state.messages = deque(maxlen=self.size)
+        state.messages.append((message_id, sender_id, ts))
+
+    def recent(
+        self,
+        group_id: str,
+        count: int,
+        sender_id: str | None = None,
+        exclude: int | None = None,
+    ) -> List[int]:
+        """从新到旧取最近count条消息的ID，可按发送者过滤"""
+        state = self.groups.peek(group_id)
+        result = []
+        for message_id, sender, _ in reversed((state and state.messages) or ()):
+            if message_id == exclude or (sender_id and sender != sender_id):
+                continue
+            result.append(message_id)
+            if len(result) >= count:
+                break
+        return result
+
+    def discard(self, group_id: str, message_ids: List[int]):
+        """移除已撤回的消息"""
+        state = self.groups.peek(group_id)
+        ring = state and state.messages
+        if not ring:
+            return
+        removed = set(message_ids)
+        kept = [item for item in ring if item[0] not in removed]
+        ring.clear()
+        ring.extend(kept)
@@ -0,0 +1,154 @@
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from astrbot import logger
+
+
+class PendingRequest:
+    """一条待处理的进群申请"""
+
+    __slots__ = (
+        "flag",
+        "group_id",
+        "user_id",
+        "nickname",
+        "comment",
+        "notice_id",
+        "created",
+    )
+
+    def __init__(
+        self,
+        flag: str,
+        group_id: str,
+        user_id: str,
+        nickname: str = "",
+        comment: str = "",
+        notice_id: str = "",
+        created: float | None = None,
+    ):
+        self.flag = flag
+        self.group_id = group_id
+        self.user_id = user_id
+        self.nickname = nickname
+        self.comment = comment
+        self.notice_id = notice_id
+        self.created = created or time.time()
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class PendingRequestStore:
+    """
+    进群申请暂存区，按通知消息ID、(群号, QQ号)两种方式O(1)查找，
+    超过保留时长的申请自动过期，变更后持久化到json文件
+    """
+
+    def __init__(self, path: Path, ttl: int = 72 * 3600):
+        self.path = path
+        self.ttl = ttl  # 申请保留时长(秒)
+        self._by_flag: Dict[str, PendingRequest] = {}
+        self._by_notice: Dict[str, str] = {}  # 通知消息ID -> flag
+        self._by_user: Dict[Tuple[str, str], str] = {}  # (群号, QQ号) -> flag
+        self._by_group: Dict[str, Set[str]] = {}  # 群号 -> flag集合
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._by_flag)
+
+    def _index(self, req: PendingRequest):
+        old_flag = self._by_user.get((req.group_id, req.user_id))
+        if old_flag and old_flag != req.flag:
+            self._unindex(old_flag)  # 同一个人重复申请，只保留最新一条
+        self._by_flag[req.flag] = req
+        if req.notice_id:
+            self._by_notice[req.notice_id] = req.flag
+        self._by_user[(req.group_id, req.user_id)] = req.flag
+        self._by_group.setdefault(req.group_id, set()).add(req.flag)
+
+    def _unindex(self, flag: str) -> PendingRequest | None:
+        req = self._by_flag.pop(flag, None)
+        if not req:
+            return None
+        self._by_notice.pop(req.notice_id, None)
+        if self._by_user.get((req.group_id, req.user_id)) == flag:
+            del self._by_user[(req.group_id, req.user_id)]
+        group_flags = self._by_group.get(req.group_id)
+        if group_flags is not None:
+            group_flags.discard(flag)
+            if not group_flags:
+                del self._by_group[req.group_id]
+        return req
+
+    def _expired(self, req: PendingRequest) -> bool:
+        return time.time() - req.created > self.ttl
+
+    def _alive(self, flag: str | None) -> PendingRequest | None:
+        if not flag:
+            return None
+        req = self._by_flag.get(flag)
+        if req and self._expired(req):
+            self._unindex(flag)
+            self.save()
+            return None
+        return req
+
+    def add(self, req: PendingRequest):
+        """登记一条申请"""
+        self._index(req)
+        self.save()
+
+    def get_by_notice(self, notice_id: str | int) -> PendingRequest | None:
+        """按通知消息ID查找申请"""
+        return self._alive(self._by_notice.get(str(notice_id)))
+
+    def get_by_user(self, group_id: str, user_id: str | int) -> PendingRequest | None:
+        """按群号和QQ号查找申请"""
+        return self._alive(self._by_user.get((str(group_id), str(user_id))))
+
+    def list_group(self, group_id: str) -> List[PendingRequest]:
+        """列出本群所有未过期的申请，按申请时间排序"""
+        self.purge_expired()
+        flags = self._by_group.get(str(group_id), ())
+        return sorted((self._by_flag[f] for f in flags), key=lambda r: r.created)
+
+    def remove(self, flag: str) -> PendingRequest | None:
+        """移除一条申请(已处理)"""
+        req = self._unindex(flag)
+        if req:
+            self.save()
+        return req
+
+    def remove_many(self, flags: List[str]):
+        """批量移除申请，只写一次文件"""
+        removed = [f for f in flags if self._unindex(f)]
+        if removed:
+            self.save()
+
+    def purge_expired(self):
+        """清除过期申请"""
+        expired = [f for f, r in self._by_flag.items() if self._expired(r)]
+        self.remove_many(expired)
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.error(f"进群申请数据读取失败: {e}")
+            return
+        for item in data:
+            req = PendingRequest(**item)
+            if not self._expired(req):
+                self._index(req)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        data = [req.to_dict() for req in self._by_flag.values()]
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(self.path)
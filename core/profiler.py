@@ -0,0 +1,161 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import List
+
+IDLE_MODULES = ("selectors:", "windows_events:")  # 事件循环空等时栈顶所在的模块
+CALLBACK_FRAME = "events:Handle._run"  # 事件循环执行回调的帧，之上都是循环本身
+
+
+def frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{Path(code.co_filename).stem}:{name}"
+
+
+def thread_stack(frame: FrameType | None) -> List[str]:
+    """线程当前的调用栈，从最外层到最内层"""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+def await_stack(coro) -> List[str]:
+    """挂起中的协程沿 await 链往下走，得到它正在等待的位置，最后一项为等待的对象类型"""
+    names = []
+    while coro is not None:
+        frame = (
+            getattr(coro, "cr_frame", None)
+            or getattr(coro, "gi_frame", None)
+            or getattr(coro, "ag_frame", None)
+        )
+        if frame is None:
+            names.append(f"<{type(coro).__name__}>")
+            break
+        names.append(frame_name(frame))
+        coro = (
+            getattr(coro, "cr_await", None)
+            or getattr(coro, "gi_yieldfrom", None)
+            or getattr(coro, "ag_await", None)
+        )
+    return names
+
+
+class ProfileResult:
+    """一次剖析的采样结果"""
+
+    def __init__(self):
+        self.cpu: Counter = Counter()  # 事件循环线程的调用栈 -> 采样次数
+        self.awaits: Counter = Counter()  # 挂起任务的await链 -> 采样次数
+        self.samples = 0
+        self.task_samples = 0
+        self.duration = 0.0
+        self.max_lag = 0.0  # 事件循环最大延迟(秒)
+
+    def write_collapsed(self, path: Path) -> int:
+        """写成火焰图工具(flamegraph.pl、speedscope)通用的折叠栈格式，返回行数"""
+        lines = [f"{stack} {count}" for stack, count in self.cpu.most_common()]
+        lines += [
+            f"[await];{stack} {count}" for stack, count in self.awaits.most_common()
+        ]
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return len(lines)
+
+    def summary(self, top: int = 15) -> str:
+        """采样概要：事件循环忙碌占比、自身耗时和累计耗时最多的函数、等待最多的位置"""
+        self_time: Counter = Counter()
+        inclusive: Counter = Counter()
+        busy_total = 0
+        for stack, count in self.cpu.items():
+            frames = stack.split(";")
+            if frames[-1].startswith(IDLE_MODULES):
+                continue
+            busy_total += count
+            if CALLBACK_FRAME in frames:  # 只看回调内部，去掉事件循环本身的帧
+                frames = frames[frames.index(CALLBACK_FRAME) + 1 :] or frames
+            self_time[frames[-1]] += count
+            for name in set(frames):
+                inclusive[name] += count
+        waiting: Counter = Counter()
+        for stack, count in self.awaits.items():
+            # 取await链上最后两个函数帧作为等待位置，如 main:get_snapshot → rpc:call
+            names = [f for f in stack.split(";") if not f.startswith("<")]
+            waiting[" → ".join(names[-2:])] += count
+
+        def pct(count: int, total: int) -> str:
+            return f"{count * 100 / total:.1f}%" if total else "0%"
+
+        lines = [
+            f"采样{self.duration:.0f}秒，共{self.samples}次，"
+            f"事件循环忙碌{pct(busy_total, self.samples)}，"
+            f"最大延迟{self.max_lag * 1000:.0f}毫秒",
+            "",
+            "【自身耗时】",
+            *(f"{pct(c, busy_total)} {n}" for n, c in self_time.most_common(top)),
+            "",
+            "【累计耗时】",
+            *(f"{pct(c, busy_total)} {n}" for n, c in inclusive.most_common(top)),
+            "",
+            "【任务等待】",
+            *(
+                f"{pct(c, self.task_samples)} {n}"
+                for n, c in waiting.most_common(top)
+            ),
+        ]
+        return "\n".join(lines)
+
+
+class SamplingProfiler:
+    """
+    采样剖析器：后台线程定时用 sys._current_frames() 抓事件循环线程的调用栈，
+    事件循环里再定时记录所有挂起任务的await链和循环延迟。
+    只在 run() 期间存在，关闭时不挂任何钩子，没有开销
+    """
+
+    def __init__(self, interval: float = 0.005, task_interval: float = 0.05):
+        self.interval = interval  # 调用栈采样间隔(秒)
+        self.task_interval = task_interval  # 任务采样间隔(秒)
+
+    async def run(self, seconds: float) -> ProfileResult:
+        result = ProfileResult()
+        target = threading.get_ident()  # 事件循环所在的线程
+        stop = threading.Event()
+
+        def sample_threads():
+            while not stop.wait(self.interval):
+                frame = sys._current_frames().get(target)
+                if frame is not None:
+                    result.cpu[";".join(thread_stack(frame))] += 1
+                    result.samples += 1
+                del frame
+
+        thread = threading.Thread(target=sample_threads, name="qqadmin-profiler")
+        start = time.monotonic()
+        thread.start()
+        try:
+            current = asyncio.current_task()
+            deadline = start + seconds
+            while (now := time.monotonic()) < deadline:
+                await asyncio.sleep(self.task_interval)
+                result.max_lag = max(
+                    result.max_lag, time.monotonic() - now - self.task_interval
+                )
+                for task in asyncio.all_tasks():
+                    if task is current or task.done():
+                        continue
+                    stack = await_stack(task.get_coro())
+                    if stack:
+                        result.awaits[";".join(stack)] += 1
+                        result.task_samples += 1
+        finally:
+            stop.set()
+            await asyncio.to_thread(thread.join)
+            result.duration = time.monotonic() - start
+        return result
@@ -0,0 +1,86 @@
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .cache import TTLCache
+
+_MISSING = object()
+
+
+class ReplyCache:
+    """
+    只读命令的结果缓存。键为(群号, 类型, 参数...)，可按群或按(群, 类型)前缀失效；
+    同一个键同时有多个请求时只计算一次，其余的等它的结果(single-flight)
+    """
+
+    def __init__(self, ttl: float = 60, maxsize: int = 512):
+        self.cache = TTLCache(ttl=ttl, maxsize=maxsize)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def get(
+        self,
+        key: tuple,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: float | None = None,
+    ) -> Any:
+        while (value := self.cache.get(key, _MISSING)) is _MISSING:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            await asyncio.wait([future])
+            if not future.cancelled():
+                return future.result()  # 计算出错时同样抛出
+            # 计算的请求被取消了，重新看缓存或自己算
+        else:
+            return value
+
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 没有其他请求在等时也不报“异常未取出”
+            raise
+        else:
+            future.set_result(value)
+            # 计算期间被失效过的结果不进缓存
+            if self._inflight.get(key) is future:
+                self.cache.set(key, value, ttl=ttl)
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        return value
+
+    def invalidate(self, *prefix: Hashable):
+        """失效以prefix开头的键，正在计算的也作废"""
+        prefix = tuple(str(p) if i == 0 else p for i, p in enumerate(prefix))
+        self.cache.invalidate(*prefix)
+        n = len(prefix)
+        for key in [k for k in self._inflight if k[:n] == prefix]:
+            del self._inflight[key]
+
+    def stats(self) -> str:
+        return self.cache.stats()
+
+
+def cached_reply(kind: str, ttl: float | None = None):
+    """
+    装饰只读命令里计算回复的方法：第一个位置参数为群号，与kind和其余位置参数一起作为
+    缓存键，关键字参数(如client)不参与缓存键。方法所在的类需有 reply_cache 属性
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, group_id, *args, **kwargs):
+            return await self.reply_cache.get(
+                (str(group_id), kind, *args),
+                lambda: method(self, group_id, *args, **kwargs),
+                ttl=ttl,
+            )
+
+        return wrapper
+
+    return decorator
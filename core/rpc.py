@@ -0,0 +1,177 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict
+
+from aiocqhttp.exceptions import ActionFailed
+
+from astrbot import logger
+
+# 各接口的超时时长(秒)，未列出的使用默认值
+API_TIMEOUTS: Dict[str, float] = {
+    "get_group_member_list": 30,
+    "_get_group_notice": 20,
+    "_send_group_notice": 30,
+    "set_group_portrait": 30,
+    "upload_group_file": 120,
+}
+
+# 重复调用结果不变的写接口，超时/网络错误时可以安全重试
+IDEMPOTENT_APIS = {
+    "set_group_ban",
+    "set_group_whole_ban",
+    "set_group_card",
+    "set_group_special_title",
+    "set_group_admin",
+    "set_group_name",
+    "set_essence_msg",
+    "delete_essence_msg",
+}
+
+
+class OneBotCallError(Exception):
+    """协议端接口调用失败(超时、网络错误或熔断中)"""
+
+
+class CircuitOpenError(OneBotCallError):
+    """协议端处于熔断状态，调用被直接拒绝"""
+
+
+class CircuitBreaker:
+    """
+    单个bot的熔断器：连续失败达到阈值后熔断，冷却后放行一次试探调用；
+    试探调用迟迟没有结果时，再过一个冷却期放行下一次试探
+    """
+
+    __slots__ = ("threshold", "cooldown", "state", "failures", "opened_at")
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"  # closed: 正常, open: 熔断, half_open: 试探中
+        self.failures = 0
+        self.opened_at = 0.0  # 熔断或放行试探调用的时间
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        now = time.monotonic()
+        if now - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+            self.opened_at = now
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def record_abort(self):
+        """调用被取消，没有结果：试探调用作废，下一次调用直接重新试探"""
+        if self.state == "half_open":
+            self.state = "open"
+            self.opened_at = time.monotonic() - self.cooldown
+
+
+class GuardedBot:
+    """协议端客户端的代理，用法与原客户端一致：await bot.set_group_ban(...)"""
+
+    def __init__(self, caller: "OneBotCaller", client):
+        self._caller = caller
+        self._client = client
+
+    def __getattr__(self, action: str):
+        if action.startswith("__"):
+            raise AttributeError(action)
+
+        async def api(**params) -> Any:
+            return await self._caller.call(self._client, action, **params)
+
+        return api
+
+
+class OneBotCaller:
+    """给协议端接口调用加上超时、幂等接口的抖动退避重试、按bot熔断"""
+
+    def __init__(
+        self,
+        metrics=None,
+        timeout: float = 10,
+        retries: int = 2,
+        threshold: int = 5,
+        cooldown: float = 30,
+    ):
+        self.metrics = metrics
+        self.timeout = timeout  # 默认超时时长(秒)
+        self.retries = retries  # 幂等接口的最大重试次数
+        self.threshold = threshold  # 连续失败多少次后熔断
+        self.cooldown = cooldown  # 熔断后多久放行试探调用(秒)
+        self._breakers: Dict[int, CircuitBreaker] = {}
+        self._proxies: Dict[int, GuardedBot] = {}
+
+    def _incr(self, name: str):
+        if self.metrics:
+            self.metrics.incr(name)
+
+    def breaker(self, client) -> CircuitBreaker:
+        key = id(client)
+        if key not in self._breakers:
+            self._breakers[key] = CircuitBreaker(self.threshold, self.cooldown)
+        return self._breakers[key]
+
+    def wrap(self, client) -> GuardedBot:
+        """获取客户端的受保护代理"""
+        key = id(client)
+        if key not in self._proxies:
+            self._proxies[key] = GuardedBot(self, client)
+        return self._proxies[key]
+
+    @staticmethod
+    def is_idempotent(action: str) -> bool:
+        return action.lstrip("_").startswith("get_") or action in IDEMPOTENT_APIS
+
+    async def call(self, client, action: str, **params) -> Any:
+        """调用协议端接口，失败时抛出ActionFailed或OneBotCallError"""
+        breaker = self.breaker(client)
+        if not breaker.allow():
+            self._incr("熔断拒绝调用")
+            raise CircuitOpenError(f"协议端暂时不可用，已拒绝调用{action}")
+        timeout = API_TIMEOUTS.get(action, self.timeout)
+        attempts = 1 + (self.retries if self.is_idempotent(action) else 0)
+        for attempt in range(attempts):
+            try:
+                result = await asyncio.wait_for(
+                    client.call_action(action, **params), timeout
+                )
+            except ActionFailed:
+                breaker.record_success()  # 协议端正常响应，只是接口执行失败
+                raise
+            except Exception as e:
+                breaker.record_failure()
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                self._incr("接口调用超时" if timed_out else "接口调用出错")
+                if attempt + 1 >= attempts or not breaker.allow():
+                    raise OneBotCallError(f"调用{action}失败：{e!r}") from e
+                self._incr("接口重试")
+                delay = min(5.0, 0.5 * 2**attempt) * random.uniform(0.5, 1.5)
+                logger.warning(f"调用{action}失败({e!r})，{delay:.1f}秒后重试")
+                await asyncio.sleep(delay)
+            except BaseException:
+                breaker.record_abort()  # 被取消等，不能让熔断器卡在试探中
+                raise
+            else:
+                breaker.record_success()
+                return result
+
+    def states(self) -> Dict[str, str]:
+        """各bot熔断器的状态，用于运行指标"""
+        return {
+            f"bot{i}": f"{b.state}(连续失败{b.failures}次)"
+            for i, b in enumerate(self._breakers.values(), start=1)
+        }
@@ -0,0 +1,163 @@
+import copy
+import re
+from typing import Dict, FrozenSet, List, Tuple
+
+from .urlfilter import DomainTrie, build_domain_tries
+
+# 支持热重载的配置项，其余配置(限流、熔断、数据库等)仍需重载插件才生效
+RELOADABLE_KEYS = (
+    "superusers",
+    "perm_setting",
+    "ban_time_setting",
+    "night_ban_config",
+    "forbidden_config",
+    "link_filter_config",
+    "clear_member_config",
+    "join_rule_config",
+    "penalty_config",
+    "auto_black",
+    "global_blacklist",
+)
+
+# 未配置违规阶梯时，第1、2、3、4次违规按违禁词禁言时长的这些倍数禁言
+DEFAULT_LADDER_FACTORS = (1, 10, 60, 1440)
+
+
+def compile_words(words: List[str]) -> re.Pattern | None:
+    """把违禁词编译成一个正则，一次扫描查完所有违禁词，长词优先"""
+    words = sorted({str(w) for w in words if str(w)}, key=len, reverse=True)
+    if not words:
+        return None
+    return re.compile("|".join(map(re.escape, words)))
+
+
+class Settings:
+    """
+    由插件配置生成的只读快照。配置变更时生成新的快照并整体替换，
+    同一条消息的处理中先取一次 self.settings 就能看到一致的配置；
+    生成时与上一份快照比较，没变的配置项直接沿用上一份里建好的结构
+    """
+
+    __slots__ = (
+        "raw",
+        "superusers",
+        "perms",
+        "ban_rand_time_min",
+        "ban_rand_time_max",
+        "night_start_time",
+        "night_end_time",
+        "forbidden_words",
+        "forbidden_matcher",
+        "forbidden_words_group",
+        "forbidden_words_ban_time",
+        "image_hash_distance",
+        "link_filter_groups",
+        "link_tries",
+        "clear_member_config",
+        "clear_member_whitelist",
+        "join_min_level",
+        "join_min_age_days",
+        "join_below_threshold",
+        "ban_ladder",
+        "decay_seconds",
+        "auto_black",
+        "global_blacklist",
+    )
+
+    def __init__(
+        self, config: Dict, admins: List[str], previous: "Settings | None" = None
+    ):
+        self.raw: Dict = {
+            key: copy.deepcopy(config[key]) for key in RELOADABLE_KEYS if key in config
+        }
+        self.raw["admins_id"] = list(admins)
+        config = self.raw  # 以下都从深拷贝的副本里取，快照不受原配置后续修改的影响
+
+        # 额外超级管理员列表(自动去除重复项)
+        self.superusers: List[str] = list(
+            {str(u) for u in [*(config.get("superusers") or []), *admins]}
+        )
+        # 权限配置
+        self.perms: Dict = config.get("perm_setting", {})
+
+        ban_time_setting: Dict = config.get("ban_time_setting", {})
+        self.ban_rand_time_min: int = ban_time_setting.get(
+            "ban_rand_time_min", 30
+        )  # 随机禁言时的最小时长(秒)
+        self.ban_rand_time_max: int = ban_time_setting.get(
+            "ban_rand_time_max", 300
+        )  # 随机禁言时的最大时长(秒)
+
+        night_ban_config: Dict = config.get("night_ban_config", {})
+        self.night_start_time: str = night_ban_config.get(
+            "night_start_time", "23:30"
+        )  # 默认的宵禁开始时间
+        self.night_end_time: str = night_ban_config.get(
+            "night_end_time", "6:00"
+        )  # 默认的宵禁结束时间
+
+        forbidden_config: Dict = config.get("forbidden_config", {})
+        self.forbidden_words: List[str] = forbidden_config.get(
+            "forbidden_words", []
+        )  # 违禁词列表
+        self.forbidden_words_group: FrozenSet[str] = frozenset(
+            str(g) for g in forbidden_config.get("forbidden_words_group", [])
+        )  # 检测违禁词的群聊
+        self.forbidden_words_ban_time: int = forbidden_config.get(
+            "forbidden_words_ban_time", 60
+        )  # 违禁词禁言时长(秒)
+        self.image_hash_distance: int = forbidden_config.get(
+            "image_hash_distance", 6
+        )  # 判定为同一张违禁图片的最大哈希距离
+        if previous and previous.forbidden_words == self.forbidden_words:
+            self.forbidden_matcher = previous.forbidden_matcher
+        else:
+            self.forbidden_matcher = compile_words(self.forbidden_words)
+
+        # 违禁链接：按域名拦截，子域名一并拦截，可单独放行
+        link_filter_config: Dict = config.get("link_filter_config", {})
+        self.link_filter_groups: FrozenSet[str] = frozenset(
+            str(g) for g in link_filter_config.get("groups", [])
+        )  # 检测违禁链接的群聊
+        self.link_tries: Dict[str, DomainTrie]
+        if previous and not self.changed(previous, "link_filter_config"):
+            self.link_tries = previous.link_tries
+        else:
+            self.link_tries = build_domain_tries(
+                link_filter_config.get("blocked_domains", []),
+                link_filter_config.get("allowed_domains", []),
+            )
+
+        # 清理群友的筛选条件
+        self.clear_member_config: Dict = config.get("clear_member_config", {})
+        self.clear_member_whitelist: List[str] = [
+            str(u) for u in self.clear_member_config.get("whitelist", [])
+        ]
+
+        # 进群申请门槛：QQ等级、账号注册天数，不满足时转人工或自动拒绝
+        join_rule_config: Dict = config.get("join_rule_config", {})
+        self.join_min_level: int = join_rule_config.get("min_level", 0)
+        self.join_min_age_days: float = join_rule_config.get("min_age_days", 0)
+        self.join_below_threshold: str = join_rule_config.get(
+            "below_threshold", "转人工"
+        )
+
+        # 违规累计：同一群友反复违规时按阶梯加重禁言
+        penalty_config: Dict = config.get("penalty_config", {})
+        # 未配置阶梯时由违禁词禁言时长推出，默认60秒时为 1分钟、10分钟、1小时、1天
+        self.ban_ladder: List = penalty_config.get("ban_ladder") or [
+            self.forbidden_words_ban_time * f for f in DEFAULT_LADDER_FACTORS
+        ]
+        self.decay_seconds: float = penalty_config.get("decay_hours", 24) * 3600
+
+        self.auto_black: bool = config.get("auto_black", True)
+        # 拉黑是否同步到bot管理的所有群
+        self.global_blacklist: bool = config.get("global_blacklist", False)
+
+    def changed(self, other: "Settings", *keys: str) -> bool:
+        """与另一份快照相比，指定的配置项是否有变化"""
+        return any(self.raw.get(key) != other.raw.get(key) for key in keys)
+
+    def diff(self, other: "Settings") -> Tuple[str, ...]:
+        """与另一份快照相比有变化的配置项"""
+        return tuple(key for key in self.raw if self.changed(other, key))
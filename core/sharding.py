@@ -0,0 +1,56 @@
+import bisect
+import functools
+import hashlib
+from typing import Dict, List
+
+
+class HashRing:
+    """
+    一致性哈希环：按群号把群分给 count 个分片，每个分片在环上放 vnodes 个虚拟节点，
+    分片数变化时只有少部分群需要换分片
+    """
+
+    def __init__(self, count: int = 1, index: int = 0, vnodes: int = 64):
+        self.count = max(1, count)
+        self.index = index % self.count  # 本进程负责的分片
+        vnodes = max(1, vnodes)
+        points = sorted(
+            (self._hash(f"shard-{shard}-{v}"), shard)
+            for shard in range(self.count)
+            for v in range(vnodes)
+        )
+        self._keys: List[int] = [p[0] for p in points]
+        self._shards: List[int] = [p[1] for p in points]
+        self._owners: Dict[str, int] = {}
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+    def owner(self, group_id: str | int) -> int:
+        """群所属的分片，私聊(无群号)归0号分片"""
+        group_id = str(group_id or "")
+        if self.count == 1 or not group_id:
+            return 0
+        shard = self._owners.get(group_id)
+        if shard is None:
+            i = bisect.bisect(self._keys, self._hash(group_id)) % len(self._keys)
+            shard = self._owners[group_id] = self._shards[i]
+        return shard
+
+    def owns(self, group_id: str | int) -> bool:
+        """本进程是否负责这个群"""
+        return self.count == 1 or self.owner(group_id) == self.index
+
+
+def shard_only(handler):
+    """命令装饰器：只有负责本群的分片处理，其他分片直接忽略，避免多个进程重复执行"""
+
+    @functools.wraps(handler)
+    async def wrapper(self, event, *args, **kwargs):
+        if not self.shard.owns(event.get_group_id()):
+            return
+        async for result in handler(self, event, *args, **kwargs):
+            yield result
+
+    return wrapper
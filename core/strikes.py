@@ -0,0 +1,81 @@
+import math
+import time
+from typing import Dict, List, Tuple
+
+from astrbot import logger
+
+
+class _Strike:
+    """一个群友的违规记录"""
+
+    __slots__ = ("points", "updated")
+
+    def __init__(self, points: float, updated: float):
+        self.points = points  # 当前违规分，每次违规+1，随时间线性衰减
+        self.updated = updated  # 上次更新时间
+
+
+class StrikeTracker:
+    """
+    按(群号, QQ号)记录违规次数，每过 decay_seconds 秒抵消一次违规，
+    违规次数按阶梯映射为禁言时长，查询与更新都是O(1)，衰减到0的记录会被定期清除
+    """
+
+    EVICT_EVERY = 1024  # 每更新多少次顺带清理一次
+
+    def __init__(self, ladder: List[int], decay_seconds: float = 86400):
+        self.configure(ladder, decay_seconds)
+        self._records: Dict[Tuple[str, str], _Strike] = {}
+        self._ops = 0
+
+    def configure(self, ladder: List[int], decay_seconds: float = 86400):
+        """设置禁言阶梯与衰减速度，已有的违规记录保留"""
+        self.ladder: List[int] = []  # 第n次违规的禁言时长(秒)
+        for t in ladder:
+            try:
+                seconds = int(t)
+            except (TypeError, ValueError):
+                logger.warning(f"违规阶梯里的{t!r}不是秒数，已忽略")
+                continue
+            if seconds > 0:
+                self.ladder.append(seconds)
+        self.decay_seconds = max(1.0, float(decay_seconds))
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _points(self, rec: _Strike, now: float) -> float:
+        return max(0.0, rec.points - (now - rec.updated) / self.decay_seconds)
+
+    def count(self, group_id: str, user_id: str) -> int:
+        """当前的违规次数(已衰减)"""
+        rec = self._records.get((str(group_id), str(user_id)))
+        return math.ceil(self._points(rec, time.time())) if rec else 0
+
+    def hit(self, group_id: str, user_id: str) -> int:
+        """记一次违规，返回衰减后累计的违规次数"""
+        now = time.time()
+        key = (str(group_id), str(user_id))
+        rec = self._records.get(key)
+        if rec:
+            rec.points = self._points(rec, now) + 1
+            rec.updated = now
+        else:
+            rec = self._records[key] = _Strike(1.0, now)
+        self._ops += 1
+        if self._ops % self.EVICT_EVERY == 0:
+            self.evict()
+        return math.ceil(rec.points)
+
+    def penalty(self, count: int, default: int = 0) -> int:
+        """第count次违规对应的禁言时长，超出阶梯按最后一级，未配置阶梯时返回default"""
+        if not self.ladder or count <= 0:
+            return default
+        return self.ladder[min(count, len(self.ladder)) - 1]
+
+    def evict(self):
+        """清除已衰减到0的记录"""
+        now = time.time()
+        idle = [k for k, rec in self._records.items() if not self._points(rec, now)]
+        for key in idle:
+            del self._records[key]
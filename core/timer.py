@@ -0,0 +1,197 @@
+import asyncio
+import heapq
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from astrbot import logger
+
+from .limiter import RateLimiter
+
+TimerHandler = Callable[[dict], Awaitable[Any]]
+
+DURATION_UNITS: Dict[str, int] = {
+    "s": 1,
+    "秒": 1,
+    "m": 60,
+    "分": 60,
+    "分钟": 60,
+    "h": 3600,
+    "时": 3600,
+    "小时": 3600,
+    "d": 86400,
+    "天": 86400,
+}
+
+
+def parse_duration(text: str | int | None) -> int | None:
+    """解析时长，如 90、30m、2h、3天，纯数字按秒计，无法解析返回None"""
+    if text is None:
+        return None
+    match = re.fullmatch(r"(\d+)\s*([a-zA-Z一-龥]*)", str(text).strip())
+    if not match:
+        return None
+    unit = DURATION_UNITS.get(match.group(2).lower() or "s")
+    return int(match.group(1)) * unit if unit else None
+
+
+def format_duration(seconds: int) -> str:
+    """把秒数格式化为 1天2小时3分钟 的形式"""
+    parts = []
+    for name, size in (("天", 86400), ("小时", 3600), ("分钟", 60)):
+        if seconds >= size:
+            parts.append(f"{seconds // size}{name}")
+            seconds %= size
+    if seconds or not parts:
+        parts.append(f"{seconds}秒")
+    return "".join(parts)
+
+
+class TimerService:
+    """
+    共用的定时动作服务。所有待执行的动作放在一个按到期时间排序的最小堆里，
+    由一个后台任务睡到最早的到期时间，到期动作成批取出、经限流器并发执行；
+    动作同时存进SQLite，重启后继续生效
+    """
+
+    RETRY_DELAY = 60  # 执行失败后多久重试(秒)
+    MAX_ATTEMPTS = 5  # 最多尝试次数
+
+    def __init__(
+        self,
+        path: Path,
+        limiter: RateLimiter,
+        accept: Callable[[dict], bool] | None = None,
+    ):
+        self.limiter = limiter
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS timers ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "due REAL NOT NULL, "
+            "kind TEXT NOT NULL, "
+            "payload TEXT NOT NULL)"
+        )
+        self.conn.commit()
+        self._handlers: Dict[str, TimerHandler] = {}
+        self._heap: List[Tuple[float, int, str, dict]] = []  # (到期时间, id, 类型, 参数)
+        self._cancelled: set[int] = set()
+        # 多个进程共用一个库时，accept 筛出归本进程执行的动作
+        for timer_id, due, kind, payload in self.conn.execute("SELECT * FROM timers"):
+            payload = json.loads(payload)
+            if accept is None or accept(payload):
+                self._heap.append((due, timer_id, kind, payload))
+        heapq.heapify(self._heap)
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._heap) - len(self._cancelled)
+
+    def register(self, kind: str, handler: TimerHandler):
+        """注册某类动作的执行函数，handler(payload)"""
+        self._handlers[kind] = handler
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def schedule(self, delay: float, kind: str, payload: dict) -> int:
+        """delay秒后执行一个动作，返回动作ID"""
+        due = time.time() + delay
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO timers (due, kind, payload) VALUES (?, ?, ?)",
+                (due, kind, json.dumps(payload, ensure_ascii=False)),
+            )
+        timer_id: int = cur.lastrowid  # type: ignore
+        heapq.heappush(self._heap, (due, timer_id, kind, payload))
+        if self._heap[0][1] == timer_id:
+            self._wakeup.set()  # 比当前等待的更早，唤醒调度任务
+        return timer_id
+
+    def cancel(self, kind: str, match: Callable[[dict], bool]) -> int:
+        """取消满足条件的动作(堆里惰性删除)，返回取消的数量"""
+        ids = [
+            timer_id
+            for _, timer_id, k, payload in self._heap
+            if k == kind and timer_id not in self._cancelled and match(payload)
+        ]
+        if ids:
+            self._cancelled.update(ids)
+            with self.conn:
+                self.conn.executemany(
+                    "DELETE FROM timers WHERE id = ?", [(i,) for i in ids]
+                )
+        return len(ids)
+
+    def pending(self, kind: str | None = None) -> List[Tuple[float, dict]]:
+        """列出未执行的动作(到期时间, 参数)，按到期时间排序"""
+        return sorted(
+            (due, payload)
+            for due, timer_id, k, payload in self._heap
+            if (kind is None or k == kind) and timer_id not in self._cancelled
+        )
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            batch = []
+            while self._heap and self._heap[0][0] <= now:
+                item = heapq.heappop(self._heap)
+                if item[1] in self._cancelled:
+                    self._cancelled.discard(item[1])
+                else:
+                    batch.append(item)
+            if batch:
+                try:
+                    await self._fire(batch)
+                except Exception as e:
+                    logger.error(f"定时动作执行出错: {e}")
+                continue
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, batch: List[Tuple[float, int, str, dict]]):
+        """并发执行一批到期动作，成功的从库里删掉，失败的稍后重试"""
+        results = await self.limiter.gather(
+            self._call(kind, payload) for _, _, kind, payload in batch
+        )
+        done, retry = [], []
+        for (_, timer_id, kind, payload), result in zip(batch, results):
+            attempts = payload.get("_attempts", 0) + 1
+            if isinstance(result, Exception) and attempts < self.MAX_ATTEMPTS:
+                logger.warning(f"定时动作{kind}执行失败，稍后重试: {result}")
+                retry.append((kind, {**payload, "_attempts": attempts}))
+            elif isinstance(result, Exception):
+                logger.error(f"定时动作{kind}多次执行失败，已放弃: {result}")
+            done.append(timer_id)
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM timers WHERE id = ?", [(i,) for i in done]
+            )
+        for kind, payload in retry:
+            self.schedule(self.RETRY_DELAY, kind, payload)
+
+    async def _call(self, kind: str, payload: dict):
+        handler = self._handlers.get(kind)
+        if not handler:
+            raise ValueError(f"未注册的定时动作类型：{kind}")
+        return await handler(payload)
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.conn.close()
@@ -0,0 +1,100 @@
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# 域名候选：连续的字母、数字、连字符和点，顺带把全角句号当作点。
+# 字符类的最长匹配不会回溯，整条消息只扫一遍
+TOKEN_RE = re.compile(r"[a-z0-9.。-]+", re.IGNORECASE)
+
+
+def extract_hosts(text: str) -> Iterator[str]:
+    """逐个取出文本里像域名的片段(最后一段为字母)，转小写"""
+    for match in TOKEN_RE.finditer(text):
+        token = match.group()
+        if "." not in token and "。" not in token:
+            continue
+        labels = [
+            label.strip("-")
+            for label in token.replace("。", ".").lower().split(".")
+            if label.strip("-")
+        ]
+        if len(labels) >= 2 and labels[-1].isalpha() and len(labels[-1]) >= 2:
+            yield ".".join(labels)
+
+
+class DomainTrie:
+    """
+    按域名标签倒序建的字典树(com -> example -> www)，每个节点可标记为拦截或放行，
+    匹配时取最具体的标记，因此放行 docs.example.com 可以覆盖拦截 example.com，
+    拦截某个域名时其所有子域名一并拦截。查询只和域名的层数有关，与规则数量无关
+    """
+
+    __slots__ = ("_root",)
+
+    _MARK = ""  # 节点上存标记的键，不会与域名标签冲突
+
+    def __init__(self, blocked: Iterable[str] = (), allowed: Iterable[str] = ()):
+        self._root: Dict[str, dict] = {}
+        for domain in blocked:
+            self.add(domain, True)
+        for domain in allowed:
+            self.add(domain, False)
+
+    def add(self, domain: str, blocked: bool = True):
+        labels = domain.strip().strip(".").lower().split(".")
+        if not labels or not labels[0]:
+            return
+        node = self._root
+        for label in reversed(labels):
+            node = node.setdefault(label, {})
+        node[self._MARK] = blocked  # type: ignore
+
+    def match(self, host: str) -> str | None:
+        """域名被拦截时返回命中的规则，否则返回None"""
+        node = self._root
+        verdict, depth = False, 0
+        labels = host.split(".")
+        for i, label in enumerate(reversed(labels), start=1):
+            node = node.get(label)  # type: ignore
+            if node is None:
+                break
+            if self._MARK in node:
+                verdict, depth = node[self._MARK], i  # type: ignore
+        return ".".join(labels[-depth:]) if verdict else None
+
+    def scan(self, text: str) -> Tuple[str, str] | None:
+        """查找文本里第一个被拦截的域名，返回(域名, 命中的规则)"""
+        if not self._root:
+            return None
+        for host in extract_hosts(text):
+            if rule := self.match(host):
+                return host, rule
+        return None
+
+
+def build_domain_tries(blocked: List[str], allowed: List[str]) -> Dict[str, DomainTrie]:
+    """
+    按群生成域名字典树，规则写成 域名 时对所有群生效，写成 群号:域名 时只对该群生效，
+    域名后带的端口(如 example.com:8080)忽略；键""为没有单独规则的群共用的树
+    """
+
+    def split(rules: List[str]) -> Dict[str, List[str]]:
+        by_group: Dict[str, List[str]] = {"": []}
+        for rule in map(str, rules):
+            group_id, _, domain = rule.strip().partition(":")
+            group_id = group_id.strip()
+            if not group_id.isdigit():  # 不带群号，冒号是端口的
+                group_id, domain = "", rule
+            host, _, port = domain.strip().rpartition(":")
+            if host and port.isdigit():
+                domain = host
+            by_group.setdefault(group_id, []).append(domain.strip())
+        return by_group
+
+    blocked_by_group, allowed_by_group = split(blocked), split(allowed)
+    return {
+        group_id: DomainTrie(
+            blocked_by_group[""] + blocked_by_group.get(group_id, []),
+            allowed_by_group[""] + allowed_by_group.get(group_id, []),
+        )
+        for group_id in {"", *blocked_by_group, *allowed_by_group}
+    }
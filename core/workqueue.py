@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Hashable, List
+
+from astrbot import logger
+
+Job = Callable[[], Awaitable]
+
+DROP_OLDEST = "丢弃最旧"
+DROP_NEWEST = "丢弃最新"
+
+
+class _Task:
+    __slots__ = ("key", "job", "enqueued", "essential")
+
+    def __init__(self, key: Hashable | None, job: Job, essential: bool = False):
+        self.key = key  # 合并键，同一群里键相同的待执行任务只保留最新的
+        self.job = job
+        self.enqueued = time.monotonic()
+        self.essential = essential  # 不可丢弃的任务
+
+
+class GroupWorkQueue:
+    """
+    按群排队的后台任务：同一个群的任务严格按提交顺序执行，不同群之间由固定数量的
+    worker并发处理，慢接口只拖慢所在的群。每个群的队列有长度上限，满了按策略丢弃；
+    提交时带合并键的任务会顶替队列里同键的旧任务；不可丢弃的任务(如处理进群申请)
+    队列满了也照常入队，丢弃只针对普通任务
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        depth: int = 50,
+        policy: str = DROP_OLDEST,
+        metrics=None,
+    ):
+        self.workers = max(1, workers)
+        self.depth = max(1, depth)
+        self.policy = policy
+        self.metrics = metrics
+        self._queues: Dict[str, Deque[_Task]] = {}
+        self._scheduled: set[str] = set()  # 已在就绪队列里或正在执行的群
+        self._ready: asyncio.Queue[str] = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self.last_lag = 0.0  # 最近一个任务的排队时长(秒)
+        self.max_lag = 0.0  # 上次查看以来的最大排队时长(秒)
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _incr(self, name: str):
+        if self.metrics:
+            self.metrics.incr(name)
+
+    def submit(
+        self,
+        group_id: str,
+        job: Job,
+        key: Hashable | None = None,
+        essential: bool = False,
+    ) -> bool:
+        """提交任务，被丢弃时返回False"""
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker()) for _ in range(self.workers)
+            ]
+        group_id = str(group_id)
+        queue = self._queues.setdefault(group_id, deque())
+        if key is not None:
+            for task in queue:
+                if task.key == key:
+                    task.job = job
+                    self._incr("群管任务合并")
+                    return True
+        if len(queue) >= self.depth and not essential:
+            victim = None
+            if self.policy == DROP_OLDEST:
+                victim = next((t for t in queue if not t.essential), None)
+            self._incr("群管任务丢弃")
+            if victim is None:
+                return False
+            queue.remove(victim)
+        queue.append(_Task(key, job, essential))
+        if group_id not in self._scheduled:
+            self._scheduled.add(group_id)
+            self._ready.put_nowait(group_id)
+        return True
+
+    async def _worker(self):
+        while True:
+            group_id = await self._ready.get()
+            queue = self._queues[group_id]
+            task = queue.popleft()
+            self.last_lag = time.monotonic() - task.enqueued
+            self.max_lag = max(self.max_lag, self.last_lag)
+            try:
+                await task.job()
+            except Exception as e:
+                logger.error(f"群聊{group_id}的群管任务执行出错: {e}")
+            # 每次只执行一个任务再让出，避免一个群占住worker
+            if queue:
+                self._ready.put_nowait(group_id)
+            else:
+                del self._queues[group_id]
+                self._scheduled.discard(group_id)
+
+    def stats(self) -> str:
+        """排队情况与排队时长，查看后重置最大值"""
+        text = (
+            f"{len(self._queues)}个群排队{len(self)}个任务，"
+            f"最近延迟{self.last_lag * 1000:.0f}ms，最大延迟{self.max_lag * 1000:.0f}ms"
+        )
+        self.max_lag = 0.0
+        return text
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
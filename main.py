@@ -1,5 +1,10 @@
 import asyncio
+import json
+import math
+import os
 import random
+import re
+import time
 import textwrap
 from datetime import datetime
 from pathlib import Path
@@ -18,6 +23,32 @@ from astrbot.core.utils.session_waiter import (
     SessionController,
 )
 from astrbot.core.star.filter.event_message_type import EventMessageType
+from aiocqhttp.exceptions import ActionFailed
+from .core.assets import AssetStore
+from .core.audit import AuditLog
+from .core.blacklist import BlacklistStore
+from .core.bulk import iter_file_tokens, split_tokens, write_lines
+from .core.cache import TTLCache
+from .core.cleanup import MemberTable, select_inactive
+from .core.cron import CronExpr, CronJobStore
+from .core.dedup import TTLSet
+from .core.export import EXPORT_FORMATS, iter_member_rows, prune_files, write_rows
+from .core.groups import GroupRegistry, GroupState
+from .core.images import ImageBlocklist, ImageHasher
+from .core.joinrules import ACCEPT, MANUAL, REJECT, JoinRules
+from .core.limiter import RateLimiter
+from .core.members import MemberCache
+from .core.metrics import Metrics
+from .core.msg_ring import MessageRing
+from .core.pending import PendingRequest, PendingRequestStore
+from .core.profiler import SamplingProfiler
+from .core.replycache import ReplyCache, cached_reply
+from .core.rpc import OneBotCallError, OneBotCaller
+from .core.settings import RELOADABLE_KEYS, Settings
+from .core.sharding import HashRing, shard_only
+from .core.strikes import StrikeTracker
+from .core.timer import TimerService, format_duration, parse_duration
+from .core.workqueue import DROP_OLDEST, GroupWorkQueue
 
 
 BAN_ME_QUOTES: List[str] = [
@@ -29,9 +60,24 @@ BAN_ME_QUOTES: List[str] = [
     "好好好，禁了",
     "主人你没事吧？",
 ]
+PAGE_SIZE = 10  # 群精华、群公告每页显示的条数
 PLUGIN_DIR = Path(__file__).resolve().parent
 TEMP_DIR = PLUGIN_DIR / "temp"
 TEMP_DIR.mkdir(parents=True, exist_ok=True)
+DATA_DIR = PLUGIN_DIR / "data"
+DATA_DIR.mkdir(parents=True, exist_ok=True)
+EXPORT_DIR = DATA_DIR / "exports"  # 导出的群友信息文件
+EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+EXPORT_MAX_AGE = 86400  # 上传失败留下的导出文件保留多久(秒)
+PROFILE_DIR = DATA_DIR / "profiles"  # 性能剖析的折叠栈文件
+PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+PROFILE_KEEP = 10  # 最多保留几份折叠栈文件
+PROFILE_MAX_AGE = 7 * 86400  # 折叠栈文件保留多久(秒)
+CRON_MISFIRE_GRACE = 600  # 定时任务错过触发时间多久以内仍补发(秒)
+CRON_KINDS = ("公告", "消息")
+CONFIG_POLL_INTERVAL = 5  # 检查配置文件是否变化的间隔(秒)
+SWEEP_TICK = 30  # 检查哪些群到了巡检时间的间隔(秒)
+GLOBAL_SCOPE = "global"  # 共享黑名单的范围名
 
 
 @register(
@@ -45,41 +91,25 @@ class AdminPlugin(Star):
     def __init__(self, context: Context, config: AstrBotConfig):
         super().__init__(context)
         self.config = config
-        # 额外超级管理员列表(自动去除重复项)
-        superusers_set = set(config.get("superusers", []))
-        superusers_set.update(context.get_config().get("admins_id", []))
-        self.superusers = list(superusers_set)
-
-        # 权限配置
-        self.perms: Dict = config.get("perm_setting", {})
-
-        ban_time_setting: Dict = config.get("ban_time_setting", {})
-        self.ban_rand_time_min: int = ban_time_setting.get(
-            "ban_rand_time_min", 30
-        )  # 随机禁言时的最小时长(秒)
-        self.ban_rand_time_max: int = ban_time_setting.get(
-            "ban_rand_time_max", 300
-        )  # 随机禁言时的最大时长(秒)
-
-        night_ban_config = config.get("night_ban_config", {})
-        self.night_start_time: str = night_ban_config.get(
-            "night_start_time", "23:30"
-        )  # 默认的宵禁开始时间
-        self.night_end_time: str = night_ban_config.get(
-            "night_end_time", "6:00"
-        )  # 默认的宵禁结束时间
-
-        forbidden_config = config.get("forbidden_config", {})
-        self.forbidden_words: List[str] = forbidden_config.get(
-            "forbidden_words", []
-        )  # 违禁词列表
-        self.forbidden_words_group: List[str] = forbidden_config.get(
-            "forbidden_words_group", []
-        )  # 检测违禁词的群聊
-        self.forbidden_words_ban_time: int = forbidden_config.get(
-            "forbidden_words_ban_time", 60
-        )  # 违禁词禁言时长(秒)
-        self.scheduler_tasks = {}  # 用于存储每个群组的任务引用
+        # 多进程分片：每个进程只处理一致性哈希分到自己的群，
+        # 共用同一个插件目录时用环境变量区分各进程的分片号
+        shard_config: Dict = config.get("shard_config", {})
+        self.shard = HashRing(
+            count=int(
+                os.environ.get("QQADMIN_SHARD_COUNT") or shard_config.get("count", 1)
+            ),
+            index=int(
+                os.environ.get("QQADMIN_SHARD_INDEX") or shard_config.get("index", 0)
+            ),
+            vnodes=shard_config.get("virtual_nodes", 64),
+        )
+        # 由配置生成的快照(权限表、违禁词匹配器、各类群列表等)，配置变更时整体替换
+        self.settings = Settings(config, context.get_config().get("admins_id", []))
+        # 违规累计：同一群友反复违规时按阶梯加重禁言
+        self.strikes = StrikeTracker(
+            ladder=self.settings.ban_ladder,
+            decay_seconds=self.settings.decay_seconds,
+        )
 
         self.accept_keywords_list: List[dict[str, list[str]]] = config.get(
             "accept_keywords_list", [{}]
@@ -87,17 +117,359 @@ class AdminPlugin(Star):
         self.accept_keywords: dict[str, list[str]] = (
             self.accept_keywords_list[0] if self.accept_keywords_list else {}
         )
-        self.reject_ids_list: List[dict[str, list[str]]] = config.get(
-            "reject_ids_list", [{}]
+        # 只读命令(群精华、群公告、群友信息、进群关键词/黑名单、帮助)的结果缓存，
+        # 相关数据变更时按(群号, 类型)失效
+        self.reply_cache = ReplyCache(ttl=300, maxsize=512)
+        # 进群黑名单，存在独立的数据库里
+        self.blacklist = BlacklistStore(
+            DATA_DIR / "qqadmin.db",
+            on_change=lambda scope: self.reply_cache.invalidate(scope, "进群黑名单"),
+        )
+        self.migrate_reject_ids()
+        # 群管操作日志
+        self.audit = AuditLog(DATA_DIR / "qqadmin.db")
+
+        # 批量调用协议端接口时的限流器
+        rate_limit_config: Dict = config.get("rate_limit_config", {})
+        self.limiter = RateLimiter(
+            rate=rate_limit_config.get("rate", 5),
+            burst=rate_limit_config.get("rate", 5),
+            concurrency=rate_limit_config.get("concurrency", 5),
+        )
+        # 运行指标
+        self.metrics = Metrics()
+        # 近期处理过的事件，用于丢弃协议端重复推送的请求/通知事件
+        self.seen_events = TTLSet(ttl=600, maxsize=4096)
+        self.metrics.gauge("事件去重表大小", lambda: len(self.seen_events))
+        # 协议端接口调用保护：超时、幂等接口重试、熔断
+        rpc_config: Dict = config.get("rpc_config", {})
+        self.rpc = OneBotCaller(
+            metrics=self.metrics,
+            timeout=rpc_config.get("timeout", 10),
+            retries=rpc_config.get("retries", 2),
+            threshold=rpc_config.get("breaker_threshold", 5),
+            cooldown=rpc_config.get("breaker_cooldown", 30),
+        )
+        self.metrics.gauge("协议端熔断器", self.rpc.states)
+        self.metrics.gauge("违规记录数", lambda: len(self.strikes))
+        # 违禁词撤回禁言、进退群处理等群管任务，按群排队后台执行
+        work_queue_config: Dict = config.get("work_queue_config", {})
+        self.work = GroupWorkQueue(
+            workers=work_queue_config.get("workers", 4),
+            depth=work_queue_config.get("depth", 50),
+            policy=work_queue_config.get("overflow_policy", DROP_OLDEST),
+            metrics=self.metrics,
+        )
+        self.metrics.gauge("群管任务队列", self.work.stats)
+        # 各群的运行时状态，首次用到时创建，空闲的群会被清理
+        self.groups = GroupRegistry(configure=self.configure_group)
+        self.metrics.gauge("群状态", self.groups.footprint)
+        # 各群最近消息的索引，用于批量撤回
+        self.message_ring = MessageRing(
+            self.groups, size=config.get("message_ring_size", 200)
+        )
+        self.metrics.gauge("最近消息索引条数", lambda: len(self.message_ring))
+        self.metrics.gauge("命令结果缓存", self.reply_cache.stats)
+        # 群成员信息缓存，权限检查、取昵称都走这里
+        self.members = MemberCache(
+            ttl=config.get("member_cache_ttl", 300), snapshot_ttl=600
+        )
+        self.metrics.gauge("群成员缓存", self.members.stats)
+        # 陌生人信息缓存，进群申请判定等级、注册天数时用
+        self.strangers = TTLCache(ttl=600, maxsize=4096)
+        self.metrics.gauge("陌生人信息缓存", self.strangers.stats)
+        # 启动预热：拉取受管群的bot角色与成员快照，避免冷启动时接口调用扎堆
+        self.warmup_enabled: bool = config.get("warmup_enabled", False)
+        self.warmup_task: asyncio.Task | None = None
+        # 定期巡检受管群：核对全体禁言、bot角色，修正本地状态
+        self.sweep_config: Dict = config.get("sweep_config", {})
+        self.sweep_task: asyncio.Task | None = None
+        self.self_id: str | None = None  # bot自己的QQ号
+        # 共用的HTTP连接池，下载图片等用
+        self.http: aiohttp.ClientSession | None = None
+        # 图片黑名单与图片哈希缓存
+        self.image_blocklist = ImageBlocklist(DATA_DIR / "qqadmin.db")
+        self.image_hasher = ImageHasher(self.download_image)
+        self.metrics.gauge("图片哈希缓存", self.image_hasher.cache.stats)
+        # 进行中的性能剖析，同一时间只允许一个
+        self.profiling = False
+        # 协议端客户端，定时任务等没有事件可用的场景从这里取
+        self.client = None
+        # 定时动作：临时拉黑到期、临时管理员到期等
+        self.timers = TimerService(
+            DATA_DIR / "qqadmin.db",
+            self.limiter,
+            accept=lambda payload: self.shard.owns(payload.get("group_id", "")),
         )
-        self.reject_ids: dict[str, list[str]] = (
-            self.reject_ids_list[0] if self.reject_ids_list else {}
+        self.timers.register("unblacklist", self.on_unblacklist_timer)
+        self.timers.register("cancel_admin", self.on_cancel_admin_timer)
+        # 定时公告/消息：任务存在数据库里，由定时动作服务按cron表达式逐次触发，
+        # 图片预先下载进素材目录，每次发布直接复用
+        self.cron_jobs = CronJobStore(DATA_DIR / "qqadmin.db")
+        self.assets = AssetStore(TEMP_DIR / "assets")
+        self.cron_runs: set[asyncio.Task] = set()
+        self.timers.register("cron_job", self.on_cron_timer)
+        self.metrics.gauge("待执行定时动作", lambda: len(self.timers))
+        # 配置热重载：定期检查配置文件，有变化时重新生成快照
+        self.config_watch_task: asyncio.Task | None = None
+        try:
+            self.timers.start()
+            self.start_config_watch()
+            self.get_client()
+            self.start_warmup()
+            self.start_sweep()
+        except RuntimeError:
+            pass  # 没有运行中的事件循环，等收到第一个事件时再启动
+        # 待处理的进群申请
+        pending_file = (
+            f"pending_requests_{self.shard.index}.json"
+            if self.shard.count > 1
+            else "pending_requests.json"
+        )
+        self.pending_requests = PendingRequestStore(
+            DATA_DIR / pending_file,
+            ttl=config.get("pending_request_ttl", 72) * 3600,
         )
-        self.auto_black: bool = config.get("auto_black", True)
 
         if datetime.today().weekday() == 3:
             self.print_logo()  # 星期四打印 Logo，哈哈哈
 
+    def get_client(self):
+        """获取协议端客户端(带调用保护)，未连接时返回None"""
+        if self.client is None:
+            platform = self.context.get_platform(filter.PlatformAdapterType.AIOCQHTTP)
+            if platform:
+                self.client = platform.get_client()
+        return self.rpc.wrap(self.client) if self.client else None
+
+    def configure_group(self, state: GroupState):
+        """根据配置生成群状态里的派生字段"""
+        settings = self.settings
+        self.reply_cache.invalidate(state.group_id, "进群关键词")
+        state.forbidden_check = state.group_id in settings.forbidden_words_group
+        state.join_rules = JoinRules(
+            self.accept_keywords.get(state.group_id, []),
+            min_level=settings.join_min_level,
+            min_age_days=settings.join_min_age_days,
+            below_threshold=settings.join_below_threshold,
+        )
+        state.link_trie = (
+            settings.link_tries.get(state.group_id, settings.link_tries[""])
+            if state.group_id in settings.link_filter_groups
+            else None
+        )
+
+    def reload_settings(self) -> tuple[str, ...]:
+        """按当前配置重新生成快照，没变的部分沿用旧快照，返回有变化的配置项"""
+        old = self.settings
+        new = Settings(
+            self.config, self.context.get_config().get("admins_id", []), previous=old
+        )
+        changed = new.diff(old)
+        if not changed:
+            return changed
+        # 以下没有await，替换快照与刷新派生结构之间不会有消息插进来
+        self.settings = new
+        # 阶梯可能由违禁词禁言时长推出，比较推出后的结果
+        if (new.ban_ladder, new.decay_seconds) != (old.ban_ladder, old.decay_seconds):
+            self.strikes.configure(new.ban_ladder, new.decay_seconds)
+        if new.changed(
+            old, "forbidden_config", "link_filter_config", "join_rule_config"
+        ):
+            self.groups.refresh()
+        logger.info(f"群管插件配置已热重载：{'、'.join(changed)}")
+        return changed
+
+    def start_config_watch(self):
+        """启动配置文件监视(拿不到配置文件路径时忽略)"""
+        path = getattr(self.config, "config_path", None)
+        if path and self.config_watch_task is None:
+            self.config_watch_task = asyncio.create_task(self.watch_config(Path(path)))
+
+    async def watch_config(self, path: Path):
+        """每隔几秒检查配置文件的修改时间，变化时读入支持热重载的配置项"""
+        mtime = path.stat().st_mtime if path.exists() else 0.0
+        while True:
+            await asyncio.sleep(CONFIG_POLL_INTERVAL)
+            try:
+                new_mtime = path.stat().st_mtime
+                if new_mtime == mtime:
+                    continue
+                mtime = new_mtime
+                data = await asyncio.to_thread(
+                    lambda: json.loads(path.read_text(encoding="utf-8-sig"))
+                )
+                for key in RELOADABLE_KEYS:
+                    if key in data:
+                        self.config[key] = data[key]
+                self.reload_settings()
+                if self.shard.count > 1:
+                    self.merge_accept_keywords(data.get("accept_keywords_list") or [{}])
+            except Exception as e:
+                logger.error(f"群管插件配置热重载失败: {e}")
+
+    def merge_accept_keywords(self, keywords_list: List[dict[str, list[str]]]):
+        """
+        多进程共用配置文件时，合入其他分片改过的进群关键词，本分片的群以内存为准，
+        这样本进程下次保存配置时不会覆盖掉其他进程的修改
+        """
+        others = keywords_list[0] if keywords_list else {}
+        for group_id in list(self.accept_keywords):
+            if not self.shard.owns(group_id) and group_id not in others:
+                del self.accept_keywords[group_id]
+        for group_id, keywords in others.items():
+            if not self.shard.owns(group_id):
+                self.accept_keywords[group_id] = keywords
+        self.config["accept_keywords_list"] = [self.accept_keywords]
+
+    def save_accept_keywords(self):
+        """
+        保存进群关键词。多进程共用配置文件时，保存前先读一遍文件合入其他分片的修改，
+        把后写覆盖先写的窗口缩到读写文件之间
+        """
+        path = getattr(self.config, "config_path", None)
+        if self.shard.count > 1 and path and Path(path).exists():
+            try:
+                data = json.loads(Path(path).read_text(encoding="utf-8-sig"))
+                self.merge_accept_keywords(data.get("accept_keywords_list") or [{}])
+            except Exception as e:
+                logger.error(f"合入其他分片的进群关键词失败: {e}")
+        self.config["accept_keywords_list"] = [self.accept_keywords]
+        self.config.save_config()
+
+    def start_warmup(self):
+        """启动一次后台预热(未开启或已启动时忽略)"""
+        if self.warmup_enabled and self.warmup_task is None and self.client:
+            self.warmup_task = asyncio.create_task(self.warm_up())
+
+    def managed_groups(self) -> set[str]:
+        """配置了违禁词检测、进群关键词或进群黑名单的群"""
+        group_ids = set(self.settings.forbidden_words_group)
+        group_ids.update(self.settings.link_filter_groups)
+        group_ids.update(str(g) for g in self.accept_keywords)
+        group_ids.update(s for s in self.blacklist.scopes() if s != GLOBAL_SCOPE)
+        return {gid for gid in group_ids if self.shard.owns(gid)}
+
+    async def warm_up(self):
+        """经限流器并发拉取受管群的成员列表，顺带缓存bot自身的角色"""
+        client = self.get_client()
+        group_ids = sorted(self.managed_groups())
+        if not client or not group_ids:
+            return
+        start = time.monotonic()
+        results = await self.limiter.gather(
+            self.members.get_snapshot(client, gid) for gid in group_ids
+        )
+        failed = sum(isinstance(r, Exception) for r in results)
+        for gid, r in zip(group_ids, results):
+            if isinstance(r, Exception):
+                logger.warning(f"群聊{gid}预热失败: {r}")
+        logger.info(
+            f"已预热{len(group_ids) - failed}个群的成员信息，"
+            f"失败{failed}个，耗时{time.monotonic() - start:.1f}秒"
+        )
+
+    def start_sweep(self):
+        """启动后台巡检(未开启或已启动时忽略)"""
+        if (
+            self.sweep_config.get("enabled", True)
+            and self.sweep_task is None
+            and self.client
+        ):
+            self.sweep_task = asyncio.create_task(self.sweep_loop())
+
+    async def sweep_loop(self):
+        """每隔一会儿挑出到了巡检时间的群，分批核对"""
+        while True:
+            await asyncio.sleep(SWEEP_TICK)
+            try:
+                await self.sweep_due_groups()
+            except Exception as e:
+                logger.error(f"群状态巡检出错: {e}")
+
+    async def sweep_due_groups(self):
+        """经限流器分批并发巡检，一批做完再做下一批，不和命令抢接口调用"""
+        client = self.get_client()
+        if not client:
+            return
+        if self.self_id is None:
+            self.self_id = str((await client.get_login_info())["user_id"])
+        group_ids = self.managed_groups()
+        group_ids.update(s.group_id for s in self.groups if s.curfew_active())
+        now = time.monotonic()
+        due = [
+            gid for gid in sorted(group_ids) if self.groups.get(gid).next_sweep <= now
+        ]
+        size = max(1, self.sweep_config.get("batch_size", 20))
+        for i in range(0, len(due), size):
+            batch = due[i : i + size]
+            results = await self.limiter.gather(
+                self.reconcile_group(client, gid) for gid in batch
+            )
+            for gid, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"群聊{gid}巡检失败: {result}")
+                    self.schedule_sweep(self.groups.get(gid), active=False)
+            self.metrics.incr("巡检群次", len(batch))
+
+    async def reconcile_group(self, client, group_id: str):
+        """核对一个群的全体禁言状态和bot角色，与本地记录不一致时以协议端为准"""
+        state = self.groups.get(group_id)
+        info = await client.get_group_info(group_id=int(group_id), no_cache=True)
+        member = await self.members.get_member(
+            client, group_id, self.self_id, refresh=True  # type: ignore
+        )
+        changed = False
+        # bot的角色变化：失去管理员时暂停违禁检测、宵禁等需要管理员的功能
+        bot_admin = member.get("role") in ("admin", "owner")
+        if bot_admin != state.bot_admin:
+            state.bot_admin = bot_admin
+            changed = True
+            action = "bot恢复管理员" if bot_admin else "bot失去管理员"
+            logger.warning(f"群聊{group_id}巡检发现{action}")
+            self.audit.record(action, group_id)
+        # 宵禁期间被人手动解除了全体禁言(或反过来)，宵禁任务会按实际状态重新处理
+        whole_ban = self.whole_ban_state(info)
+        curfew = state.curfew_active()
+        if curfew and whole_ban is not None and whole_ban != state.curfew_whole_ban:
+            state.curfew_whole_ban = whole_ban
+            changed = True
+            logger.info(f"群聊{group_id}巡检修正全体禁言状态为{whole_ban}")
+        if changed:
+            self.metrics.incr("巡检修正")
+        active = changed or curfew or state.message_count != state.swept_messages
+        state.swept_messages = state.message_count
+        self.schedule_sweep(state, active)
+
+    def schedule_sweep(self, state: GroupState, active: bool):
+        """排下一次巡检：群有动静时按基础间隔，空闲时间隔逐次加倍直到上限"""
+        interval = self.sweep_config.get("interval", 300)
+        max_interval = max(interval, self.sweep_config.get("max_interval", 3600))
+        if not active and state.sweep_interval:
+            interval = min(state.sweep_interval * 2, max_interval)
+        state.sweep_interval = interval
+        state.next_sweep = time.monotonic() + interval
+
+    @staticmethod
+    def whole_ban_state(info: dict) -> bool | None:
+        """群信息里的全体禁言状态，各协议端字段名不同，取不到时返回None"""
+        for key in ("group_all_shut", "shutup_time_whole", "is_all_shut"):
+            if key in info:
+                return bool(info[key])
+        return None
+
+    def migrate_reject_ids(self):
+        """把旧版存在插件配置里的黑名单一次性迁移到数据库，并清空配置里的数据"""
+        reject_ids_list: List[dict[str, list[str]]] = self.config.get(
+            "reject_ids_list", []
+        )
+        if not reject_ids_list or not reject_ids_list[0]:
+            return
+        count = self.blacklist.migrate(reject_ids_list[0])
+        self.config["reject_ids_list"] = []
+        self.config.save_config()
+        logger.info(f"已将{count}条进群黑名单从插件配置迁移到数据库")
+
     def print_logo(self):
         """打印欢迎 Logo"""
         logo = r"""
@@ -115,14 +487,11 @@ class AdminPlugin(Star):
         print("\033[92m" + logo + "\033[0m")  # 绿色文字
         print("\033[94m欢迎使用群管插件！\033[0m")  # 蓝色文字
 
-    @staticmethod
-    async def get_nickname(event: AiocqhttpMessageEvent, user_id) -> str:
+    async def get_nickname(self, event: AiocqhttpMessageEvent, user_id) -> str:
         """获取指定群友的群昵称或Q名"""
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
-        all_info = await client.get_group_member_info(
-            group_id=int(group_id), user_id=int(user_id)
-        )
+        all_info = await self.members.get_member(client, group_id, user_id)
         nickname = all_info.get("card") or all_info.get("nickname")
         return nickname
 
@@ -138,18 +507,22 @@ class AdminPlugin(Star):
         ]
 
     async def get_perm_level(
-        self, event: AiocqhttpMessageEvent, user_id: str | int
+        self, event: AiocqhttpMessageEvent, user_id: str | int, refresh: bool = True
     ) -> int:
-        """获取指定用户的权限等级，等级0,1,2,3，对应权限分别开放到超管、群主、管理员、成员"""
-        client = event.bot
+        """
+        获取指定用户的权限等级，等级0,1,2,3，对应权限分别开放到超管、群主、管理员、成员。
+        默认实时查询角色，在别处被撤掉管理员或踢出的人不会凭缓存继续用命令；
+        refresh=False 时用成员缓存，只用于bot自身(预热和巡检会刷新)
+        """
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
         if not group_id: #  非群聊
             return 4
-        if str(user_id) in self.superusers:
+        if str(user_id) in self.settings.superusers:
             return 0
-        all_info = await client.get_group_member_info(
-            group_id=int(group_id), user_id=int(user_id), no_cache=True
-        )  # 使用缓存提高效率
+        all_info = await self.members.get_member(
+            client, group_id, user_id, refresh=refresh
+        )
         role = all_info.get("role", "unknown")
         role_to_level: Dict[str, int] = {"owner": 1, "admin": 2, "member": 3}
         level = role_to_level.get(role, 4)  # 默认值4，适用于未知角色
@@ -182,55 +555,66 @@ class AdminPlugin(Star):
         sender_id = event.get_sender_id()
         self_id = event.get_self_id()
 
-        # 检查用户的权限等级
-        user_level_now = await self.get_perm_level(event, user_id=sender_id)
-        at_ids = self.get_ats(event)
-
-        if user_level_now > user_level:
-            return "你没这权限"
+        try:
+            # 检查用户的权限等级
+            user_level_now = await self.get_perm_level(event, user_id=sender_id)
+            at_ids = self.get_ats(event)
 
-        # 检查bot的权限等级
-        bot_level_now = await self.get_perm_level(event, user_id=self_id)
-        if bot_level_now > bot_level:
-            return "我可没这权限"
+            if user_level_now > user_level:
+                return "你没这权限"
 
-        # 获取被at者的权限等级
-        if at_ids:
-            for aid in at_ids:
-                at_level = await self.get_perm_level(event, user_id=aid)
-                if bot_level >= at_level:
-                    return "我动不了这人"
+            # 检查bot的权限等级
+            bot_level_now = await self.get_perm_level(
+                event, user_id=self_id, refresh=False
+            )
+            if bot_level_now > bot_level:
+                return "我可没这权限"
+
+            # 获取被at者的权限等级
+            if at_ids:
+                for aid in at_ids:
+                    at_level = await self.get_perm_level(event, user_id=aid)
+                    if bot_level >= at_level:
+                        return "我动不了这人"
+        except OneBotCallError as e:
+            logger.error(f"权限检查失败: {e}")
+            return "协议端无响应，请稍后再试"
 
         return None  # 权限检查通过，未被阻塞
 
     @filter.command("禁言")
+    @shard_only
     async def set_ban(self, event: AiocqhttpMessageEvent, ban_time = None):
         """禁言 60 @user"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("set_ban_perm")
+            event, user_perm=self.settings.perms.get("set_ban_perm")
         ):
             yield event.plain_result(result)
             return
         group_id = event.get_group_id()
         if not ban_time or not isinstance(ban_time, int):
             ban_time = random.randint(
-                self.ban_rand_time_min, self.ban_rand_time_max
+                self.settings.ban_rand_time_min, self.settings.ban_rand_time_max
             )
         tids = self.get_ats(event)
         for tid in tids:
             try:
-                await event.bot.set_group_ban(
+                await self.rpc.wrap(event.bot).set_group_ban(
                     group_id=int(group_id), user_id=int(tid), duration=ban_time
                 )
-            except:  # noqa: E722
-                pass
+                self.audit.record(
+                    "禁言", group_id, event.get_sender_id(), tid, f"{ban_time}秒"
+                )
+            except Exception as e:
+                logger.warning(f"群聊{group_id}禁言{tid}失败: {e}")
         event.stop_event()
 
     @filter.command("禁我")
+    @shard_only
     async def set_ban_me(self, event: AiocqhttpMessageEvent, ban_time: int | None = None):
         """禁我 60"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("set_ban_me_perm")
+            event, user_perm=self.settings.perms.get("set_ban_me_perm")
         ):
             yield event.plain_result(result)
             return
@@ -238,10 +622,10 @@ class AdminPlugin(Star):
         send_id = event.get_sender_id()
         if not ban_time or not isinstance(ban_time, int):
             ban_time = random.randint(
-                self.ban_rand_time_min, self.ban_rand_time_max
+                self.settings.ban_rand_time_min, self.settings.ban_rand_time_max
             )
         try:
-            await event.bot.set_group_ban(
+            await self.rpc.wrap(event.bot).set_group_ban(
                 group_id=int(group_id), user_id=int(send_id), duration=ban_time
             )
             yield event.plain_result(random.choice(BAN_ME_QUOTES))
@@ -250,150 +634,188 @@ class AdminPlugin(Star):
         event.stop_event()
 
     @filter.command("解禁")
+    @shard_only
     async def cancel_ban(self, event: AiocqhttpMessageEvent):
         """解禁@user"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("cancel_ban_perm")
+            event, user_perm=self.settings.perms.get("cancel_ban_perm")
         ):
             yield event.plain_result(result)
             return
         tids = self.get_ats(event)
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
         for tid in tids:
-            await client.set_group_ban(
-                group_id=int(group_id), user_id=int(tid), duration=0
-            )
+            try:
+                await client.set_group_ban(
+                    group_id=int(group_id), user_id=int(tid), duration=0
+                )
+                self.audit.record("解禁", group_id, event.get_sender_id(), tid)
+            except Exception as e:
+                yield event.plain_result(f"解禁{tid}失败：{e}")
         event.stop_event()
 
     @filter.command("全体禁言")
+    @shard_only
     async def set_whole_ban(self, event: AiocqhttpMessageEvent):
         """全体禁言"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("set_whole_ban_perm")
+            event, user_perm=self.settings.perms.get("set_whole_ban_perm")
         ):
             yield event.plain_result(result)
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
-        await client.set_group_whole_ban(group_id=int(group_id), enable=True)
+        try:
+            await client.set_group_whole_ban(group_id=int(group_id), enable=True)
+        except Exception as e:
+            yield event.plain_result(f"开启全体禁言失败：{e}")
+            return
+        self.audit.record("开启全体禁言", group_id, event.get_sender_id())
         yield event.plain_result("已开启全体禁言")
 
     @filter.command("解除全体禁言")
+    @shard_only
     async def cancel_whole_ban(self, event: AiocqhttpMessageEvent):
         """解除全体禁言"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("cancel_whole_ban_perm")
+            event, user_perm=self.settings.perms.get("cancel_whole_ban_perm")
         ):
             yield event.plain_result(result)
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
-        await client.set_group_whole_ban(group_id=int(group_id), enable=False)
+        try:
+            await client.set_group_whole_ban(group_id=int(group_id), enable=False)
+        except Exception as e:
+            yield event.plain_result(f"解除全体禁言失败：{e}")
+            return
+        self.audit.record("解除全体禁言", group_id, event.get_sender_id())
         yield event.plain_result("已解除全体禁言")
 
     @filter.command("改名")
+    @shard_only
     async def set_card(
         self, event: AiocqhttpMessageEvent, target_card: str | int | None = None
     ):
         """改名 xxx @user"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("set_card_perm")
+            event, user_perm=self.settings.perms.get("set_card_perm")
         ):
             yield event.plain_result(result)
             return
         if not target_card:
             yield event.plain_result("你又不说改什么昵称")
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
         send_id = event.get_sender_id()
         tids = self.get_ats(event) or [send_id]
         for tid in tids:
             target_name = await self.get_nickname(event, user_id=tid)
+            try:
+                await client.set_group_card(
+                    group_id=int(group_id), user_id=int(tid), card=str(target_card)
+                )
+            except Exception as e:
+                yield event.plain_result(f"修改{target_name}的群昵称失败：{e}")
+                continue
             replay = f"已将{target_name}的群昵称改为【{target_card}】"
             yield event.plain_result(replay)
-            await client.set_group_card(
-                group_id=int(group_id), user_id=int(tid), card=str(target_card)
-            )
 
     @filter.command("改我")
+    @shard_only
     async def set_card_me(
         self, event: AiocqhttpMessageEvent, target_card: str | int | None = None
     ):
         """改我 xxx"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("set_card_me_perm")
+            event, user_perm=self.settings.perms.get("set_card_me_perm")
         ):
             yield event.plain_result(result)
             return
         if not target_card:
             yield event.plain_result("你又不说要改成啥昵称")
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
         send_id = event.get_sender_id()
-        await client.set_group_card(
-            group_id=int(group_id), user_id=int(send_id), card=str(target_card)
-        )
+        try:
+            await client.set_group_card(
+                group_id=int(group_id), user_id=int(send_id), card=str(target_card)
+            )
+        except Exception as e:
+            yield event.plain_result(f"修改群昵称失败：{e}")
+            return
         yield event.plain_result(f"已将你的群昵称改为【{target_card}】")
 
     @filter.command("头衔")
+    @shard_only
     async def set_title(
         self, event: AiocqhttpMessageEvent, new_title: str | int | None = None
     ):
         """头衔 xxx @user"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("set_title_perm"), bot_perm="群主"
+            event, user_perm=self.settings.perms.get("set_title_perm"), bot_perm="群主"
         ):
             yield event.plain_result(result)
             return
         if not new_title:
             yield event.plain_result("你又不说给什么头衔")
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
         send_id = event.get_sender_id()
         tids = self.get_ats(event) or [send_id]
         for tid in tids:
             target_name = await self.get_nickname(event, user_id=tid)
+            try:
+                await client.set_group_special_title(
+                    group_id=int(group_id),
+                    user_id=int(tid),
+                    special_title=str(new_title),
+                    duration=-1,
+                )
+            except Exception as e:
+                yield event.plain_result(f"修改{target_name}的头衔失败：{e}")
+                continue
             yield event.plain_result(f"已将{target_name}的头衔改为【{new_title}】")
-            await client.set_group_special_title(
-                group_id=int(group_id),
-                user_id=int(tid),
-                special_title=str(new_title),
-                duration=-1,
-            )
 
     @filter.command("我要头衔")
+    @shard_only
     async def set_title_me(
         self, event: AiocqhttpMessageEvent, new_title: str | int | None = None
     ):
         """我要头衔 xxx"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("set_title_me_perm"), bot_perm="群主"
+            event, user_perm=self.settings.perms.get("set_title_me_perm"), bot_perm="群主"
         ):
             yield event.plain_result(result)
             return
         if not new_title:
             yield event.plain_result("你又不说要什么头衔")
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
         send_id = event.get_sender_id()
-        await client.set_group_special_title(
-            group_id=int(group_id),
-            user_id=int(send_id),
-            special_title=str(new_title),
-            duration=-1,
-        )
+        try:
+            await client.set_group_special_title(
+                group_id=int(group_id),
+                user_id=int(send_id),
+                special_title=str(new_title),
+                duration=-1,
+            )
+        except Exception as e:
+            yield event.plain_result(f"修改头衔失败：{e}")
+            return
         yield event.plain_result(f"已将你的头衔改为【{new_title}】")
 
     @filter.command("踢了")
+    @shard_only
     async def group_kick(self, event: AiocqhttpMessageEvent):
         """踢了@user"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("group_kick_perm")
+            event, user_perm=self.settings.perms.get("group_kick_perm")
         ):
             yield event.plain_result(result)
             return
@@ -401,20 +823,26 @@ class AdminPlugin(Star):
         if not tids:
             yield event.plain_result("你又不说踢了谁")
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
         for tid in tids:
             target_name = await self.get_nickname(event, user_id=tid)
-            await client.set_group_kick(
-                group_id=int(group_id), user_id=int(tid), reject_add_request=False
-            )
+            try:
+                await client.set_group_kick(
+                    group_id=int(group_id), user_id=int(tid), reject_add_request=False
+                )
+            except Exception as e:
+                yield event.plain_result(f"踢出【{tid}-{target_name}】失败：{e}")
+                continue
+            self.audit.record("踢出", group_id, event.get_sender_id(), tid)
             yield event.plain_result(f"已将【{tid}-{target_name}】踢出本群")
 
     @filter.command("拉黑")
+    @shard_only
     async def group_block(self, event: AiocqhttpMessageEvent):
         """拉黑 @user"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("group_block_perm")
+            event, user_perm=self.settings.perms.get("group_block_perm")
         ):
             yield event.plain_result(result)
             return
@@ -422,20 +850,219 @@ class AdminPlugin(Star):
         if not tids:
             yield event.plain_result("你又不说拉黑谁")
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
+        blocked = []  # 本群踢出成功的，只有这些进共享黑名单
         for tid in tids:
             target_name = await self.get_nickname(event, user_id=tid)
-            await client.set_group_kick(
-                group_id=int(group_id), user_id=int(tid), reject_add_request=True
-            )
+            try:
+                await client.set_group_kick(
+                    group_id=int(group_id), user_id=int(tid), reject_add_request=True
+                )
+            except Exception as e:
+                yield event.plain_result(f"拉黑【{tid}-{target_name}】失败：{e}")
+                continue
+            blocked.append(tid)
+            self.audit.record("拉黑", group_id, event.get_sender_id(), tid)
             yield event.plain_result(f"已将【{tid}-{target_name}】踢出本群并拉黑!")
+        if self.settings.global_blacklist and blocked:
+            for tid in self.blacklist.add(GLOBAL_SCOPE, blocked):
+                self.audit.record("共享拉黑", group_id, event.get_sender_id(), tid)
+            self_id = event.get_self_id()
+
+            async def propagate():
+                try:
+                    summary = await self.propagate_block(
+                        client, self_id=self_id, user_ids=blocked, origin=group_id
+                    )
+                except Exception as e:
+                    summary = f"同步拉黑失败：{e}"
+                await event.send(event.plain_result(summary))
+
+            # 群多时同步要很久，放进单独的任务队列，不占用本群的队列，完成后再汇报
+            self.work.submit(GLOBAL_SCOPE, propagate, essential=True)
+            yield event.plain_result("正在把拉黑同步到bot管理的其他群，完成后汇报结果")
+
+    async def propagate_block(
+        self, client, self_id: str, user_ids: list[str], origin: str
+    ) -> str:
+        """
+        把拉黑同步到bot当管理的其他群：在群里的踢出并拒绝再次加群。
+        多进程分片时这里有意不按分片过滤，由发起拉黑的分片同步到所有群
+        """
+        groups = await self.limiter.run(client.get_group_list())
+        group_ids = [
+            str(g["group_id"]) for g in groups if str(g["group_id"]) != origin
+        ]
+
+        async def block_in_group(group_id: str) -> int | None:
+            """返回踢出的人数，bot不是管理时返回None"""
+            bot_info = await self.limiter.run(
+                client.get_group_member_info(
+                    group_id=int(group_id), user_id=int(self_id)
+                )
+            )
+            if bot_info.get("role") not in ("owner", "admin"):
+                return None
+            kicked = 0
+            for uid in user_ids:
+                try:
+                    await self.limiter.run(
+                        client.get_group_member_info(
+                            group_id=int(group_id), user_id=int(uid)
+                        )
+                    )
+                except ActionFailed:
+                    continue  # 不在这个群
+                await self.limiter.run(
+                    client.set_group_kick(
+                        group_id=int(group_id),
+                        user_id=int(uid),
+                        reject_add_request=True,
+                    )
+                )
+                self.audit.record(
+                    "共享拉黑踢出", group_id, self_id, uid, f"源自群{origin}"
+                )
+                kicked += 1
+            return kicked
+
+        results = await asyncio.gather(
+            *(block_in_group(gid) for gid in group_ids), return_exceptions=True
+        )
+        managed = [r for r in results if isinstance(r, int)]
+        failed = sum(isinstance(r, Exception) for r in results)
+        for gid, r in zip(group_ids, results):
+            if isinstance(r, Exception):
+                logger.warning(f"群聊{gid}同步拉黑失败: {r}")
+        summary = (
+            f"已同步拉黑到{len(managed)}个管理的群，"
+            f"其中{sum(1 for r in managed if r)}个群踢出了{sum(managed)}人次"
+        )
+        if failed:
+            summary += f"，{failed}个群同步失败"
+        return summary
+
+    @filter.command("临时拉黑")
+    @shard_only
+    async def temp_block(self, event: AiocqhttpMessageEvent, duration: str = ""):
+        """临时拉黑 1h @user，到期后自动移出黑名单"""
+        if result := await self.perm_block(
+            event, user_perm=self.settings.perms.get("temp_block_perm")
+        ):
+            yield event.plain_result(result)
+            return
+        seconds = parse_duration(duration)
+        if not seconds:
+            yield event.plain_result("请指定拉黑时长，如 30m、2h、3d")
+            return
+        tids = self.get_ats(event)
+        if not tids:
+            yield event.plain_result("你又不说拉黑谁")
+            return
+        client = self.rpc.wrap(event.bot)
+        group_id = event.get_group_id()
+        for tid in tids:
+            target_name = await self.get_nickname(event, user_id=tid)
+            # 不用QQ自带的拒绝加群(无法定时解除)，由进群黑名单负责拒绝
+            try:
+                await client.set_group_kick(
+                    group_id=int(group_id), user_id=int(tid), reject_add_request=False
+                )
+            except Exception as e:
+                yield event.plain_result(f"踢出【{tid}-{target_name}】失败：{e}")
+                continue
+            expires_at = int(time.time()) + seconds
+            if not self.blacklist.add(group_id, [tid], expires_at=expires_at):
+                # 已在永久黑名单里，不排到期动作，免得到期时把永久拉黑也删了
+                yield event.plain_result(
+                    f"已将【{tid}-{target_name}】踢出本群，其已在本群的进群黑名单中"
+                )
+                continue
+            self.timers.cancel(
+                "unblacklist",
+                lambda p: p["group_id"] == group_id and p["user_id"] == tid,
+            )
+            self.timers.schedule(
+                seconds, "unblacklist", {"group_id": group_id, "user_id": tid}
+            )
+            self.audit.record(
+                "临时拉黑",
+                group_id,
+                event.get_sender_id(),
+                tid,
+                format_duration(seconds),
+            )
+            yield event.plain_result(
+                f"已将【{tid}-{target_name}】踢出本群并拉黑{format_duration(seconds)}"
+            )
+
+    async def on_unblacklist_timer(self, payload: dict):
+        """定时动作：临时拉黑到期，移出进群黑名单"""
+        group_id, user_id = payload["group_id"], payload["user_id"]
+        # 期间被改为永久拉黑的不会删除
+        if self.blacklist.remove_expired(group_id, [user_id]):
+            self.audit.record("临时拉黑到期", group_id, target_id=user_id)
+
+    @filter.command("临时管理员")
+    @shard_only
+    async def temp_admin(self, event: AiocqhttpMessageEvent, duration: str = ""):
+        """临时管理员 1d @user，到期后自动取消管理员"""
+        if result := await self.perm_block(
+            event, user_perm=self.settings.perms.get("temp_admin_perm"), bot_perm="群主"
+        ):
+            yield event.plain_result(result)
+            return
+        seconds = parse_duration(duration)
+        if not seconds:
+            yield event.plain_result("请指定管理员时长，如 2h、3d")
+            return
+        tids = self.get_ats(event)
+        if not tids:
+            yield event.plain_result("想设置谁为临时管理员？")
+            return
+        client = self.rpc.wrap(event.bot)
+        group_id = event.get_group_id()
+        for tid in tids:
+            try:
+                await client.set_group_admin(
+                    group_id=int(group_id), user_id=int(tid), enable=True
+                )
+            except Exception as e:
+                yield event.plain_result(f"设置{tid}为管理员失败：{e}")
+                continue
+            self.members.invalidate(group_id, tid)
+            self.timers.cancel(
+                "cancel_admin",
+                lambda p: p["group_id"] == group_id and p["user_id"] == tid,
+            )
+            self.timers.schedule(
+                seconds, "cancel_admin", {"group_id": group_id, "user_id": tid}
+            )
+            chain = [
+                Comp.At(qq=tid),
+                Comp.Plain(text=f"你已被设置为管理员，{format_duration(seconds)}后取消"),
+            ]
+            yield event.chain_result(chain)
+
+    async def on_cancel_admin_timer(self, payload: dict):
+        """定时动作：临时管理员到期，取消管理员"""
+        client = self.get_client()
+        if not client:
+            raise OneBotCallError("协议端未连接")
+        group_id, user_id = payload["group_id"], payload["user_id"]
+        await client.set_group_admin(
+            group_id=int(group_id), user_id=int(user_id), enable=False
+        )
+        self.members.invalidate(group_id, user_id)
+        self.audit.record("临时管理员到期", group_id, target_id=user_id)
 
     @filter.command("设置管理员")
+    @shard_only
     async def set_admin(self, event: AiocqhttpMessageEvent):
         """设置管理员@user"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("set_admin_perm"), bot_perm="群主"
+            event, user_perm=self.settings.perms.get("set_admin_perm"), bot_perm="群主"
         ):
             if result == "我动不了这人":
                 yield event.plain_result("哇，尊贵的超管大人！我将越权为您服务！")
@@ -446,22 +1073,28 @@ class AdminPlugin(Star):
         if not tids:
             yield event.plain_result("想设置谁为管理员？")
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
         send_id = event.get_sender_id()
         tids = self.get_ats(event) or [send_id]
         for tid in tids:
-            await client.set_group_admin(
-                group_id=int(group_id), user_id=int(tid), enable=True
-            )
+            try:
+                await client.set_group_admin(
+                    group_id=int(group_id), user_id=int(tid), enable=True
+                )
+            except Exception as e:
+                yield event.plain_result(f"设置{tid}为管理员失败：{e}")
+                continue
+            self.members.invalidate(group_id, tid)
             chain = [Comp.At(qq=tid), Comp.Plain(text="你已被设置为管理员")]
             yield event.chain_result(chain)
 
     @filter.command("取消管理员")
+    @shard_only
     async def cancel_admin(self, event: AiocqhttpMessageEvent):
         """取消管理员@user"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("cancel_admin_perm"), bot_perm="群主"
+            event, user_perm=self.settings.perms.get("cancel_admin_perm"), bot_perm="群主"
         ):
             if result == "我动不了这人":
                 yield event.plain_result("哇，尊贵的超管大人！我将越权为您服务！")
@@ -472,82 +1105,170 @@ class AdminPlugin(Star):
         if not tids:
             yield event.plain_result("想取消谁的管理员身份？")
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
         send_id = event.get_sender_id()
         tids = self.get_ats(event) or [send_id]
         for tid in tids:
-            await client.set_group_admin(
-                group_id=int(group_id), user_id=int(tid), enable=False
-            )
+            try:
+                await client.set_group_admin(
+                    group_id=int(group_id), user_id=int(tid), enable=False
+                )
+            except Exception as e:
+                yield event.plain_result(f"取消{tid}的管理员失败：{e}")
+                continue
+            self.members.invalidate(group_id, tid)
             chain = [Comp.At(qq=tid), Comp.Plain(text="你的管理员身份已被取消")]
             yield event.chain_result(chain)
 
     @filter.command("设精", alias={"设置群精华"})
+    @shard_only
     async def set_essence(self, event: AiocqhttpMessageEvent):
         """将引用消息添加到群精华"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("set_essence_perm")
+            event, user_perm=self.settings.perms.get("set_essence_perm")
         ):
             yield event.plain_result(result)
             return
         chain = event.get_messages()
         first_seg = chain[0]
         if isinstance(first_seg, Comp.Reply):
-            client = event.bot
+            client = self.rpc.wrap(event.bot)
             reply_id = first_seg.id
             try:
                 await client.set_essence_msg(message_id=int(reply_id))
+                self.reply_cache.invalidate(event.get_group_id(), "essence")
                 yield event.plain_result("设了")
             except:  # noqa: E722
                 yield event.plain_result("我可设置不了群精华")
 
     @filter.command("取精", alias={"取消群精华"})
+    @shard_only
     async def cancel_essence(self, event: AiocqhttpMessageEvent):
         """将引用消息移出群精华"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("cancel_essence_perm")
+            event, user_perm=self.settings.perms.get("cancel_essence_perm")
         ):
             yield event.plain_result(result)
             return
         chain = event.get_messages()
         first_seg = chain[0]
         if isinstance(first_seg, Comp.Reply):
-            client = event.bot
+            client = self.rpc.wrap(event.bot)
             reply_id = first_seg.id
             try:
                 await client.delete_essence_msg(message_id=int(reply_id))
+                self.reply_cache.invalidate(event.get_group_id(), "essence")
                 yield event.plain_result("取消了")
             except:  # noqa: E722
                 yield event.plain_result("我可取消不了群精华")
 
     @filter.command("群精华")
-    async def get_essence_msg_list(self, event: AiocqhttpMessageEvent):
-        """查看群精华"""
+    @shard_only
+    async def get_essence_msg_list(self, event: AiocqhttpMessageEvent, page: int = 1):
+        """查看群精华 页码"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("get_essence_msg_list_perm")
+            event, user_perm=self.settings.perms.get("get_essence_msg_list_perm")
         ):
             yield event.plain_result(result)
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
-        essence_data = await client.get_essence_msg_list(group_id=group_id)
-        yield event.plain_result(f"{essence_data}")
+        try:
+            url = await self.render_paged(
+                "essence",
+                group_id,
+                page,
+                fetch=lambda: client.get_essence_msg_list(group_id=int(group_id)),
+                format_item=self.format_essence,
+                title="群精华",
+            )
+        except (OneBotCallError, ActionFailed) as e:
+            yield event.plain_result(f"获取群精华失败：{e}")
+            return
+        if not url:
+            yield event.plain_result("本群还没有群精华")
+            return
+        yield event.image_result(url)
         event.stop_event()
-        # TODO 做张好看的图片来展示
+
+    async def render_paged(
+        self,
+        kind: str,
+        group_id: str,
+        page: int,
+        fetch,
+        format_item,
+        title: str,
+    ) -> str | None:
+        """
+        把列表数据分页渲染成图片。数据和已渲染的页面都进命令结果缓存，
+        缓存有效期内重复查看不再调用接口、不再渲染，列表为空时返回None
+        """
+
+        async def fetch_items():
+            return await fetch() or []
+
+        items = await self.reply_cache.get((group_id, kind), fetch_items)
+        if not items:
+            return None
+        total_pages = math.ceil(len(items) / PAGE_SIZE)
+        page = min(max(1, page), total_pages)
+
+        async def render():
+            chunk = items[(page - 1) * PAGE_SIZE : page * PAGE_SIZE]
+            text = (
+                f"【{title}】第{page}/{total_pages}页，共{len(items)}条\n\n"
+                + "\n\n\n".join(format_item(item) for item in chunk)
+            )
+            return await self.text_to_image(text)
+
+        return await self.reply_cache.get((group_id, kind, page), render)
+
+    @staticmethod
+    def format_essence(essence: dict) -> str:
+        """格式化一条群精华"""
+        parts = []
+        for seg in essence.get("content", []):
+            seg_type = seg.get("type")
+            if seg_type == "text":
+                parts.append(seg.get("data", {}).get("text", ""))
+            elif seg_type == "image":
+                parts.append("[图片]")
+            elif seg_type == "face":
+                parts.append("[表情]")
+            else:
+                parts.append(f"[{seg_type}]")
+        operator_time = datetime.fromtimestamp(
+            essence.get("operator_time", 0)
+        ).strftime("%Y-%m-%d %H:%M")
+        return (
+            f"【{operator_time}】{essence.get('sender_nick')}"
+            f"({essence.get('sender_id')})，由{essence.get('operator_nick')}设精\n\n"
+            f"{textwrap.indent(''.join(parts), '    ')}"
+        )
 
     @filter.command("撤回")
+    @shard_only
     async def delete_msg(self, event: AiocqhttpMessageEvent):
-        """撤回 引用的消息 和 发送的消息"""
+        """撤回 引用的消息 和 发送的消息；撤回 @user 10 批量撤回某人最近的消息"""
+        if self.get_ats(event):
+            if result := await self.perm_block(
+                event, user_perm=self.settings.perms.get("delete_recent_msg_perm")
+            ):
+                yield event.plain_result(result)
+                return
+            yield event.plain_result(await self.recall_recent(event))
+            return
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("delete_msg_perm"), bot_perm="成员"
+            event, user_perm=self.settings.perms.get("delete_msg_perm"), bot_perm="成员"
         ):
             yield event.plain_result(result)
             return
         chain = event.get_messages()
         first_seg = chain[0]
         if isinstance(first_seg, Comp.Reply):
-            client = event.bot
+            client = self.rpc.wrap(event.bot)
             try:
                 reply_id = first_seg.id
                 await client.delete_msg(message_id=int(reply_id))
@@ -560,94 +1281,283 @@ class AdminPlugin(Star):
             except:  # noqa: E722
                 event.stop_event()
 
+    @filter.command("撤回最近")
+    @shard_only
+    async def delete_recent_msg(self, event: AiocqhttpMessageEvent):
+        """撤回最近 10 (@user)，批量撤回本群(或指定群友)最近的消息"""
+        if result := await self.perm_block(
+            event, user_perm=self.settings.perms.get("delete_recent_msg_perm")
+        ):
+            yield event.plain_result(result)
+            return
+        yield event.plain_result(await self.recall_recent(event))
+
+    async def recall_recent(self, event: AiocqhttpMessageEvent) -> str:
+        """从最近消息索引里找出消息ID，并发撤回，不调用历史消息接口"""
+        args = event.message_str.split()[1:]
+        count = next((int(arg) for arg in reversed(args) if arg.isdigit()), 10)
+        count = min(count, 100)
+        group_id = event.get_group_id()
+        sender_id = next(iter(self.get_ats(event)), None)
+        message_ids = self.message_ring.recent(
+            group_id, count, sender_id=sender_id, exclude=event.message_obj.message_id
+        )
+        if not message_ids:
+            return "没有可撤回的消息"
+        client = self.rpc.wrap(event.bot)
+        results = await self.limiter.gather(
+            client.delete_msg(message_id=int(message_id)) for message_id in message_ids
+        )
+        self.message_ring.discard(group_id, message_ids)
+        recalled = sum(not isinstance(r, Exception) for r in results)
+        self.audit.record(
+            "批量撤回",
+            group_id,
+            event.get_sender_id(),
+            sender_id or "",
+            f"{recalled}条",
+        )
+        reply = f"已撤回{recalled}条消息"
+        if recalled < len(message_ids):
+            reply += f"，{len(message_ids) - recalled}条撤回失败"
+        return reply
+
+    @filter.event_message_type(EventMessageType.GROUP_MESSAGE)
+    async def record_group_message(self, event: AiocqhttpMessageEvent):
+        """把群消息记入最近消息索引"""
+        if not self.shard.owns(event.get_group_id()):
+            return
+        self.groups.get(event.get_group_id()).message_count += 1
+        self.message_ring.add(
+            event.get_group_id(),
+            event.message_obj.message_id,
+            event.get_sender_id(),
+            event.message_obj.timestamp,
+        )
+
     @filter.event_message_type(EventMessageType.GROUP_MESSAGE)
     async def check_forbidden_words(self, event: AiocqhttpMessageEvent):
         """
-        自动检测违禁词，并撤回消息，禁言发送者，注意要给bot设置管理员权限
+        自动检测违禁词和违禁链接，并撤回消息，禁言发送者，注意要给bot设置管理员权限
         """
         group_id = event.get_group_id()
-        # 如果群聊不在检测列表中，则不进行检测
-        if group_id not in self.forbidden_words_group:
-            return
-        # 检测违禁词
-        for word in self.forbidden_words:
-            message_str = event.get_message_str()
-            if word in message_str:
-                yield event.plain_result("你的消息包含有违禁词！")
-                client = event.bot
-                # 撤回消息
-                try:
-                    message_id = event.message_obj.message_id
-                    await client.delete_msg(message_id=int(message_id))
-                except:  # noqa: E722
-                    pass
-                # 禁言发送者
-                if self.forbidden_words_ban_time > 0:
-                    send_id = event.get_sender_id()
-                    try:
-                        await client.set_group_ban(
-                            group_id=int(group_id),
-                            user_id=int(send_id),
-                            duration=self.forbidden_words_ban_time,
-                        )
-                    except:  # noqa: E722
-                        pass
-                break
+        if not self.shard.owns(group_id):
+            return
+        state = self.groups.get(group_id)
+        # 如果群聊不在检测列表中，或bot已不是管理员(撤回、禁言都做不了)，则不进行检测
+        if not state.forbidden_check and state.link_trie is None:
+            return
+        if not state.bot_admin:
+            return
+        message_str = event.get_message_str()
+        # 检测违禁词，所有违禁词编译成一个正则，一次扫描
+        matcher = self.settings.forbidden_matcher
+        if state.forbidden_check and matcher and (match := matcher.search(message_str)):
+            if reply := self.punish(event, "违禁词", match.group()):
+                yield event.plain_result(reply)
+            return
+        # 检测违禁链接
+        if state.link_trie is not None and (hit := state.link_trie.scan(message_str)):
+            host, rule = hit
+            if reply := self.punish(event, "违禁链接", f"{host}(规则：{rule})"):
+                yield event.plain_result(reply)
+
+    @filter.event_message_type(EventMessageType.GROUP_MESSAGE)
+    async def check_forbidden_images(self, event: AiocqhttpMessageEvent):
+        """检测图片黑名单：按图片哈希查找相似的违禁图片，处理方式同违禁词"""
+        group_id = event.get_group_id()
+        if not len(self.image_blocklist) or not self.shard.owns(group_id):
+            return
+        state = self.groups.get(group_id)
+        if not state.forbidden_check or not state.bot_admin:
+            return
+        images = [
+            seg
+            for seg in event.get_messages()
+            if isinstance(seg, Comp.Image) and seg.url
+        ]
+        if images:
+            # 下载图片较慢，放进本群的任务队列，不阻塞消息处理
+            self.work.submit(group_id, lambda: self.scan_images(event, images))
+
+    async def scan_images(self, event: AiocqhttpMessageEvent, images: list):
+        """逐张计算图片哈希并查找图片黑名单，命中第一张即处理"""
+        group_id = event.get_group_id()
+        for seg in images:
+            # 按file id缓存哈希，同一张图片反复刷屏时不再下载
+            value = await self.image_hasher.hash(seg.file or seg.url, seg.url)
+            if value is None:
+                continue
+            dist = self.image_blocklist.match(
+                group_id, value, self.settings.image_hash_distance
+            )
+            if dist is None:
+                continue
+            if reply := self.punish(event, "违禁图片", f"相似度距离{dist}"):
+                await self.rpc.wrap(event.bot).send_group_msg(
+                    group_id=int(group_id), message=reply
+                )
+            break
+
+    def punish(
+        self, event: AiocqhttpMessageEvent, action: str, detail: str
+    ) -> str | None:
+        """
+        违规消息的统一处理：记违规、写日志，撤回和按阶梯禁言放进本群的任务队列，
+        返回给发送者的提示；重复推送的消息返回None
+        """
+        group_id = event.get_group_id()
+        message_id = event.message_obj.message_id
+        # 重复推送的消息已经处理过了
+        if not self.seen_events.add(("message", message_id)):
+            self.metrics.incr("重复事件拦截")
+            return None
+        send_id = event.get_sender_id()
+        self.groups.get(group_id).violation_count += 1
+        strike = self.strikes.hit(group_id, send_id)
+        default_ban_time = self.settings.forbidden_words_ban_time
+        ban_time = (
+            self.strikes.penalty(strike, default_ban_time)
+            if default_ban_time > 0
+            else 0
+        )
+        self.audit.record(
+            action,
+            group_id,
+            event.get_self_id(),
+            send_id,
+            f"{detail}，第{strike}次违规",
+        )
+        # 撤回、禁言放进本群的任务队列，不阻塞消息处理
+        client = self.rpc.wrap(event.bot)
+        self.work.submit(
+            group_id, lambda: self.recall_message(client, group_id, message_id)
+        )
+        # 禁言发送者，时长随违规次数递增，排队中的同一人的禁言合并为最新的一次
+        if ban_time > 0:
+            self.work.submit(
+                group_id,
+                lambda: self.ban_member(client, group_id, send_id, ban_time),
+                key=("ban", send_id),
+            )
+        return f"你的消息包含有{action}！(第{strike}次违规)"
+
+    @staticmethod
+    async def recall_message(client, group_id: str, message_id: int | str):
+        """撤回一条消息，失败只记日志"""
+        try:
+            await client.delete_msg(message_id=int(message_id))
+        except Exception as e:
+            logger.warning(f"群聊{group_id}撤回违禁消息失败: {e}")
+
+    @staticmethod
+    async def ban_member(client, group_id: str, user_id: str, duration: int):
+        """禁言一名群友，失败只记日志"""
+        try:
+            await client.set_group_ban(
+                group_id=int(group_id), user_id=int(user_id), duration=duration
+            )
+        except Exception as e:
+            logger.warning(f"群聊{group_id}禁言{user_id}失败: {e}")
 
     @filter.command("设置群头像")
+    @shard_only
     async def set_group_portrait(self, event: AiocqhttpMessageEvent):
         """(引用图片)设置群头像"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("set_group_portrait_perm")
+            event, user_perm=self.settings.perms.get("set_group_portrait_perm")
         ):
             yield event.plain_result(result)
             return
-        chain = event.get_messages()
-        img_url = None
-        for seg in chain:
-            if isinstance(seg, Comp.Image):
-                img_url = seg.url
-                break
-            elif isinstance(seg, Comp.Reply):
-                if seg.chain:
-                    for reply_seg in seg.chain:
-                        if isinstance(reply_seg, Comp.Image):
-                            img_url = reply_seg.url
-                            break
+        image = self.get_image(event)
+        img_url = image.url if image else None
 
         if not img_url:
             yield event.plain_result("需要引用一张图片")
             return
 
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
-        await client.set_group_portrait(group_id=group_id, file=img_url)
+        try:
+            await client.set_group_portrait(group_id=group_id, file=img_url)
+        except Exception as e:
+            yield event.plain_result(f"群头像更新失败：{e}")
+            return
         yield event.plain_result("群头像更新啦>v<")
 
-    @filter.command("设置群名")
-    async def set_group_name(
-        self, event: AiocqhttpMessageEvent, group_name: str | int | None = None
-    ):
-        """/设置群名 xxx"""
+    @staticmethod
+    def get_image(event: AiocqhttpMessageEvent) -> Comp.Image | None:
+        """取消息里或引用消息里的第一张图片"""
+        for seg in event.get_messages():
+            if isinstance(seg, Comp.Image):
+                return seg
+            elif isinstance(seg, Comp.Reply) and seg.chain:
+                for reply_seg in seg.chain:
+                    if isinstance(reply_seg, Comp.Image):
+                        return reply_seg
+        return None
+
+    @filter.command("加图片黑名单")
+    @shard_only
+    async def add_image_block(self, event: AiocqhttpMessageEvent):
+        """(引用图片)加图片黑名单，本群再有人发相似的图片时按违禁词处理"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("set_group_name_perm")
+            event, user_perm=self.settings.perms.get("add_image_block_perm"), bot_perm="成员"
         ):
             yield event.plain_result(result)
             return
-        if not group_name:
-            yield event.plain_result("你又不说要改成什么群名")
+        image = self.get_image(event)
+        if not image or not image.url:
+            yield event.plain_result("需要引用一张图片")
             return
-
-        client = event.bot
+        value = await self.image_hasher.hash(image.file or image.url, image.url)
+        if value is None:
+            yield event.plain_result("图片下载或识别失败")
+            return
+        group_id = event.get_group_id()
+        if not self.image_blocklist.add(group_id, value):
+            yield event.plain_result("这张图片已在本群的图片黑名单中")
+            return
+        self.audit.record(
+            "加图片黑名单", group_id, event.get_sender_id(), detail=f"{value:016x}"
+        )
+        reply = "已将这张图片加入本群的图片黑名单"
+        if not self.groups.get(group_id).forbidden_check:
+            reply += "，本群未开启违禁词检测，需在插件配置里开启后才会生效"
+        yield event.plain_result(reply)
+
+    @filter.command("设置群名")
+    @shard_only
+    async def set_group_name(
+        self, event: AiocqhttpMessageEvent, group_name: str | int | None = None
+    ):
+        """/设置群名 xxx"""
+        if result := await self.perm_block(
+            event, user_perm=self.settings.perms.get("set_group_name_perm")
+        ):
+            yield event.plain_result(result)
+            return
+        if not group_name:
+            yield event.plain_result("你又不说要改成什么群名")
+            return
+
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
-        await client.set_group_name(group_id=int(group_id), group_name=str(group_name))
+        try:
+            await client.set_group_name(
+                group_id=int(group_id), group_name=str(group_name)
+            )
+        except Exception as e:
+            yield event.plain_result(f"群名更新失败：{e}")
+            return
         yield event.plain_result("群名更新啦>v<")
 
     @filter.command("发布群公告")
+    @shard_only
     async def send_group_notice(self, event: AiocqhttpMessageEvent):
         """(可引用一张图片)/发布群公告 xxx"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("send_group_notice_perm")
+            event, user_perm=self.settings.perms.get("send_group_notice_perm")
         ):
             yield event.plain_result(result)
             return
@@ -655,82 +1565,262 @@ class AdminPlugin(Star):
         if not content:
             yield event.plain_result("你又不说要发什么群公告")
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
-        image_url = ""
         save_path = ""
-        chain = event.get_messages()
-        for seg in chain:
-            if isinstance(seg, Comp.Image):
-                image_url = seg.url
-                break
-            elif isinstance(seg, Comp.Reply):
-                if seg.chain:
-                    for reply_seg in seg.chain:
-                        if isinstance(reply_seg, Comp.Image):
-                            image_url = reply_seg.url
-                            break
-        if image_url:
-            image_bytes = await self.download_image(image_url)
-            if not image_bytes:
+        if image := self.get_image(event):
+            path = await self.save_asset(image)
+            if not path:
                 yield event.plain_result("图片获取失败")
                 return
+            save_path = str(path)
 
-            index = len(list(TEMP_DIR.rglob("*.jpg")))
-            save_path = str(TEMP_DIR / f"{index}.jpg")
-            with open(save_path, "wb") as f:
-                f.write(image_bytes)
-
-        await client._send_group_notice(
-            group_id=group_id, content=content, image=save_path
-        )
+        try:
+            await client._send_group_notice(
+                group_id=group_id, content=content, image=save_path
+            )
+        except Exception as e:
+            yield event.plain_result(f"发布群公告失败：{e}")
+            return
+        self.reply_cache.invalidate(group_id, "notice")
         event.stop_event()
 
     @filter.command("群公告")
-    async def get_group_notice(self, event: AiocqhttpMessageEvent):
-        """查看群公告"""
+    @shard_only
+    async def get_group_notice(self, event: AiocqhttpMessageEvent, page: int = 1):
+        """查看群公告 页码"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("get_group_notice_perm"), bot_perm="成员"
+            event, user_perm=self.settings.perms.get("get_group_notice_perm"), bot_perm="成员"
         ):
             yield event.plain_result(result)
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
-        notices = await client._get_group_notice(group_id=group_id)
+        try:
+            url = await self.render_paged(
+                "notice",
+                group_id,
+                page,
+                fetch=lambda: client._get_group_notice(group_id=group_id),
+                format_item=self.format_notice,
+                title="群公告",
+            )
+        except (OneBotCallError, ActionFailed) as e:
+            yield event.plain_result(f"获取群公告失败：{e}")
+            return
+        if not url:
+            yield event.plain_result("本群还没有群公告")
+            return
+        yield event.image_result(url)
 
-        formatted_messages = []
-        for notice in notices:
-            sender_id = notice["sender_id"]
-            publish_time = datetime.fromtimestamp(notice["publish_time"]).strftime(
-                "%Y-%m-%d %H:%M:%S"
+    @staticmethod
+    def format_notice(notice: dict) -> str:
+        """格式化一条群公告"""
+        sender_id = notice["sender_id"]
+        publish_time = datetime.fromtimestamp(notice["publish_time"]).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        message_text = notice["message"]["text"].replace("&#10;", "\n\n")
+        return (
+            f"【{publish_time}-{sender_id}】\n\n"
+            f"{textwrap.indent(message_text, '    ')}"
+        )
+
+    async def save_asset(self, image: Comp.Image) -> Path | None:
+        """下载图片存进素材目录(同一张图片只存一份)，失败时返回None"""
+        image_bytes = await self.download_image(image.url) if image.url else None
+        if not image_bytes:
+            return None
+        return await asyncio.to_thread(self.assets.put, image_bytes)
+
+    @filter.command("定时任务")
+    @shard_only
+    async def add_cron_job(self, event: AiocqhttpMessageEvent):
+        """(可引用一张图片)/定时任务 公告或消息 分 时 日 月 周 [群号列表或全部] 内容"""
+        if result := await self.perm_block(
+            event, user_perm=self.settings.perms.get("cron_job_perm"), bot_perm="成员"
+        ):
+            yield event.plain_result(result)
+            return
+        args = event.message_str.removeprefix("定时任务").strip().split(maxsplit=7)
+        if len(args) < 7 or args[0] not in CRON_KINDS:
+            yield event.plain_result(
+                "用法：/定时任务 公告或消息 分 时 日 月 周 [群号列表或全部] 内容\n"
+                "如 /定时任务 公告 0 9 * * 1 全部 本周群规……"
             )
-            message_text = notice["message"]["text"].replace("&#10;", "\n\n")
+            return
+        kind, spec = args[0], " ".join(args[1:6])
+        try:
+            cron = CronExpr(spec)
+            cron.next_after(time.time())
+        except ValueError as e:
+            yield event.plain_result(str(e))
+            return
+        group_id = event.get_group_id()
+        # 内容前可写目标群：全部 表示bot所在的所有群，不写则只发本群
+        rest = " ".join(args[6:])
+        target, _, content = rest.partition(" ")
+        if target == "全部":
+            groups = []
+        elif re.fullmatch(r"\d{5,}([,，]\d{5,})*", target) and content:
+            groups = split_tokens(target)
+        else:
+            groups, content = [group_id], rest
+        content = content.strip()
+        if not content:
+            yield event.plain_result("你又不说要发什么")
+            return
+        image_path = ""
+        if image := self.get_image(event):
+            path = await self.save_asset(image)
+            if not path:
+                yield event.plain_result("图片获取失败")
+                return
+            image_path = str(path)
+        job_id = self.cron_jobs.add(
+            cron.spec, kind, groups, content, image_path, event.get_sender_id()
+        )
+        due = self.schedule_cron_job(job_id, cron, group_id)
+        self.audit.record(
+            "添加定时任务", group_id, event.get_sender_id(), detail=f"#{job_id} {cron.spec}"
+        )
+        targets = f"{len(groups)}个群" if groups else "所有群"
+        yield event.plain_result(
+            f"已添加定时{kind}#{job_id}，发往{targets}，"
+            f"下次发送：{datetime.fromtimestamp(due):%Y-%m-%d %H:%M}"
+        )
 
-            formatted_message = (
-                f"【{publish_time}-{sender_id}】\n\n"
-                f"{textwrap.indent(message_text, '    ')}"
+    @filter.command("定时任务列表")
+    @shard_only
+    async def view_cron_jobs(self, event: AiocqhttpMessageEvent):
+        """查看所有定时公告/消息任务"""
+        if result := await self.perm_block(
+            event, user_perm=self.settings.perms.get("cron_job_perm"), bot_perm="成员"
+        ):
+            yield event.plain_result(result)
+            return
+        jobs = self.cron_jobs.list()
+        if not jobs:
+            yield event.plain_result("还没有定时任务")
+            return
+        now = time.time()
+        lines = []
+        for job in jobs:
+            due = datetime.fromtimestamp(CronExpr(job["spec"]).next_after(now))
+            targets = f"{len(job['groups'])}个群" if job["groups"] else "所有群"
+            lines.append(
+                f"#{job['id']} [{job['spec']}] {job['kind']} → {targets}，"
+                f"下次{due:%m-%d %H:%M}\n    {job['content'][:30]}"
+                + ("(带图)" if job["image"] else "")
             )
-            formatted_messages.append(formatted_message)
+        yield event.plain_result("【定时任务】\n" + "\n".join(lines))
 
-        notices_str = "\n\n\n".join(formatted_messages)
-        url = await self.text_to_image(notices_str)
-        yield event.image_result(url)
-        # TODO 做张好看的图片来展示
+    @filter.command("删除定时任务")
+    @shard_only
+    async def remove_cron_job(self, event: AiocqhttpMessageEvent, job_id: int = 0):
+        """/删除定时任务 编号"""
+        if result := await self.perm_block(
+            event, user_perm=self.settings.perms.get("cron_job_perm"), bot_perm="成员"
+        ):
+            yield event.plain_result(result)
+            return
+        job = self.cron_jobs.remove(int(job_id))
+        if not job:
+            yield event.plain_result(f"没有编号为{job_id}的定时任务")
+            return
+        self.timers.cancel("cron_job", lambda p: p["job_id"] == job["id"])
+        # 不再被任务引用的图片过一天后清理
+        await asyncio.to_thread(self.assets.prune, self.cron_jobs.images())
+        self.audit.record(
+            "删除定时任务",
+            event.get_group_id(),
+            event.get_sender_id(),
+            detail=f"#{job['id']} {job['spec']}",
+        )
+        yield event.plain_result(f"已删除定时任务#{job['id']}")
+
+    def schedule_cron_job(self, job_id: int, cron: CronExpr, origin: str) -> float:
+        """按cron表达式排下一次触发，origin为添加任务的群(多进程时决定由哪个分片执行)"""
+        due = cron.next_after(time.time())
+        self.timers.schedule(
+            due - time.time(),
+            "cron_job",
+            {"job_id": job_id, "group_id": origin, "due": due},
+        )
+        return due
+
+    async def on_cron_timer(self, payload: dict):
+        """定时动作：定时任务到点，先排好下一次，再在后台群发"""
+        job = self.cron_jobs.get(payload["job_id"])
+        if not job:
+            return  # 任务已删除
+        self.schedule_cron_job(job["id"], CronExpr(job["spec"]), payload["group_id"])
+        if time.time() - payload.get("due", 0) > CRON_MISFIRE_GRACE:
+            logger.warning(f"定时任务#{job['id']}错过了发送时间，本次跳过")
+            return
+        # 群发要调用很多次接口，不占用定时动作服务的限流名额，单独起任务
+        task = asyncio.create_task(self.run_cron_job(job))
+        self.cron_runs.add(task)
+        task.add_done_callback(self.cron_runs.discard)
+
+    async def run_cron_job(self, job: dict):
+        """经限流器把定时公告/消息发到各个目标群"""
+        client = self.get_client()
+        if not client:
+            logger.warning(f"协议端未连接，定时任务#{job['id']}未发送")
+            return
+        group_ids = job["groups"]
+        if not group_ids:
+            groups = await self.limiter.run(client.get_group_list())
+            group_ids = [str(g["group_id"]) for g in groups]
+        message = [{"type": "text", "data": {"text": job["content"]}}]
+        if job["image"]:
+            file = Path(job["image"]).as_uri()
+            message.append({"type": "image", "data": {"file": file}})
+
+        async def send(group_id: str):
+            if job["kind"] == "公告":
+                await client._send_group_notice(
+                    group_id=group_id, content=job["content"], image=job["image"]
+                )
+                self.reply_cache.invalidate(group_id, "notice")
+            else:
+                await client.send_group_msg(group_id=int(group_id), message=message)
+
+        results = await self.limiter.gather(send(gid) for gid in group_ids)
+        failed = [gid for gid, r in zip(group_ids, results) if isinstance(r, Exception)]
+        for gid, r in zip(group_ids, results):
+            if isinstance(r, Exception):
+                logger.warning(f"定时任务#{job['id']}发往群聊{gid}失败: {r}")
+        self.audit.record(
+            "定时任务",
+            "",
+            job["creator"],
+            detail=f"#{job['id']} 发送{len(group_ids) - len(failed)}个群，"
+            f"失败{len(failed)}个",
+        )
 
     @staticmethod
     def format_join_time(timestamp):
         """格式化时间戳"""
         return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
 
-    @staticmethod
-    async def download_image(url: str) -> bytes | None:
+    def get_http(self) -> aiohttp.ClientSession:
+        """共用的HTTP连接池，首次使用时创建"""
+        if self.http is None or self.http.closed:
+            self.http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=16),
+                timeout=aiohttp.ClientTimeout(total=15),
+            )
+        return self.http
+
+    async def download_image(self, url: str) -> bytes | None:
         """下载图片"""
         url = url.replace("https://", "http://")
         try:
-            async with aiohttp.ClientSession() as client:
-                response = await client.get(url)
-                img_bytes = await response.read()
-                return img_bytes
+            async with self.get_http().get(url) as response:
+                response.raise_for_status()
+                return await response.read()
         except Exception as e:
             logger.error(f"图片下载失败: {e}")
 
@@ -742,13 +1832,16 @@ class AdminPlugin(Star):
         target_end_time,
     ):
         """后台调度器，每 10 秒检查一次宵禁任务条件, 条件满足则执行"""
-        whole_ban_status = False  # 全体禁言状态
+        state = self.groups.get(group_id)
+        state.curfew_whole_ban = False  # 全体禁言状态
         # 进入循环，检查时间
         while True:
             await asyncio.sleep(10)
+            if not state.bot_admin:
+                continue  # bot已不是管理员，开关全体禁言也会失败
             current_time = datetime.now().time()
             if target_start_time <= current_time <= target_end_time:
-                if whole_ban_status is False:
+                if state.curfew_whole_ban is False:
                     try:
                         await client.send_group_msg(
                             group_id=int(group_id),
@@ -757,13 +1850,14 @@ class AdminPlugin(Star):
                         await client.set_group_whole_ban(
                             group_id=int(group_id), enable=True
                         )
-                        whole_ban_status = True
+                        state.curfew_whole_ban = True
+                        self.audit.record("宵禁开始", group_id)
                     except Exception as e:
                         logger.error(f"群聊{group_id}的宵禁开启失败: {e}")
                         continue
 
             else:
-                if whole_ban_status is True:
+                if state.curfew_whole_ban is True:
                     try:
                         await client.send_group_msg(
                             group_id=int(group_id),
@@ -772,12 +1866,14 @@ class AdminPlugin(Star):
                         await client.set_group_whole_ban(
                             group_id=int(group_id), enable=False
                         )
-                        whole_ban_status = False
+                        state.curfew_whole_ban = False
+                        self.audit.record("宵禁结束", group_id)
                     except Exception as e:
                         logger.error(f"群聊{group_id}的宵禁解除失败: {e}")
                         continue
 
     @filter.command("开启宵禁", alias={"设置宵禁"})
+    @shard_only
     async def start_scheduler_loop(
         self,
         event: AiocqhttpMessageEvent,
@@ -786,16 +1882,16 @@ class AdminPlugin(Star):
     ):
         """开启宵禁任务，可设置开启时间和结束时间，重启bot后宵禁任务会被清除"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("start_scheduler_loop_perm")
+            event, user_perm=self.settings.perms.get("start_scheduler_loop_perm")
         ):
             yield event.plain_result(result)
             return
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
 
         # 没有传入时间参数时，使用默认的宵禁时间
-        start_time = input_start_time or self.night_start_time
-        end_time = input_end_time or self.night_end_time
+        start_time = input_start_time or self.settings.night_start_time
+        end_time = input_end_time or self.settings.night_end_time
 
         # 去除空格等，替换中文冒号为英文冒号
         start_time = start_time.strip().replace("：", ":")
@@ -805,12 +1901,13 @@ class AdminPlugin(Star):
         target_start_time = datetime.strptime(start_time, "%H:%M").time()
         target_end_time = datetime.strptime(end_time, "%H:%M").time()
 
-        group_id = event.get_group_id()
-        if group_id in self.scheduler_tasks and self.scheduler_tasks[group_id]:
+        state = self.groups.get(group_id)
+        if state.curfew_active():
             yield event.plain_result("本群已有宵禁任务在运行！")
+            return
 
         # 启动后台任务并保存引用
-        self.scheduler_tasks[group_id] = asyncio.create_task(
+        state.curfew_task = asyncio.create_task(
             self.scheduler_loop(
                 client=client,
                 group_id=group_id,
@@ -818,61 +1915,70 @@ class AdminPlugin(Star):
                 target_end_time=target_end_time,
             )
         )
+        self.audit.record(
+            "开启宵禁", group_id, event.get_sender_id(), detail=f"{start_time}~{end_time}"
+        )
         yield event.plain_result(f"已创建宵禁任务：{start_time}~{end_time}")
 
     @filter.command("关闭宵禁")
+    @shard_only
     async def stop_scheduler_loop(self, event: AiocqhttpMessageEvent):
         """取消宵禁任务"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("stop_scheduler_loop_perm")
+            event, user_perm=self.settings.perms.get("stop_scheduler_loop_perm")
         ):
             yield event.plain_result(result)
             return
         group_id = event.get_group_id()
-        if group_id in self.scheduler_tasks and self.scheduler_tasks[group_id]:
-            self.scheduler_tasks[group_id].cancel()  # 取消后台任务
+        state = self.groups.peek(group_id)
+        if state and state.curfew_active():
+            state.curfew_task.cancel()  # type: ignore # 取消后台任务
             try:
-                await self.scheduler_tasks[group_id]
+                await state.curfew_task  # type: ignore
             except asyncio.CancelledError:
                 pass  # 忽略取消任务时的异常
+            self.audit.record("关闭宵禁", group_id, event.get_sender_id())
             yield event.plain_result("本群的宵禁已取消")
-            self.scheduler_tasks[group_id] = None  # 清理任务引用
+            state.curfew_task = None  # 清理任务引用
         else:
             yield event.plain_result("本群没有宵禁任务在运行")
         event.stop_event()
 
     @filter.command("添加进群关键词")
+    @shard_only
     async def add_accept_keyword(self, event: AiocqhttpMessageEvent):
         """添加自动批准进群的关键词"""
         if result := await self.perm_block(
             event,
-            user_perm=self.perms.get("add_accept_keyword_perm"),
+            user_perm=self.settings.perms.get("add_accept_keyword_perm"),
             bot_perm="管理员",
         ):
             yield event.plain_result(result)
             return
-        message_parts = event.message_str.strip().split(" ")
+        message_parts = split_tokens(event.message_str)
         if len(message_parts) < 2:
             yield event.plain_result("请提供至少一个关键词。")
             return
-        keywords = list(set(message_parts[1:]))
         group_id = event.get_group_id()
-        self.accept_keywords.setdefault(group_id, []).extend(keywords)
-        self.config["accept_keywords_list"] = [self.accept_keywords]
-        self.config.save_config()
+        existing = self.accept_keywords.setdefault(group_id, [])
+        keywords = [k for k in dict.fromkeys(message_parts[1:]) if k not in existing]
+        existing.extend(keywords)
+        self.save_accept_keywords()
+        self.groups.refresh(group_id)
         yield event.plain_result(f"新增进群关键词：{keywords}")
 
     @filter.command("删除进群关键词")
+    @shard_only
     async def remove_accept_keyword(self, event: AiocqhttpMessageEvent):
         """删除自动批准进群的关键词"""
         if result := await self.perm_block(
             event,
-            user_perm=self.perms.get("remove_accept_keyword_perm"),
+            user_perm=self.settings.perms.get("remove_accept_keyword_perm"),
             bot_perm="管理员",
         ):
             yield event.plain_result(result)
             return
-        message_parts = event.message_str.strip().split(" ")
+        message_parts = split_tokens(event.message_str)
         if len(message_parts) < 2:
             yield event.plain_result("请提供至少一个关键词。")
             return
@@ -881,93 +1987,201 @@ class AdminPlugin(Star):
         if group_id not in self.accept_keywords:
             yield event.plain_result("本群没有设置进群关键词")
             return
-        for keyword in keywords:
-            group_accept_keywords = self.accept_keywords[group_id]
-            if keyword in group_accept_keywords:
-                group_accept_keywords.remove(keyword)
-                self.config["accept_keywords_list"] = [self.accept_keywords]
-                self.config.save_config()
+        group_accept_keywords = self.accept_keywords[group_id]
+        if any(k in group_accept_keywords for k in keywords):
+            group_accept_keywords[:] = [
+                k for k in group_accept_keywords if k not in keywords
+            ]
+            self.save_accept_keywords()
+        self.groups.refresh(group_id)
         yield event.plain_result(f"已删进群关键词：{keywords}")
 
     @filter.command("查看进群关键词")
+    @shard_only
     async def view_accept_keywords(self, event: AiocqhttpMessageEvent):
         """查看自动批准进群的关键词"""
         if result := await self.perm_block(
             event,
-            user_perm=self.perms.get("view_accept_keywords_perm"),
+            user_perm=self.settings.perms.get("view_accept_keywords_perm"),
             bot_perm="成员",
         ):
             yield event.plain_result(result)
             return
-        group_id = event.get_group_id()
+        yield event.plain_result(await self.accept_keywords_reply(event.get_group_id()))
+
+    @cached_reply("进群关键词")
+    async def accept_keywords_reply(self, group_id: str) -> str:
         if group_id not in self.accept_keywords:
-            yield event.plain_result("本群没有设置进群关键词")
-            return
-        yield event.plain_result(f"本群的进群关键词：{self.accept_keywords[group_id]}")
+            return "本群没有设置进群关键词"
+        return f"本群的进群关键词：{self.accept_keywords[group_id]}"
 
     @filter.command("添加进群黑名单")
+    @shard_only
     async def add_reject_ids(self, event: AiocqhttpMessageEvent):
         """添加指定ID到进群黑名单"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("add_reject_ids_perm"), bot_perm="管理员"
+            event, user_perm=self.settings.perms.get("add_reject_ids_perm"), bot_perm="管理员"
         ):
             yield event.plain_result(result)
             return
-        message_parts = event.message_str.strip().split(" ")
+        message_parts = split_tokens(event.message_str)
         if len(message_parts) < 2:
-            yield event.plain_result("请提供至少一个关键词。")
+            yield event.plain_result("请提供至少一个QQ号。")
             return
-        reject_ids = list(set(message_parts[1:]))
         group_id = event.get_group_id()
-        self.reject_ids.setdefault(group_id, []).extend(reject_ids)
-        self.config["reject_ids_list"] = [self.reject_ids]
-        self.config.save_config()
-        yield event.plain_result(f"进群黑名单新增ID：{reject_ids}")
+        added = self.blacklist.add(group_id, message_parts[1:])
+        for uid in added:
+            self.audit.record("加入黑名单", group_id, event.get_sender_id(), uid)
+        yield event.plain_result(f"进群黑名单新增ID：{added}")
 
     @filter.command("删除进群黑名单")
+    @shard_only
     async def remove_reject_ids(self, event: AiocqhttpMessageEvent):
         """从进群黑名单中删除指定ID"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("remove_reject_ids_perm"), bot_perm="管理员"
+            event, user_perm=self.settings.perms.get("remove_reject_ids_perm"), bot_perm="管理员"
         ):
             yield event.plain_result(result)
             return
-        message_parts = event.message_str.strip().split(" ")
+        message_parts = split_tokens(event.message_str)
         if len(message_parts) < 2:
-            yield event.plain_result("请提供至少一个关键词。")
+            yield event.plain_result("请提供至少一个QQ号。")
             return
-        reject_ids = list(set(message_parts[1:]))
         group_id = event.get_group_id()
-        if group_id not in self.reject_ids:
-            yield event.plain_result("本群没有设置进群黑名单")
+        removed = self.blacklist.remove(group_id, message_parts[1:])
+        for uid in removed:
+            self.audit.record("移出黑名单", group_id, event.get_sender_id(), uid)
+        if not removed:
+            yield event.plain_result("进群黑名单里没有这些ID")
             return
-        for uid in reject_ids:
-            group_reject_ids = self.reject_ids[group_id]
-            if uid in group_reject_ids:
-                group_reject_ids.remove(uid)
-                self.config["reject_ids_list"] = [self.reject_ids]
-                self.config.save_config()
-        yield event.plain_result(f"已从进群黑名单中删除ID：{reject_ids}")
+        yield event.plain_result(f"已从进群黑名单中删除ID：{removed}")
 
     @filter.command("查看进群黑名单")
+    @shard_only
     async def view_reject_ids(self, event: AiocqhttpMessageEvent):
         """查看进群黑名单"""
         if result := await self.perm_block(
-            event, user_perm=self.perms.get("view_reject_ids_perm"), bot_perm="成员"
+            event, user_perm=self.settings.perms.get("view_reject_ids_perm"), bot_perm="成员"
         ):
             yield event.plain_result(result)
             return
+        yield event.plain_result(await self.reject_ids_reply(event.get_group_id()))
+
+    @cached_reply("进群黑名单")
+    async def reject_ids_reply(self, group_id: str) -> str:
+        total = self.blacklist.count(group_id)
+        if not total:
+            return "本群没有设置进群黑名单"
+        reject_ids = self.blacklist.list(group_id, limit=100)
+        reply = f"本群的进群黑名单(共{total}个)：{reject_ids}"
+        if total > len(reject_ids):
+            reply += f"\n仅显示最早的{len(reject_ids)}个"
+        return reply
+
+    @filter.command("导入进群黑名单")
+    @shard_only
+    async def import_reject_ids(self, event: AiocqhttpMessageEvent, name: str = ""):
+        """(引用文件)导入进群黑名单，或指定插件目录下的文件路径"""
+        if result := await self.perm_block(
+            event, user_perm=self.settings.perms.get("import_reject_ids_perm"), bot_perm="成员"
+        ):
+            yield event.plain_result(result)
+            return
+        path = await self.find_import_file(event, name)
+        if not path:
+            yield event.plain_result("请引用一个文件，或填写插件目录下的文件路径")
+            return
+        tokens = await asyncio.to_thread(lambda: set(iter_file_tokens(path)))
+        ids = {t for t in tokens if t.isdigit()}
         group_id = event.get_group_id()
-        if group_id not in self.accept_keywords:
-            yield event.plain_result("本群没有设置进群黑名单")
+        added = self.blacklist.add(group_id, ids)  # 一个事务写入，已存在的跳过
+        self.audit.record(
+            "导入黑名单", group_id, event.get_sender_id(), detail=f"{len(added)}个"
+        )
+        yield event.plain_result(
+            f"读取到{len(ids)}个QQ号，新增{len(added)}个，"
+            f"已存在{len(ids) - len(added)}个，无效条目{len(tokens) - len(ids)}个"
+        )
+
+    @filter.command("导出进群黑名单")
+    @shard_only
+    async def export_reject_ids(self, event: AiocqhttpMessageEvent):
+        """导出本群的进群黑名单到群文件，每行一个QQ号"""
+        if result := await self.perm_block(
+            event, user_perm=self.settings.perms.get("export_reject_ids_perm"), bot_perm="成员"
+        ):
+            yield event.plain_result(result)
+            return
+        group_id = event.get_group_id()
+        path = EXPORT_DIR / f"群{group_id}进群黑名单_{datetime.now():%Y%m%d_%H%M%S}.txt"
+        count = await asyncio.to_thread(
+            write_lines, path, self.blacklist.list(group_id)
+        )
+        if error := await self.upload_file(event, path):
+            yield event.plain_result(f"已导出{count}个QQ号，但上传群文件失败：{error}")
             return
-        yield event.plain_result(f"本群的进群黑名单：{self.reject_ids[group_id]}")
+        yield event.plain_result(f"已导出{count}个QQ号到群文件：{path.name}")
+
+    @filter.command("导入进群关键词")
+    @shard_only
+    async def import_accept_keywords(
+        self, event: AiocqhttpMessageEvent, name: str = ""
+    ):
+        """(引用文件)导入进群关键词，或指定插件目录下的文件路径"""
+        if result := await self.perm_block(
+            event,
+            user_perm=self.settings.perms.get("import_accept_keywords_perm"),
+            bot_perm="管理员",
+        ):
+            yield event.plain_result(result)
+            return
+        path = await self.find_import_file(event, name)
+        if not path:
+            yield event.plain_result("请引用一个文件，或填写插件目录下的文件路径")
+            return
+        tokens = await asyncio.to_thread(
+            lambda: list(dict.fromkeys(iter_file_tokens(path)))
+        )
+        group_id = event.get_group_id()
+        existing = self.accept_keywords.setdefault(group_id, [])
+        known = set(existing)
+        added = [k for k in tokens if k not in known]
+        if added:
+            existing.extend(added)
+            self.save_accept_keywords()  # 只保存一次
+            self.groups.refresh(group_id)
+        yield event.plain_result(
+            f"读取到{len(tokens)}个关键词，新增{len(added)}个，"
+            f"已存在{len(tokens) - len(added)}个"
+        )
+
+    @filter.command("导出进群关键词")
+    @shard_only
+    async def export_accept_keywords(self, event: AiocqhttpMessageEvent):
+        """导出本群的进群关键词到群文件，每行一个"""
+        if result := await self.perm_block(
+            event,
+            user_perm=self.settings.perms.get("export_accept_keywords_perm"),
+            bot_perm="成员",
+        ):
+            yield event.plain_result(result)
+            return
+        group_id = event.get_group_id()
+        path = EXPORT_DIR / f"群{group_id}进群关键词_{datetime.now():%Y%m%d_%H%M%S}.txt"
+        count = await asyncio.to_thread(
+            write_lines, path, list(self.accept_keywords.get(group_id, []))
+        )
+        if error := await self.upload_file(event, path):
+            yield event.plain_result(f"已导出{count}个关键词，但上传群文件失败：{error}")
+            return
+        yield event.plain_result(f"已导出{count}个关键词到群文件：{path.name}")
 
     @filter.command("同意")
+    @shard_only
     async def agree_add_group(self, event: AiocqhttpMessageEvent, extra: str = ""):
-        """同意申请者进群"""
+        """同意申请者进群(引用申请通知，或指定QQ号)"""
         if result := await self.perm_block(  # noqa: F841
-            event, user_perm=self.perms.get("agree_add_group_perm"), bot_perm="管理员"
+            event, user_perm=self.settings.perms.get("agree_add_group_perm"), bot_perm="管理员"
         ):
             #yield event.plain_result(result) # 忽略权限提醒，防止和relationship插件冲突
             return
@@ -976,10 +2190,11 @@ class AdminPlugin(Star):
             yield event.plain_result(reply)
 
     @filter.command("拒绝", alias={"不同意"})
+    @shard_only
     async def refuse_add_group(self, event: AiocqhttpMessageEvent, extra: str = ""):
-        """拒绝申请者进群"""
+        """拒绝申请者进群(引用申请通知，或指定QQ号)"""
         if result := await self.perm_block(  # noqa: F841
-            event, user_perm=self.perms.get("refuse_add_group_perm"), bot_perm="管理员"
+            event, user_perm=self.settings.perms.get("refuse_add_group_perm"), bot_perm="管理员"
         ):
             # yield event.plain_result(result) # 忽略权限提醒，防止和relationship插件冲突
             return
@@ -987,6 +2202,55 @@ class AdminPlugin(Star):
         if reply:
             yield event.plain_result(reply)
 
+    @filter.command("全部同意")
+    @shard_only
+    async def agree_all_add_group(self, event: AiocqhttpMessageEvent):
+        """同意本群所有待处理的进群申请"""
+        if result := await self.perm_block(
+            event,
+            user_perm=self.settings.perms.get("agree_all_add_group_perm"),
+            bot_perm="管理员",
+        ):
+            yield event.plain_result(result)
+            return
+        reply = await self.approve_all(event=event, approve=True)
+        yield event.plain_result(reply)
+
+    @filter.command("全部拒绝")
+    @shard_only
+    async def refuse_all_add_group(self, event: AiocqhttpMessageEvent, extra: str = ""):
+        """拒绝本群所有待处理的进群申请，可附带拒绝理由"""
+        if result := await self.perm_block(
+            event,
+            user_perm=self.settings.perms.get("refuse_all_add_group_perm"),
+            bot_perm="管理员",
+        ):
+            yield event.plain_result(result)
+            return
+        reply = await self.approve_all(event=event, approve=False, reason=extra)
+        yield event.plain_result(reply)
+
+    @filter.command("查看进群申请")
+    @shard_only
+    async def view_add_requests(self, event: AiocqhttpMessageEvent):
+        """查看本群待处理的进群申请"""
+        if result := await self.perm_block(
+            event,
+            user_perm=self.settings.perms.get("view_add_requests_perm"),
+            bot_perm="成员",
+        ):
+            yield event.plain_result(result)
+            return
+        reqs = self.pending_requests.list_group(event.get_group_id())
+        if not reqs:
+            yield event.plain_result("本群没有待处理的进群申请")
+            return
+        lines = [
+            f"{i}. {req.nickname}({req.user_id})：{req.comment}"
+            for i, req in enumerate(reqs, start=1)
+        ]
+        yield event.plain_result("本群待处理的进群申请：\n" + "\n".join(lines))
+
     @filter.platform_adapter_type(filter.PlatformAdapterType.AIOCQHTTP)
     async def event_monitoring(self, event: AiocqhttpMessageEvent):
         """监听进群/退群事件"""
@@ -995,113 +2259,313 @@ class AdminPlugin(Star):
         ):
             return
         raw_message = event.message_obj.raw_message
+        self.client = event.bot
+        self.self_id = str(event.get_self_id())
+        self.timers.start()
+        self.start_config_watch()
+        self.start_warmup()
+        self.start_sweep()
         # 处理 raw_message
         if not raw_message or not isinstance(raw_message, dict):
             return
-        client = event.bot
-        # 群邀请事件
+        # 其他分片的群交给对应的进程处理
+        if raw_message.get("group_id") and not self.shard.owns(
+            raw_message["group_id"]
+        ):
+            return
+        # 丢弃重复推送的事件，须在调用任何接口、写入任何数据之前
+        event_key = self.event_key(raw_message)
+        if event_key and not self.seen_events.add(event_key):
+            self.metrics.incr("重复事件拦截")
+            return
+        client = self.rpc.wrap(event.bot)
+        # 进群申请，先攒进本群的申请队列，再由本群的任务队列成批处理，
+        # 刷屏式的大量申请会合并成少数几批一起判定
         if (
             raw_message.get("post_type") == "request"
             and raw_message.get("request_type") == "group"
             and raw_message.get("sub_type") == "add"
         ):
-            # 提取信息
-            user_id = str(raw_message.get("user_id", ""))
             group_id = str(raw_message.get("group_id", ""))
-            comment = raw_message.get("comment") or "无"
-            flag = raw_message.get("flag", "")
-            nickname = (await client.get_stranger_info(user_id=int(user_id)))[
-                "nickname"
-            ] or "未知昵称"
-            # 通知群友
-            notice = (
-                f"【收到进群申请】同意吗："
-                f"\nQQ：{user_id}"
+            self.groups.get(group_id).join_queue.append(raw_message)
+            self.work.submit(
+                group_id,
+                lambda: self.handle_join_requests(client, group_id),
+                key="join_requests",
+                essential=True,  # 事件已记为处理过，丢了就不会再处理
             )
-            yield event.plain_result(notice)
 
-            # 自动拒绝
-            if (
-                self.reject_ids
-                and group_id in self.reject_ids
-                and user_id in self.reject_ids[group_id]
-            ):
-                await client.set_group_add_request(
-                    flag=flag, sub_type="add", approve=False, reason="黑名单用户"
-                )
-                yield event.plain_result("黑名单用户，已自动拒绝进群")
-                return
-            # 自动同意
-            elif self.accept_keywords and group_id in self.accept_keywords:
-                for keyword in self.accept_keywords[group_id]:
-                    if keyword.lower() in comment.lower():
-                        await client.set_group_add_request(
-                            flag=flag, sub_type="add", approve=True
-                        )
-                        yield event.plain_result("验证通过，已自动同意进群")
-                        return
+        # 成员变动，使成员缓存失效
+        if raw_message.get("post_type") == "notice" and raw_message.get(
+            "notice_type"
+        ) in ("group_admin", "group_increase", "group_decrease"):
+            self.members.invalidate(
+                raw_message.get("group_id", ""), raw_message.get("user_id", "")
+            )
+            self.reply_cache.invalidate(raw_message.get("group_id", ""), "群友信息")
+            # bot自己被设置/取消管理员，不用等巡检
+            if raw_message.get("notice_type") == "group_admin" and str(
+                raw_message.get("user_id", "")
+            ) == str(raw_message.get("self_id", "")):
+                state = self.groups.get(raw_message.get("group_id", ""))
+                state.bot_admin = raw_message.get("sub_type") == "set"
+
+        # 进群事件，申请可能已被其他管理员直接处理
+        if (
+            raw_message.get("post_type") == "notice"
+            and raw_message.get("notice_type") == "group_increase"
+        ):
+            user_id = str(raw_message.get("user_id", ""))
+            group_id = str(raw_message.get("group_id", ""))
+            if req := self.pending_requests.get_by_user(group_id, user_id):
+                self.pending_requests.remove(req.flag)
 
         # 主动退群事件
         elif (
-            self.auto_black
+            self.settings.auto_black
             and raw_message.get("post_type") == "notice"
             and raw_message.get("notice_type") == "group_decrease"
             and raw_message.get("sub_type") == "leave"
         ):
             user_id = str(raw_message.get("user_id", ""))
             group_id = str(raw_message.get("group_id", ""))
-            nickname = (await client.get_stranger_info(user_id=int(user_id)))[
-                "nickname"
-            ] or "未知昵称"
-            self.reject_ids.setdefault(group_id, []).append(user_id)
-            self.config["reject_ids_list"] = [self.reject_ids]
-            self.config.save_config()
-            yield event.plain_result(f"{nickname}({user_id})主动退群了，已拉进黑名单")
+            self.blacklist.add(group_id, [user_id])
+            self.audit.record("退群拉黑", group_id, target_id=user_id)
+
+            async def announce_leave():
+                nickname = (await client.get_stranger_info(user_id=int(user_id)))[
+                    "nickname"
+                ] or "未知昵称"
+                await client.send_group_msg(
+                    group_id=int(group_id),
+                    message=f"{nickname}({user_id})主动退群了，已拉进黑名单",
+                )
+
+            self.work.submit(group_id, announce_leave)
+
+    async def get_stranger(self, client, user_id: str) -> dict:
+        """获取陌生人信息(带缓存)"""
+        info = self.strangers.get(user_id)
+        if info is None:
+            info = await client.get_stranger_info(user_id=int(user_id))
+            self.strangers.set(user_id, info)
+        return info
+
+    async def handle_join_requests(self, client, group_id: str):
+        """
+        成批处理本群攒下的进群申请：并发拉取申请人信息，按本群编译好的规则逐条判定，
+        黑名单和不满足门槛的自动拒绝，命中关键词的自动同意，其余通知群友并记下申请
+        """
+        state = self.groups.get(group_id)
+        batch, state.join_queue = state.join_queue, []
+        if not batch:
+            return
+        rules: JoinRules = state.join_rules  # type: ignore
+        user_ids = [str(raw.get("user_id", "")) for raw in batch]
+        infos = await self.limiter.gather(
+            self.get_stranger(client, user_id) for user_id in user_ids
+        )
+        requests = []
+        for raw, user_id, info in zip(batch, user_ids, infos):
+            if isinstance(info, Exception):
+                logger.warning(f"获取{user_id}的信息失败: {info}")
+                info = {}
+            comment = raw.get("comment") or "无"
+            decision, reason = rules.classify(
+                user_id, comment, info, self.is_blacklisted(group_id, user_id)
+            )
+            self.metrics.incr(f"进群申请{decision}")
+            req = PendingRequest(
+                flag=raw.get("flag", ""),
+                group_id=group_id,
+                user_id=user_id,
+                nickname=info.get("nickname") or "未知昵称",
+                comment=comment,
+            )
+            requests.append((req, decision, reason))
+
+        # 自动同意/拒绝
+        auto = [(req, d, reason) for req, d, reason in requests if d != MANUAL]
+        results = await self.limiter.gather(
+            client.set_group_add_request(
+                flag=req.flag,
+                sub_type="add",
+                approve=decision == ACCEPT,
+                reason=reason if decision == REJECT else "",
+            )
+            for req, decision, reason in auto
+        )
+        lines = []
+        for (req, decision, reason), result in zip(auto, results):
+            who = f"{req.nickname}({req.user_id})"
+            if isinstance(result, Exception):
+                logger.error(f"群聊{group_id}处理{who}的进群申请失败: {result}")
+                lines.append(f"{who}{decision}失败：{result}")
+                continue
+            if decision == REJECT:
+                self.audit.record(
+                    "自动拒绝进群", group_id, target_id=req.user_id, detail=reason
+                )
+            if reason == "黑名单用户":
+                lines.append(f"黑名单用户{who}申请进群，已自动拒绝")
+            elif decision == REJECT:
+                lines.append(f"{who}{reason}，已自动拒绝进群")
+            else:
+                lines.append(f"{who}验证通过，已自动同意进群")
+
+        # 需要人工处理的申请
+        manual = [req for req, decision, _ in requests if decision == MANUAL]
+        if len(manual) == 1:
+            # 只有一条时单独通知，记下通知的消息ID，供引用通知 /同意 /拒绝 时查找申请
+            req = manual[0]
+            notice = (
+                f"【收到进群申请】同意吗："
+                f"\n昵称：{req.nickname}"
+                f"\nQQ：{req.user_id}"
+                f"\n验证信息：{req.comment}"
+                f"\n(引用本消息回复 /同意 或 /拒绝 <理由>)"
+            )
+            try:
+                result = await client.send_group_msg(
+                    group_id=int(group_id), message=notice
+                )
+                req.notice_id = str(result.get("message_id", ""))
+            except Exception as e:
+                logger.error(f"群聊{group_id}的进群申请通知发送失败: {e}")
+        elif manual:
+            lines.append(f"【收到{len(manual)}条进群申请】")
+            lines.extend(
+                f"{req.nickname}({req.user_id})：{req.comment}" for req in manual
+            )
+            lines.append("(回复 /同意 <QQ号>、/全部同意 或 /全部拒绝 <理由>)")
+        for req in manual:
+            self.pending_requests.add(req)
+        if lines:
+            try:
+                await client.send_group_msg(
+                    group_id=int(group_id), message="\n".join(lines)
+                )
+            except Exception as e:
+                logger.error(f"群聊{group_id}的进群申请处理结果发送失败: {e}")
+
+    def is_blacklisted(self, group_id: str, user_id: str) -> bool:
+        """检查用户是否在本群黑名单或共享黑名单中"""
+        if self.blacklist.contains(group_id, user_id):
+            return True
+        return self.settings.global_blacklist and self.blacklist.contains(GLOBAL_SCOPE, user_id)
 
     @staticmethod
+    def event_key(raw_message: dict) -> tuple | None:
+        """生成请求/通知事件的去重键，其他事件返回None"""
+        post_type = raw_message.get("post_type")
+        if post_type == "request":
+            if flag := raw_message.get("flag"):
+                return ("request", flag)
+        elif post_type == "notice":
+            return (
+                "notice",
+                raw_message.get("notice_type"),
+                raw_message.get("sub_type"),
+                raw_message.get("group_id"),
+                raw_message.get("user_id"),
+                raw_message.get("time"),
+            )
+        return None
+
+    def find_pending_request(
+        self, event: AiocqhttpMessageEvent, extra: str = ""
+    ) -> tuple[PendingRequest | None, str]:
+        """根据引用的申请通知、@的用户或QQ号找到进群申请，返回(申请, 剩余参数)"""
+        group_id = event.get_group_id()
+        chain = event.get_messages()
+        reply_seg = next((seg for seg in chain if isinstance(seg, Comp.Reply)), None)
+        if reply_seg:
+            return self.pending_requests.get_by_notice(reply_seg.id), extra
+        if at_ids := self.get_ats(event):
+            return self.pending_requests.get_by_user(group_id, at_ids[0]), extra
+        if extra.isdigit():
+            return self.pending_requests.get_by_user(group_id, extra), ""
+        return None, extra
+
     async def approve(
-        event: AiocqhttpMessageEvent, extra: str = "", approve: bool = True
+        self, event: AiocqhttpMessageEvent, extra: str = "", approve: bool = True
     ) -> str | None:
         """处理进群申请"""
-        text = ""
-        chain = event.get_messages()
-        reply_seg = next((seg for seg in chain if isinstance(seg, Comp.Reply)), None)
-        if reply_seg and reply_seg.chain:
-            for seg in reply_seg.chain:
-                if isinstance(seg, Comp.Plain):
-                    text = seg.text
-        lines = text.split("\n")
-        if "【收到进群申请】" in text and len(lines) >= 5:
-            nickname = lines[1].split("：")[1]  # 第2行冒号后文本为nickname
-            flag = lines[3].split("：")[1]  # 第4行冒号后文本为flag
-            try:
-                await event.bot.set_group_add_request(
-                    flag=flag, sub_type="add", approve=approve, reason=extra
-                )
-                if approve:
-                    reply = f"已同意{nickname}进群"
-                else:
-                    reply = f"已拒绝{nickname}进群" + (
-                        f"\n理由：{extra}" if extra else ""
-                    )
-                return reply
-            except:  # noqa: E722
-                return "这条申请处理过了或者格式不对"
+        req, reason = self.find_pending_request(event, extra)
+        if not req:
+            return None  # 可能是别的插件的申请通知，不做回应
+        try:
+            await self.rpc.wrap(event.bot).set_group_add_request(
+                flag=req.flag, sub_type="add", approve=approve, reason=reason
+            )
+        except ActionFailed:
+            self.pending_requests.remove(req.flag)
+            return "这条申请处理过了或者已失效"
+        except OneBotCallError as e:
+            # 协议端没响应，申请还留着，稍后可以再处理
+            return f"处理申请失败：{e}"
+        self.pending_requests.remove(req.flag)
+        if approve:
+            return f"已同意{req.nickname}({req.user_id})进群"
+        return f"已拒绝{req.nickname}({req.user_id})进群" + (
+            f"\n理由：{reason}" if reason else ""
+        )
+
+    async def approve_all(
+        self, event: AiocqhttpMessageEvent, approve: bool = True, reason: str = ""
+    ) -> str:
+        """批量处理本群所有待处理的进群申请"""
+        reqs = self.pending_requests.list_group(event.get_group_id())
+        if not reqs:
+            return "本群没有待处理的进群申请"
+        results = await self.limiter.gather(
+            self.rpc.wrap(event.bot).set_group_add_request(
+                flag=req.flag, sub_type="add", approve=approve, reason=reason
+            )
+            for req in reqs
+        )
+        # 调用出错(超时、熔断)的申请留着，稍后可以再处理
+        errors = [r for r in results if isinstance(r, OneBotCallError)]
+        self.pending_requests.remove_many(
+            [
+                req.flag
+                for req, r in zip(reqs, results)
+                if not isinstance(r, OneBotCallError)
+            ]
+        )
+        expired = sum(isinstance(r, Exception) for r in results) - len(errors)
+        action = "同意" if approve else "拒绝"
+        reply = f"已{action}{len(reqs) - expired - len(errors)}条进群申请"
+        if expired:
+            reply += f"，另有{expired}条处理过了或已失效"
+        if errors:
+            reply += f"，{len(errors)}条处理失败({errors[0]})，可稍后再试"
+        return reply
 
     @filter.command("群友信息")
+    @shard_only
     async def get_group_member_list(self, event: AiocqhttpMessageEvent):
         """查看群友信息，人数太多时可能会处理失败"""
         if result := await self.perm_block(
             event,
-            user_perm=self.perms.get("get_group_member_list_perm"),
+            user_perm=self.settings.perms.get("get_group_member_list_perm"),
             bot_perm="成员",
         ):
             yield event.plain_result(result)
             return
         yield event.plain_result("获取中...")
-        client = event.bot
-        group_id = event.get_group_id()
-        members_data = await client.get_group_member_list(group_id=int(group_id))
+        client = self.rpc.wrap(event.bot)
+        try:
+            url = await self.member_list_image(event.get_group_id(), client=client)
+        except (OneBotCallError, ActionFailed) as e:
+            yield event.plain_result(f"获取群成员信息失败：{e}")
+            return
+        yield event.image_result(url)
+
+    @cached_reply("群友信息")
+    async def member_list_image(self, group_id: str, *, client) -> str:
+        """把群成员列表渲染成图片，群成员变动时失效"""
+        members_data = await self.members.get_snapshot(client, group_id)
         info_list = [
             (
                 f"{self.format_join_time(member['join_time'])}："
@@ -1115,17 +2579,87 @@ class AdminPlugin(Star):
         info_str = "进群时间：【等级】QQ-昵称\n\n"
         info_str += "\n\n".join(info_list)
         # TODO 做张好看的图片来展示
-        url = await self.text_to_image(info_str)
-        yield event.image_result(url)
+        return await self.text_to_image(info_str)
+
+    @filter.command("导出群友")
+    @shard_only
+    async def export_group_member(self, event: AiocqhttpMessageEvent, fmt: str = "csv"):
+        """/导出群友 [csv|jsonl]，把群成员信息导出为文件并上传到群文件"""
+        if result := await self.perm_block(
+            event,
+            user_perm=self.settings.perms.get("export_group_member_perm"),
+            bot_perm="成员",
+        ):
+            yield event.plain_result(result)
+            return
+        fmt = fmt.lower()
+        if fmt not in EXPORT_FORMATS:
+            yield event.plain_result(f"仅支持导出为：{'、'.join(EXPORT_FORMATS)}")
+            return
+        client = self.rpc.wrap(event.bot)
+        group_id = event.get_group_id()
+        try:
+            members_data = await self.members.get_snapshot(client, group_id)
+        except Exception as e:
+            yield event.plain_result(f"获取群成员信息失败：{e}")
+            return
+        name = f"群{group_id}成员_{datetime.now():%Y%m%d_%H%M%S}.{fmt}"
+        path = EXPORT_DIR / name
+        count = await asyncio.to_thread(
+            write_rows, path, iter_member_rows(members_data), fmt
+        )
+        if error := await self.upload_file(event, path):
+            yield event.plain_result(f"已导出{count}名群友，但上传群文件失败：{error}")
+            return
+        self.audit.record("导出群友", group_id, event.get_sender_id(), detail=name)
+        yield event.plain_result(f"已导出{count}名群友到群文件：{name}")
+
+    async def upload_file(self, event: AiocqhttpMessageEvent, path: Path) -> str | None:
+        """
+        把导出的文件上传到本群群文件，上传成功后删除本地文件；
+        失败时返回错误信息，本地文件留一段时间备查
+        """
+        group_id = event.get_group_id()
+        try:
+            await self.rpc.wrap(event.bot).upload_group_file(
+                group_id=int(group_id), file=str(path), name=path.name
+            )
+        except Exception as e:
+            logger.error(f"群聊{group_id}上传文件{path.name}失败: {e}")
+            return str(e)
+        finally:
+            await asyncio.to_thread(prune_files, EXPORT_DIR, max_age=EXPORT_MAX_AGE)
+        path.unlink(missing_ok=True)
+        return None
+
+    async def find_import_file(
+        self, event: AiocqhttpMessageEvent, name: str = ""
+    ) -> Path | None:
+        """取消息或引用消息里的文件；没有时按插件目录下的相对路径查找"""
+        for seg in event.get_messages():
+            files = seg.chain if isinstance(seg, Comp.Reply) and seg.chain else [seg]
+            for file_seg in files:
+                if isinstance(file_seg, Comp.File):
+                    return Path(await file_seg.get_file())
+        if name:
+            path = (PLUGIN_DIR / name).resolve()
+            if path.is_relative_to(PLUGIN_DIR) and path.is_file():
+                return path
+        return None
 
     @filter.command("清理群友")
+    @shard_only
     async def clear_group_member(
-        self, event: AiocqhttpMessageEvent, inactive_days: int = 30, under_level: int = 10
+        self,
+        event: AiocqhttpMessageEvent,
+        inactive_days: int = 30,
+        under_level: int = 10,
+        mode: str = "",
     ):
-        """/清理群友 未发言天数 群等级"""
+        """/清理群友 未发言天数 群等级 [预览]"""
         if result := await self.perm_block(
             event,
-            user_perm=self.perms.get("clear_group_member_perm"),
+            user_perm=self.settings.perms.get("clear_group_member_perm"),
             bot_perm="管理员",
         ):
             yield event.plain_result(result)
@@ -1133,41 +2667,51 @@ class AdminPlugin(Star):
 
         yield event.plain_result("正在查找满足条件的群友...")
 
-        client = event.bot
+        client = self.rpc.wrap(event.bot)
         group_id = event.get_group_id()
         sender_id = event.get_sender_id()
 
         try:
-            members_data = await client.get_group_member_list(group_id=int(group_id))
+            members_data = await self.members.get_snapshot(
+                client, group_id, refresh=True
+            )
         except Exception as e:
             yield event.plain_result(f"获取群成员信息失败：{e}")
             return
 
-        now_ts = int(datetime.now().timestamp())
-        threshold_ts = now_ts - inactive_days * 86400
-        clear_ids = []
-        clear_info = []
-
-        for member in members_data:
-            last_sent = member.get("last_sent_time", 0)
-            level = int(member.get("level", 0))
-            user_id = member["user_id"]
-            nickname = member.get("nickname", "（无昵称）")
-
-            if last_sent < threshold_ts and level < under_level:
-                clear_ids.append(user_id)
-                last_active_str = self.format_join_time(last_sent)
-                clear_info.append(
-                    f"{last_active_str}：【{level}】{user_id}-{nickname}"
-                )
-
-        if not clear_ids:
+        # 向量化筛选并按得分取前K个，管理员、群主、超管、bot自己和白名单不参与
+        table = MemberTable(members_data)
+        whitelist = [
+            *self.settings.clear_member_whitelist,
+            *self.settings.superusers,
+            event.get_self_id(),
+        ]
+        selected = select_inactive(
+            table,
+            now=int(time.time()),
+            inactive_days=inactive_days,
+            under_level=under_level,
+            whitelist=[u for u in whitelist if str(u).isdigit()],
+            limit=self.settings.clear_member_config.get("max_count", 50),
+            inactive_weight=self.settings.clear_member_config.get("inactive_weight", 1.0),
+            level_weight=self.settings.clear_member_config.get("level_weight", 1.0),
+            join_weight=self.settings.clear_member_config.get("join_weight", 0.0),
+        )
+        if not selected.size:
             yield event.plain_result("无符合条件的群友")
             return
 
-        # 排序 + 生成图像
-        clear_info.sort(key=lambda x: datetime.strptime(x.split("：")[0], "%Y-%m-%d"))
-        info_str = f"以下群友{inactive_days}天内未发言，且等级低于{under_level}:\n\n"
+        clear_ids = [str(table.user_id[i]) for i in selected]
+        clear_names = {str(table.user_id[i]): table.nickname[i] for i in selected}
+        clear_info = [
+            f"{self.format_join_time(int(table.last_sent[i]))}："
+            f"【{table.level[i]}】{table.user_id[i]}-{table.nickname[i]}"
+            for i in selected
+        ]
+        info_str = (
+            f"以下群友{inactive_days}天内未发言，且等级低于{under_level}"
+            f"(按清理优先级排序，共{len(clear_ids)}人):\n\n"
+        )
         info_str += "\n\n".join(clear_info)
         try:
             url = await self.text_to_image(info_str)
@@ -1175,6 +2719,10 @@ class AdminPlugin(Star):
         except Exception as e:
             yield event.plain_result(f"生成图像失败：{e}")
 
+        if mode == "预览":
+            yield event.plain_result("预览模式，未踢出任何人")
+            return
+
         notice_chain = [Comp.Plain("请发送“确认清理”或“取消清理”：")]
         for clear_id in clear_ids:
             notice_chain.append(Comp.At(qq=clear_id)) # type: ignore
@@ -1194,13 +2742,14 @@ class AdminPlugin(Star):
 
             if event.message_str == "确认清理":
                 for clear_id in clear_ids:
+                    target_name = clear_names[clear_id]
                     try:
-                        target_name = await self.get_nickname(event, user_id=clear_id)
-                        await event.bot.set_group_kick(
+                        await self.rpc.wrap(event.bot).set_group_kick(
                             group_id=int(group_id),
                             user_id=int(clear_id),
                             reject_add_request=False,
                         )
+                        self.audit.record("清理群友", group_id, sender_id, clear_id)
                         await event.send(event.plain_result(f"已将 {target_name}({clear_id}) 踢出本群。"))
                     except Exception as e:
                         await event.send(event.plain_result(f"踢出 {target_name}({clear_id}) 失败：{e}"))
@@ -1216,10 +2765,89 @@ class AdminPlugin(Star):
             event.stop_event()
 
 
+    @filter.command("群管日志")
+    @shard_only
+    async def view_audit_log(self, event: AiocqhttpMessageEvent):
+        """/群管日志 @user或QQ号 时间范围(如24h、7d) 页码"""
+        if result := await self.perm_block(
+            event, user_perm=self.settings.perms.get("view_audit_log_perm"), bot_perm="成员"
+        ):
+            yield event.plain_result(result)
+            return
+        group_id = event.get_group_id()
+        target_id = next(iter(self.get_ats(event)), None)
+        since = None
+        page = 1
+        for arg in event.message_str.strip().split()[1:]:
+            if arg[-1:] in ("h", "d") and arg[:-1].isdigit():
+                seconds = int(arg[:-1]) * (3600 if arg[-1] == "h" else 86400)
+                since = int(datetime.now().timestamp()) - seconds
+            elif arg.isdigit() and len(arg) >= 5:
+                target_id = arg
+            elif arg.isdigit():
+                page = int(arg)
+        await self.audit.flush()  # 先把队列里的记录写进去
+        rows = self.audit.query(group_id, target_id=target_id, since=since, page=page)
+        if not rows:
+            yield event.plain_result("没有找到相关记录")
+            return
+        lines = [
+            f"[{datetime.fromtimestamp(ts).strftime('%m-%d %H:%M')}] {action}"
+            + (f" {target}" if target else "")
+            + (f"({detail})" if detail else "")
+            + (f" by {operator}" if operator else "")
+            for ts, operator, target, action, detail in rows
+        ]
+        yield event.plain_result(f"【群管日志 第{page}页】\n" + "\n".join(lines))
+
+    @filter.command("群管状态")
+    @shard_only
+    async def view_metrics(self, event: AiocqhttpMessageEvent):
+        """查看群管插件的运行指标"""
+        if result := await self.perm_block(
+            event, user_perm=self.settings.perms.get("view_metrics_perm"), bot_perm="成员"
+        ):
+            yield event.plain_result(result)
+            return
+        yield event.plain_result("【群管状态】\n" + (self.metrics.render() or "暂无数据"))
+
+    @filter.command("群管剖析")
+    @shard_only
+    async def profile(self, event: AiocqhttpMessageEvent, seconds: int = 30):
+        """/群管剖析 秒数，采样剖析插件运行时的耗时分布，仅超管可用"""
+        if result := await self.perm_block(event, user_perm="超管", bot_perm="成员"):
+            yield event.plain_result(result)
+            return
+        if self.profiling:
+            yield event.plain_result("已有剖析正在进行")
+            return
+        seconds = min(max(int(seconds), 1), 300)
+        self.profiling = True
+        yield event.plain_result(f"开始剖析，{seconds}秒后出结果")
+        try:
+            result = await SamplingProfiler().run(seconds)
+        finally:
+            self.profiling = False
+        path = PROFILE_DIR / f"profile_{datetime.now():%Y%m%d_%H%M%S}.folded"
+        await asyncio.to_thread(result.write_collapsed, path)
+        await asyncio.to_thread(
+            prune_files, PROFILE_DIR, keep=PROFILE_KEEP, max_age=PROFILE_MAX_AGE
+        )
+        url = await self.text_to_image(
+            f"【群管剖析】\n{result.summary()}\n\n折叠栈文件：{path.name}"
+        )
+        yield event.image_result(url)
+
     @filter.command("群管帮助")
+    @shard_only
     async def help(self, event: AiocqhttpMessageEvent):
         """查看群管帮助"""
-        help_text = help_text = (
+        yield event.image_result(await self.help_image(""))
+
+    @cached_reply("群管帮助", ttl=3600)
+    async def help_image(self, group_id: str) -> str:
+        """渲染帮助图片，帮助内容与群无关，所有群共用一份"""
+        help_text = (
             "【群管帮助】(前缀以bot设置的为准)\n\n"
             "/禁言 <时长> @<用户> - 禁言指定用户，时长单位为秒，不填时长则随机禁言\n\n"
             "/禁我 <时长> - 自己禁言自己，时长单位为秒，不填时长则随机禁言\n\n"
@@ -1231,41 +2859,80 @@ class AdminPlugin(Star):
             "/头衔 <新头衔> @<用户> - 设置指定用户的群头衔，不指定用户则设置自己\n\n"
             "/我要头衔 <新头衔> - 设置自己的群头衔\n\n"
             "/踢了 @<用户> - 将指定用户踢出群聊\n\n"
-            "/拉黑 @<用户> - 将指定用户踢出群聊并拉黑\n\n"
+            "/拉黑 @<用户> - 将指定用户踢出群聊并拉黑，开启共享黑名单时同步到所有管理的群\n\n"
+            "/临时拉黑 <时长> @<用户> - 踢出并拉黑指定用户，到期自动移出黑名单，时长如30m、2h、3d\n\n"
             "/设置管理员 @<用户> - 设置指定用户为管理员\n\n"
+            "/临时管理员 <时长> @<用户> - 设置指定用户为管理员，到期自动取消\n\n"
             "/取消管理员 @<用户> - 取消指定用户的管理员身份\n\n"
             "/设精 - 将引用的消息设置为群精华\n\n"
             "/取精 - 将引用的消息移出群精华\n\n"
-            "/群精华 - 查看群精华消息列表\n\n"
+            "/群精华 <页码> - 查看群精华消息列表\n\n"
             "/撤回 - 撤回引用的消息和自己发送的消息\n\n"
+            "/撤回 @<用户> <条数> - 批量撤回指定用户最近的消息\n\n"
+            "/撤回最近 <条数> - 批量撤回本群最近的消息，默认10条，最多100条\n\n"
             "/设置群头像 - 引用图片设置群头像\n\n"
             "/设置群名 <新群名> - 修改群名称\n\n"
+            "/加图片黑名单 - 引用图片加入本群的图片黑名单，有人再发相似图片时按违禁词处理\n\n"
             "/发布群公告 <内容> - 发布群公告，可引用图片\n\n"
-            "/群公告 - 查看群公告\n\n"
+            "/群公告 <页码> - 查看群公告\n\n"
+            "/定时任务 <公告/消息> <分 时 日 月 周> [群号列表/全部] <内容> - 按cron表达式定时群发公告或消息，可引用图片，不写群号则只发本群\n\n"
+            "/定时任务列表 - 查看所有定时任务\n\n"
+            "/删除定时任务 <编号> - 删除指定的定时任务\n\n"
             "/开启宵禁 <开始时间> <结束时间> - 设置并开启宵禁任务，时间格式为24小时制的HH:MM，默认时间为23:30到6:00\n\n"
             "/关闭宵禁 - 关闭当前群的宵禁任务\n\n"
-            "/添加进群关键词 <关键词> - 添加自动批准进群的关键词，多个关键词用逗号分隔\n\n"
+            "/添加进群关键词 <关键词> - 添加自动批准进群的关键词，多个关键词用空格或逗号分隔，re:开头的按正则匹配\n\n"
             "/删除进群关键词 <关键词> - 删除自动批准进群的关键词\n\n"
             "/查看进群关键词 - 查看当前群的自动批准进群关键词\n\n"
-            "/添加进群黑名单 <QQ号> - 添加进群黑名单，多个QQ号用逗号分隔\n\n"
+            "/导入进群关键词 <文件路径> - 引用文件或填插件目录下的路径，批量导入进群关键词\n\n"
+            "/导出进群关键词 - 导出本群的进群关键词到群文件\n\n"
+            "/添加进群黑名单 <QQ号> - 添加进群黑名单，多个QQ号用空格或逗号分隔\n\n"
             "/删除进群黑名单 <QQ号> - 从进群黑名单中删除指定QQ号\n\n"
             "/查看进群黑名单 - 查看当前群的进群黑名单\n\n"
+            "/导入进群黑名单 <文件路径> - 引用文件或填插件目录下的路径，批量导入进群黑名单\n\n"
+            "/导出进群黑名单 - 导出本群的进群黑名单到群文件\n\n"
             "/同意 - 同意引用的进群申请\n\n"
+            "/同意 <QQ号> - 同意指定QQ号的进群申请\n\n"
             "/拒绝 <理由> - 拒绝引用的进群申请，可附带拒绝理由\n\n"
+            "/全部同意 - 同意本群所有待处理的进群申请\n\n"
+            "/全部拒绝 <理由> - 拒绝本群所有待处理的进群申请\n\n"
+            "/查看进群申请 - 查看本群待处理的进群申请\n\n"
             "/群友信息 - 查看群成员信息\n\n"
-            "/清理群友 <未发言天数> <群等级> -  清理群友，可指定未发言天数和群等级"
+            "/导出群友 <csv/jsonl> - 导出群成员信息到群文件\n\n"
+            "/清理群友 <未发言天数> <群等级> [预览] -  清理群友，可指定未发言天数和群等级\n\n"
+            "/群管日志 @<用户> <时间范围> <页码> - 查看本群的群管操作记录，时间范围如24h、7d，均可省略\n\n"
+            "/群管状态 - 查看群管插件的运行指标\n\n"
+            "/群管剖析 <秒数> - 采样剖析插件的耗时分布，生成火焰图用的折叠栈文件，仅超管可用"
         )
-        url = await self.text_to_image(help_text)
-        yield event.image_result(url)
+        return await self.text_to_image(help_text)
 
     async def terminate(self):
         """可选择实现异步的插件销毁方法，当插件被卸载/停用时会调用。"""
-        for task in self.scheduler_tasks.values():
-            if task:
-                task.cancel()
+        if self.config_watch_task:
+            self.config_watch_task.cancel()
+        if self.sweep_task:
+            self.sweep_task.cancel()
+        if self.warmup_task and not self.warmup_task.done():
+            self.warmup_task.cancel()
+            try:
+                await self.warmup_task
+            except asyncio.CancelledError:
+                pass
+        for state in self.groups:
+            if state.curfew_active():
+                state.curfew_task.cancel()  # type: ignore
                 try:
-                    await task
+                    await state.curfew_task  # type: ignore
                 except asyncio.CancelledError:
                     pass
+        await self.work.close()
+        for task in list(self.cron_runs):
+            task.cancel()
+        await self.timers.close()
+        await self.audit.close()
+        self.blacklist.close()
+        self.image_blocklist.close()
+        self.cron_jobs.close()
+        if self.http:
+            await self.http.close()
         logger.info("插件 astrbot_plugin_QQAdmin 已被终止")
 
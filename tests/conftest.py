@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 插件目录不是可安装的包，直接把它加进导入路径，按 core.xxx 导入
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from core.blacklist import BlacklistStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BlacklistStore(tmp_path / "qqadmin.db")
+    yield store
+    store.close()
+
+
+def test_add_returns_only_new_ids(store):
+    assert store.add("g", [1, "2"]) == [1, 2]
+    assert store.add("g", [2, 3]) == [3]
+    assert store.list("g") == [1, 2, 3]
+    assert store.count("g") == 3
+
+
+def test_scopes_are_independent(store):
+    store.add("g1", [1])
+    store.add("g2", [2])
+    assert store.list("g1") == [1]
+    assert set(store.scopes()) == {"g1", "g2"}
+
+
+def test_temporary_add_does_not_touch_permanent_entry(store):
+    store.add("g", [1])
+    assert store.add("g", [1], expires_at=int(time.time()) - 1) == []
+    assert store.remove_expired("g", [1]) == []
+    assert store.list("g") == [1]
+
+
+def test_remove_expired_only_removes_due_temporary_rows(store):
+    now = int(time.time())
+    store.add("g", [1], expires_at=now - 1)
+    store.add("g", [2], expires_at=now + 3600)
+    assert store.remove_expired("g", [1, 2]) == [1]
+    assert store.list("g") == [2]
+
+
+def test_temporary_entry_can_be_extended(store):
+    now = int(time.time())
+    store.add("g", [1], expires_at=now - 1)
+    assert store.add("g", [1], expires_at=now + 3600) == [1]
+    assert store.remove_expired("g", [1]) == []
+
+
+def test_permanent_add_clears_temporary_mark(store):
+    store.add("g", [1], expires_at=int(time.time()) - 1)
+    assert store.add("g", [1]) == [1]
+    assert store.remove_expired("g", [1]) == []
+    assert store.list("g") == [1]
+
+
+def test_remove_and_on_change(tmp_path):
+    changed = []
+    store = BlacklistStore(tmp_path / "qqadmin.db", on_change=changed.append)
+    store.add("g", [1, 2])
+    assert store.remove("g", [2, 3]) == [2]
+    assert store.remove("g", [3]) == []
+    assert changed == ["g", "g"]
+    store.close()
+
+
+def test_migrates_table_without_expires_at(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "qqadmin.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE blacklist (scope TEXT NOT NULL, user_id INTEGER NOT NULL, "
+        "added_at INTEGER NOT NULL, PRIMARY KEY (scope, user_id)) WITHOUT ROWID"
+    )
+    conn.execute("INSERT INTO blacklist VALUES ('g', 1, 0)")
+    conn.commit()
+    conn.close()
+    store = BlacklistStore(path)
+    assert store.list("g") == [1]
+    assert store.remove_expired("g", [1]) == []
+    store.close()
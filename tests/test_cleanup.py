@@ -0,0 +1,57 @@
+from core.cleanup import MemberTable, select_inactive
+
+DAY = 86400
+NOW = 1_000 * DAY
+
+
+def member(user_id, last_sent_days=None, level=1, join_days=400, role="member"):
+    return {
+        "user_id": user_id,
+        "last_sent_time": NOW - last_sent_days * DAY if last_sent_days else 0,
+        "level": level,
+        "join_time": NOW - join_days * DAY,
+        "role": role,
+    }
+
+
+def select(members, **kwargs):
+    table = MemberTable(members)
+    kwargs = {"inactive_days": 30, "under_level": 10, **kwargs}
+    picked = select_inactive(table, NOW, **kwargs)
+    return [int(table.user_id[i]) for i in picked]
+
+
+def test_filters_active_high_level_and_admins():
+    members = [
+        member(1, last_sent_days=60),
+        member(2, last_sent_days=5),
+        member(3, last_sent_days=60, level=20),
+        member(4, last_sent_days=60, role="admin"),
+        member(5, last_sent_days=60, role="owner"),
+    ]
+    assert select(members) == [1]
+
+
+def test_never_spoke_counts_from_join_time():
+    members = [member(1, join_days=10), member(2, join_days=100)]
+    assert select(members) == [2]
+
+
+def test_whitelist_and_limit():
+    members = [member(uid, last_sent_days=30 + uid) for uid in range(1, 6)]
+    assert select(members, whitelist=["5"], limit=2) == [4, 3]
+    assert select(members, limit=0) == []
+
+
+def test_ordered_by_weighted_score():
+    members = [
+        member(1, last_sent_days=40, level=1),
+        member(2, last_sent_days=100, level=9),
+        member(3, last_sent_days=60, level=1),
+    ]
+    assert select(members) == [2, 3, 1]
+    assert select(members, inactive_weight=0, level_weight=1) == [1, 3, 2]
+
+
+def test_empty_table():
+    assert select([]) == []
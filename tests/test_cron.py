@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+
+from core.cron import CronExpr, CronJobStore
+
+
+def ts(*args) -> float:
+    return datetime(*args).timestamp()
+
+
+def test_every_minute():
+    assert CronExpr("* * * * *").next_after(ts(2024, 1, 1, 8, 0, 30)) == ts(
+        2024, 1, 1, 8, 1
+    )
+
+
+def test_daily_time_rolls_over_to_next_day():
+    expr = CronExpr("30 8 * * *")
+    assert expr.next_after(ts(2024, 1, 1, 8, 0)) == ts(2024, 1, 1, 8, 30)
+    assert expr.next_after(ts(2024, 1, 1, 8, 30)) == ts(2024, 1, 2, 8, 30)
+
+
+def test_step_range_and_list():
+    expr = CronExpr("*/15 9-10 * * *")
+    assert expr.minutes == [0, 15, 30, 45]
+    assert expr.hours == [9, 10]
+    assert expr.next_after(ts(2024, 1, 1, 10, 50)) == ts(2024, 1, 2, 9, 0)
+    assert CronExpr("0 1,13 * * *").next_after(ts(2024, 1, 1, 2)) == ts(
+        2024, 1, 1, 13
+    )
+
+
+def test_sunday_as_zero_or_seven():
+    # 2024-01-07 是周日
+    for spec in ("0 0 * * 0", "0 0 * * 7"):
+        assert CronExpr(spec).next_after(ts(2024, 1, 1)) == ts(2024, 1, 7)
+
+
+def test_day_of_month_or_weekday():
+    # 日和周都有限制时满足其一即可：1号或周一(2024-01-08)
+    expr = CronExpr("0 0 1 * 1")
+    assert expr.next_after(ts(2024, 1, 1, 12)) == ts(2024, 1, 8)
+    assert expr.next_after(ts(2024, 1, 29, 12)) == ts(2024, 2, 1)
+
+
+def test_leap_day():
+    assert CronExpr("0 0 29 2 *").next_after(ts(2024, 3, 1)) == ts(2028, 2, 29)
+
+
+@pytest.mark.parametrize(
+    "spec", ["* * * *", "60 * * * *", "a * * * *", "5-1 * * * *", "*/0 * * * *"]
+)
+def test_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        CronExpr(spec)
+
+
+def test_never_fires():
+    with pytest.raises(ValueError):
+        CronExpr("0 0 31 2 *").next_after(ts(2024, 1, 1))
+
+
+def test_job_store(tmp_path):
+    store = CronJobStore(tmp_path / "qqadmin.db")
+    job_id = store.add("0 8 * * *", "公告", ["123"], "早上好", image="a.jpg")
+    assert store.get(job_id)["groups"] == ["123"]
+    assert store.images() == {"a.jpg"}
+    assert [job["id"] for job in store.list()] == [job_id]
+    assert store.remove(job_id)["content"] == "早上好"
+    assert store.get(job_id) is None
+    store.close()
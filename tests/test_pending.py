@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from core.pending import PendingRequest, PendingRequestStore  # noqa: E402
+
+
+def request(flag, group_id="1", user_id="10", notice_id="", created=None):
+    return PendingRequest(
+        flag,
+        group_id,
+        user_id,
+        nickname=f"n{user_id}",
+        notice_id=notice_id,
+        created=created,
+    )
+
+
+def test_lookup_by_notice_and_user(tmp_path):
+    store = PendingRequestStore(tmp_path / "pending.json")
+    store.add(request("f1", notice_id="100"))
+    assert store.get_by_notice(100).flag == "f1"
+    assert store.get_by_user("1", 10).flag == "f1"
+    assert store.get_by_user("2", 10) is None
+
+
+def test_repeat_request_keeps_latest(tmp_path):
+    store = PendingRequestStore(tmp_path / "pending.json")
+    store.add(request("f1", notice_id="100"))
+    store.add(request("f2", notice_id="200"))
+    assert len(store) == 1
+    assert store.get_by_notice("100") is None
+    assert store.get_by_user("1", "10").flag == "f2"
+
+
+def test_list_group_and_remove(tmp_path):
+    store = PendingRequestStore(tmp_path / "pending.json")
+    store.add(request("f1", user_id="10", created=time.time() - 2))
+    store.add(request("f2", user_id="11", created=time.time() - 1))
+    store.add(request("f3", group_id="2", user_id="12"))
+    assert [r.flag for r in store.list_group("1")] == ["f1", "f2"]
+    assert store.remove("f1").flag == "f1"
+    assert store.remove("f1") is None
+    store.remove_many(["f2", "f3"])
+    assert len(store) == 0
+
+
+def test_expired_requests_are_dropped(tmp_path):
+    store = PendingRequestStore(tmp_path / "pending.json", ttl=60)
+    store.add(request("old", user_id="10", created=time.time() - 120))
+    store.add(request("new", user_id="11"))
+    assert store.get_by_user("1", "10") is None
+    assert [r.flag for r in store.list_group("1")] == ["new"]
+
+
+def test_persists_across_restart(tmp_path):
+    path = tmp_path / "pending.json"
+    store = PendingRequestStore(path)
+    store.add(request("f1", notice_id="100"))
+    reloaded = PendingRequestStore(path)
+    assert reloaded.get_by_notice("100").nickname == "n10"
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from core.replycache import ReplyCache, cached_reply
+
+
+def test_single_flight():
+    async def main():
+        cache = ReplyCache()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(
+            *(cache.get(("1", "k"), compute) for _ in range(5))
+        )
+        assert results == [1] * 5
+        assert await cache.get(("1", "k"), compute) == 1
+        assert calls == 1
+
+    asyncio.run(main())
+
+
+def test_error_is_shared_and_not_cached():
+    async def main():
+        cache = ReplyCache()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(
+            *(cache.get(("1", "k"), compute) for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert calls == 1
+        with pytest.raises(RuntimeError):
+            await cache.get(("1", "k"), compute)
+        assert calls == 2
+
+    asyncio.run(main())
+
+
+def test_cancelled_leader_lets_waiter_compute():
+    async def main():
+        cache = ReplyCache()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def fast():
+            return "ok"
+
+        leader = asyncio.create_task(cache.get(("1", "k"), slow))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get(("1", "k"), fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await waiter == "ok"
+
+    asyncio.run(main())
+
+
+def test_invalidate_by_prefix_and_inflight():
+    async def main():
+        cache = ReplyCache()
+        value = "old"
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            return value
+
+        await cache.get(("1", "a", 1), compute)
+        await cache.get(("2", "a", 1), compute)
+        value = "new"
+        cache.invalidate(1, "a")
+        assert await cache.get(("1", "a", 1), compute) == "new"
+        assert await cache.get(("2", "a", 1), compute) == "old"
+
+        # 计算期间被失效的结果不进缓存
+        value = "stale"
+        task = asyncio.create_task(cache.get(("1", "b"), compute))
+        await asyncio.sleep(0)
+        cache.invalidate("1")
+        assert await task == "stale"
+        value = "fresh"
+        assert await cache.get(("1", "b"), compute) == "fresh"
+
+    asyncio.run(main())
+
+
+def test_cached_reply_decorator():
+    class Plugin:
+        def __init__(self):
+            self.reply_cache = ReplyCache()
+            self.calls = []
+
+        @cached_reply("kind")
+        async def render(self, group_id, page, *, client=None):
+            self.calls.append((group_id, page, client))
+            return f"{group_id}-{page}"
+
+    async def main():
+        plugin = Plugin()
+        assert await plugin.render("1", 1, client="a") == "1-1"
+        assert await plugin.render(1, 1, client="b") == "1-1"
+        assert await plugin.render("1", 2) == "1-2"
+        assert plugin.calls == [("1", 1, "a"), ("1", 2, None)]
+
+    asyncio.run(main())
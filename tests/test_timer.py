@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from core.limiter import RateLimiter  # noqa: E402
+from core.timer import TimerService, format_duration, parse_duration  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "text, seconds",
+    [
+        ("90", 90),
+        (90, 90),
+        ("30m", 1800),
+        ("2h", 7200),
+        ("3天", 259200),
+        ("1x", None),
+    ],
+)
+def test_parse_duration(text, seconds):
+    assert parse_duration(text) == seconds
+
+
+def test_format_duration():
+    assert format_duration(90061) == "1天1小时1分钟1秒"
+    assert format_duration(3600) == "1小时"
+    assert format_duration(0) == "0秒"
+
+
+def test_fires_in_due_order_and_skips_cancelled(tmp_path):
+    async def main():
+        timers = TimerService(tmp_path / "qqadmin.db", RateLimiter(rate=100))
+        fired = []
+
+        async def handler(payload):
+            fired.append(payload["n"])
+
+        timers.register("t", handler)
+        timers.schedule(0.06, "t", {"n": 3})
+        timers.schedule(0.02, "t", {"n": 1})
+        timers.schedule(0.04, "t", {"n": 2})
+        assert timers.cancel("t", lambda p: p["n"] == 2) == 1
+        assert [p["n"] for _, p in timers.pending("t")] == [1, 3]
+        timers.start()
+        await asyncio.sleep(0.15)
+        assert fired == [1, 3]
+        assert len(timers) == 0
+        await timers.close()
+
+    asyncio.run(main())
+
+
+def test_earlier_timer_wakes_scheduler(tmp_path):
+    async def main():
+        timers = TimerService(tmp_path / "qqadmin.db", RateLimiter(rate=100))
+        fired = asyncio.Event()
+
+        async def handler(payload):
+            fired.set()
+
+        timers.register("t", handler)
+        timers.schedule(3600, "t", {})
+        timers.start()
+        await asyncio.sleep(0.01)
+        timers.schedule(0.01, "t", {})
+        await asyncio.wait_for(fired.wait(), 1)
+        await timers.close()
+
+    asyncio.run(main())
+
+
+def test_survives_restart_and_filters_by_accept(tmp_path):
+    path = tmp_path / "qqadmin.db"
+
+    async def schedule():
+        timers = TimerService(path, RateLimiter())
+        timers.schedule(3600, "t", {"group_id": "1"})
+        timers.schedule(3600, "t", {"group_id": "2"})
+        await timers.close()
+
+    async def reload():
+        timers = TimerService(
+            path, RateLimiter(), accept=lambda p: p["group_id"] == "2"
+        )
+        pending = [p["group_id"] for _, p in timers.pending()]
+        await timers.close()
+        return pending
+
+    asyncio.run(schedule())
+    assert asyncio.run(reload()) == ["2"]
+
+
+def test_failed_action_is_retried(tmp_path):
+    async def main():
+        timers = TimerService(tmp_path / "qqadmin.db", RateLimiter(rate=100))
+        timers.RETRY_DELAY = 0.01
+
+        attempts = []
+
+        async def handler(payload):
+            attempts.append(payload.get("_attempts", 0))
+            if len(attempts) < 2:
+                raise RuntimeError("协议端无响应")
+
+        timers.register("t", handler)
+        timers.schedule(0, "t", {})
+        timers.start()
+        await asyncio.sleep(0.1)
+        assert attempts == [0, 1]
+        assert len(timers) == 0
+        await timers.close()
+
+    asyncio.run(main())
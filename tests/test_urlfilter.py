@@ -0,0 +1,42 @@
+from core.urlfilter import DomainTrie, build_domain_tries, extract_hosts
+
+
+def test_extract_hosts():
+    text = "看看 WWW.Example.COM/path 和 foo。bar。cn，版本1.2.3不算"
+    assert list(extract_hosts(text)) == ["www.example.com", "foo.bar.cn"]
+
+
+def test_block_covers_subdomains():
+    trie = DomainTrie(blocked=["example.com"])
+    assert trie.match("example.com") == "example.com"
+    assert trie.match("a.b.example.com") == "example.com"
+    assert trie.match("notexample.com") is None
+    assert trie.match("com") is None
+
+
+def test_most_specific_rule_wins():
+    trie = DomainTrie(blocked=["example.com"], allowed=["docs.example.com"])
+    assert trie.match("docs.example.com") is None
+    assert trie.match("api.docs.example.com") is None
+    assert trie.match("www.example.com") == "example.com"
+
+
+def test_scan_fullwidth_dot():
+    trie = DomainTrie(blocked=["bad.cn"])
+    assert trie.scan("加群 x。bad。cn 领福利") == ("x.bad.cn", "bad.cn")
+    assert trie.scan("没有链接") is None
+
+
+def test_group_scoped_rules():
+    tries = build_domain_tries(["bad.com", "123:evil.org"], ["123:ok.bad.com"])
+    assert tries[""].match("evil.org") is None
+    assert tries["123"].match("evil.org") == "evil.org"
+    assert tries["123"].match("ok.bad.com") is None
+    assert tries[""].match("ok.bad.com") == "bad.com"
+
+
+def test_port_is_not_a_group_id():
+    tries = build_domain_tries(["example.com:8080", "123:evil.org:443"], [])
+    assert set(tries) == {"", "123"}
+    assert tries[""].match("example.com") == "example.com"
+    assert tries["123"].match("evil.org") == "evil.org"
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from core.workqueue import DROP_NEWEST, DROP_OLDEST, GroupWorkQueue  # noqa: E402
+
+
+def recorder(ran, name):
+    async def job():
+        ran.append(name)
+
+    return job
+
+
+def run_queue(policy, submit):
+    async def main():
+        queue = GroupWorkQueue(workers=1, depth=2, policy=policy)
+        ran = []
+        accepted = submit(queue, ran)
+        await asyncio.sleep(0.05)
+        await queue.close()
+        return accepted, ran
+
+    return asyncio.run(main())
+
+
+def test_jobs_in_a_group_run_in_order():
+    def submit(queue, ran):
+        return [queue.submit("g", recorder(ran, n)) for n in (1, 2)]
+
+    assert run_queue(DROP_OLDEST, submit) == ([True, True], [1, 2])
+
+
+def test_drop_oldest():
+    def submit(queue, ran):
+        return [queue.submit("g", recorder(ran, n)) for n in (1, 2, 3)]
+
+    assert run_queue(DROP_OLDEST, submit) == ([True, True, True], [2, 3])
+
+
+def test_drop_newest():
+    def submit(queue, ran):
+        return [queue.submit("g", recorder(ran, n)) for n in (1, 2, 3)]
+
+    assert run_queue(DROP_NEWEST, submit) == ([True, True, False], [1, 2])
+
+
+def test_same_key_replaces_queued_job():
+    def submit(queue, ran):
+        return [
+            queue.submit("g", recorder(ran, "ban-old"), key=("ban", "1")),
+            queue.submit("g", recorder(ran, "ban-new"), key=("ban", "1")),
+        ]
+
+    assert run_queue(DROP_OLDEST, submit) == ([True, True], ["ban-new"])
+
+
+@pytest.mark.parametrize("policy", [DROP_OLDEST, DROP_NEWEST])
+def test_essential_jobs_are_never_dropped(policy):
+    def submit(queue, ran):
+        return [
+            queue.submit("g", recorder(ran, 1)),
+            queue.submit("g", recorder(ran, 2)),
+            queue.submit("g", recorder(ran, "join"), key="join", essential=True),
+            queue.submit("g", recorder(ran, 3)),
+        ]
+
+    accepted, ran = run_queue(policy, submit)
+    assert "join" in ran
+    assert accepted[2]
+
+
+def test_failing_job_does_not_stop_the_group():
+    async def main():
+        queue = GroupWorkQueue(workers=1)
+        ran = []
+
+        async def boom():
+            raise RuntimeError("boom")
+
+        queue.submit("g", boom)
+        queue.submit("g", recorder(ran, "next"))
+        await asyncio.sleep(0.05)
+        await queue.close()
+        return ran
+
+    assert asyncio.run(main()) == ["next"]
@@ -0,0 +1,153 @@
+"""
+分片哈希环自检：起一个假的OneBot HTTP接口，再起N个分片进程连上它。
+每个分片像插件一样按环境变量 QQADMIN_SHARD_COUNT / QQADMIN_SHARD_INDEX 建哈希环，
+收到全部群的消息后交给 shard_only 装饰的命令处理，命令里调用一次全体禁言；
+最后由假接口统计，检查每个群恰好被一个分片处理了一次
+
+只检查群在分片间的分配和 shard_only 的过滤，不加载插件本身，不覆盖分片之间
+共享的状态：共用的数据库(黑名单、定时动作、操作日志、定时任务)、各进程自己的
+事件去重与命令结果缓存，以及有意跨分片的拉黑同步(propagate_block)
+
+用法：python tools/shard_ring_check.py [分片数] [群数]
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import urllib.request
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.sharding import HashRing, shard_only  # noqa: E402
+
+
+class FakeOneBot(BaseHTTPRequestHandler):
+    """最简的OneBot HTTP接口：POST /<接口名>，记录每个群被调用的接口"""
+
+    groups: list[int] = []
+    calls: dict[int, list[str]] = defaultdict(list)  # 群号 -> 处理它的分片
+    lock = threading.Lock()
+
+    def do_POST(self):
+        action = self.path.strip("/")
+        length = int(self.headers.get("Content-Length") or 0)
+        params = json.loads(self.rfile.read(length) or b"{}")
+        if action == "get_group_list":
+            data = [{"group_id": gid} for gid in self.groups]
+        elif action == "set_group_whole_ban":
+            with self.lock:
+                self.calls[params["group_id"]].append(self.headers["X-Shard"])
+            data = None
+        else:
+            self.reply({"status": "failed", "retcode": 1404, "data": None})
+            return
+        self.reply({"status": "ok", "retcode": 0, "data": data})
+
+    def reply(self, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeEvent:
+    def __init__(self, group_id: int):
+        self.group_id = str(group_id)
+
+    def get_group_id(self) -> str:
+        return self.group_id
+
+
+class ShardProcess:
+    """一个分片进程：哈希环的建法与插件一致"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.index = os.environ["QQADMIN_SHARD_INDEX"]
+        self.shard = HashRing(
+            count=int(os.environ["QQADMIN_SHARD_COUNT"]), index=int(self.index)
+        )
+
+    def call_action(self, action: str, **params):
+        request = urllib.request.Request(
+            f"{self.url}/{action}",
+            data=json.dumps(params).encode(),
+            headers={"Content-Type": "application/json", "X-Shard": self.index},
+        )
+        with urllib.request.urlopen(request, timeout=10) as resp:
+            return json.loads(resp.read())["data"]
+
+    @shard_only
+    async def set_whole_ban(self, event: FakeEvent):
+        await asyncio.to_thread(
+            self.call_action,
+            "set_group_whole_ban",
+            group_id=int(event.get_group_id()),
+            enable=True,
+        )
+        yield event.get_group_id()
+
+    async def run(self) -> int:
+        handled = 0
+        # 每个进程都会收到bot所在所有群的消息
+        for group in await asyncio.to_thread(self.call_action, "get_group_list"):
+            async for _ in self.set_whole_ban(FakeEvent(group["group_id"])):
+                handled += 1
+        return handled
+
+
+def main(shard_count: int = 4, group_count: int = 1000) -> int:
+    FakeOneBot.groups = [100000 + i * 7919 for i in range(group_count)]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOneBot)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        procs = [
+            subprocess.Popen(
+                [sys.executable, __file__, "--shard", url],
+                env={
+                    **os.environ,
+                    "QQADMIN_SHARD_COUNT": str(shard_count),
+                    "QQADMIN_SHARD_INDEX": str(index),
+                },
+            )
+            for index in range(shard_count)
+        ]
+        if any(p.wait(timeout=60) for p in procs):
+            print("有分片进程异常退出")
+            return 1
+    finally:
+        server.shutdown()
+
+    calls = FakeOneBot.calls
+    missed = [gid for gid in FakeOneBot.groups if not calls.get(gid)]
+    repeated = {gid: shards for gid, shards in calls.items() if len(shards) > 1}
+    per_shard = Counter(shards[0] for shards in calls.values())
+    print(
+        f"{shard_count}个分片处理{group_count}个群，各分片群数："
+        + "、".join(f"{i}号{per_shard[str(i)]}个" for i in range(shard_count))
+    )
+    if missed or repeated:
+        print(f"未处理的群：{missed}\n重复处理的群：{repeated}")
+        return 1
+    print("每个群恰好被一个分片处理了一次")
+    return 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--shard"]:
+        asyncio.run(ShardProcess(sys.argv[2]).run())
+    else:
+        args = [int(a) for a in sys.argv[1:3]]
+        sys.exit(main(*args))